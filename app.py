@@ -5,16 +5,33 @@ import sys
 sys.path.append(os.path.dirname(__file__))
 
 import streamlit as st
-from fpdf import FPDF
 import base64
 import io
+import json
+import tempfile
 from datetime import datetime
 import utils.database as db
+import utils.exercise_io as exercise_io
+import utils.lesson_composer as lesson_composer
+import utils.ai_integration as ai
+import utils.pdf_export as pdf_export
+import utils.plan_engine as plan_engine
+import utils.plan_export as plan_export
+import utils.plan_store as plan_store
+import utils.tracing as tracing
+
+# Měření volání databáze a AI (stránka Diagnostika, případně /metrics)
+tracing.setup(db, ai)
+
+# Počet cviků na jedné stránce administrace
+ADMIN_PAGE_SIZE = 25
+SEARCH_LIMIT = 200
+PLANS_PAGE_SIZE = 20
 
 # --- Utility ---
 def clear_plan_data():
     for key in list(st.session_state.keys()):
-        if key.startswith(("selected_exercises_", "fitness", "manipulation", "locomotion", "environment", "equipment", "main_leader", "final_leader", "prep_time", "main_time", "final_time", "selected_schools", "school_category")):
+        if key.startswith(("selected_exercises_", "fitness", "manipulation", "locomotion", "environment", "equipment", "main_leader", "final_leader", "prep_time", "main_time", "final_time", "selected_schools", "school_category", "compose_summary")):
             del st.session_state[key]
 
 # --- Page functions ---
@@ -99,6 +116,34 @@ def page_exercise_constructs():
     )
 
 
+def compose_lesson_selection():
+    """Callback tlačítka: vybere cviky všech částí lokálním skladačem."""
+    state = st.session_state
+    wanted = {label: list(state.get(key, [])) for key, label in plan_engine.CONSTRUCT_LABELS if state.get(key)}
+    candidates = {
+        section: [
+            ex for ex in db.get_exercises(
+                section=section, location=state.environment, materials=state.equipment, with_details=True
+            )
+            if lesson_composer.matches_constructs(ex, wanted)
+        ]
+        for section, _ in plan_engine.SECTIONS
+    }
+    budgets = {
+        section: int(state.get(f"{section}_time", plan_engine.DEFAULT_TIMES[section]))
+        for section, _ in plan_engine.SECTIONS
+    }
+    lesson = lesson_composer.compose_lesson(candidates, budgets, wanted)
+    if state.get("compose_ai"):
+        lesson = lesson_composer.refine_with_ai(lesson)
+    for section, exercises in lesson.items():
+        state[f"selected_exercises_{section}"] = [ex["id"] for ex in exercises]
+    state.compose_summary = ", ".join(
+        f"{label}: {sum(ex['minutes'] for ex in lesson[section])}/{budgets[section]} min"
+        for section, label in plan_engine.SECTIONS
+    )
+
+
 def page_select_exercises():
     st.title("Výběr cviků pro hodinu")
     if "environment" not in st.session_state:
@@ -106,6 +151,13 @@ def page_select_exercises():
         return
     env = st.session_state.environment
     equip = st.session_state.equipment
+
+    # Automatický výběr podle časových dotací a konstruktů; AI jen doladí pořadí
+    col1, col2 = st.columns([1, 2])
+    col1.button("Sestavit automaticky", on_click=compose_lesson_selection)
+    col2.checkbox("Doladit pořadí pomocí AI", key="compose_ai")
+    if st.session_state.get("compose_summary"):
+        st.caption(f"Sestaveno – {st.session_state.compose_summary}")
     for section, label in [("prep","Přípravná část"),("main","Hlavní část"),("final","Závěrečná část")]:
         st.subheader(label)
         ct_key = f"{section}_ct"
@@ -117,23 +169,30 @@ def page_select_exercises():
             index=db.get_construct_types().index(st.session_state.get(ct_key, db.get_construct_types()[0])),
             key=ct_key
         )
-        sub = st.selectbox(
-            f"Podkategorie ({label})", db.get_subcategories(ct),
-            index=db.get_subcategories(ct).index(st.session_state.get(sub_key, db.get_subcategories(ct)[0])),
-            key=sub_key
-        )
-
-        candidates = [e for e in db.get_exercises(ct, sub, section=section)
-                      if e["location"] in [env, "Obojí"] and all(m in equip for m in e.get("materials", []))]
-        options = [f"{c['name']} – {c['description'][:50]}..." for c in candidates]
-        defaults = [options.index(o) for o in st.session_state.get(sel_key, []) if o in options]
-
-        selected = st.multiselect(
-            f"Vyber cviky ({label}):", options,
-            default=[options[i] for i in defaults],
-            key=sel_key
-        )
-        st.session_state[sel_key] = selected
+        subcategories = db.get_subcategories(ct)
+        if st.session_state.get(sub_key) not in subcategories:
+            # Po změně konstruktu patří uložená podkategorie jinému konstruktu
+            st.session_state[sub_key] = subcategories[0]
+        sub = st.selectbox(f"Podkategorie ({label})", subcategories, key=sub_key)
+
+        candidates = db.get_exercises(ct, sub, section=section, location=env, materials=equip)
+        query = st.text_input(f"Hledat cvik ({label})", key=f"{section}_query")
+        if query:
+            # Pořadí podle relevance; hledá se jen mezi cviky vyhovujícími
+            # filtrům, takže SEARCH_LIMIT nevyřadí shodu, která filtrům vyhovuje
+            allowed = {c["id"] for c in candidates}
+            rank = {ex["id"]: pos for pos, ex in enumerate(db.search_exercises(query, SEARCH_LIMIT, ids=allowed))}
+            candidates = sorted((c for c in candidates if c["id"] in rank), key=lambda c: rank[c["id"]])
+        # Ve výběru se drží id cviků, popisky jen pro zobrazení
+        labels = {c["id"]: f"{c['name']} – {c['description'][:50]}..." for c in candidates}
+        # Už vybrané cviky zůstanou ve výběru i mimo aktuální filtr
+        selected = st.session_state.get(sel_key, [])
+        outside = [ex_id for ex_id in selected if ex_id not in labels]
+        if outside:
+            for c in db.get_exercises_by_ids(outside):
+                labels[c["id"]] = f"{c['name']} – {c['description'][:50]}..."
+        st.session_state[sel_key] = [ex_id for ex_id in selected if ex_id in labels]
+        st.multiselect(f"Vyber cviky ({label}):", list(labels), format_func=labels.get, key=sel_key)
 
 
 def page_time_allocation():
@@ -151,43 +210,139 @@ def page_time_allocation():
 
 def page_generate_plan():
     st.title("Písemná příprava")
-    for section in ["prep","main","final"]:
-        if not st.session_state.get(f"selected_exercises_{section}"):
-            st.error("Vyberte cviky ve všech částech.")
-            return
-    lines = [f"{st.session_state.class_grade} – Příprava hodiny {datetime.today().date()}", ""]
-    for section, label in [("prep","Přípravná část"),("main","Hlavní část"),("final","Závěrečná část")]:
-        minutes = st.session_state.get(f"{section}_time", 0)
-        lines.append(f"--- {label} ({minutes} min) ---")
-        for opt in st.session_state.get(f"selected_exercises_{section}", []):
-            pass
-        lines.append("")
-    plan_text = "\n".join(lines)
+    try:
+        plan = plan_engine.build_plan(plan_engine.selection_from_state(st.session_state))
+    except ValueError as e:
+        st.error(str(e))
+        return
+    plan_text = plan["text"]
     st.text_area("Výsledná příprava", plan_text, height=400)
 
+    # PDF se vykreslí znovu jen při změně textu přípravy
+    cached = st.session_state.get("plan_pdf")
+    if not cached or cached[0] != plan_text:
+        try:
+            cached = (plan_text, pdf_export.render_plan_pdf(plan_text))
+        except Exception as e:
+            st.error(f"Chyba při vytváření PDF: {e}")
+            return
+        st.session_state.plan_pdf = cached
+    st.download_button(
+        "Stáhnout PDF", cached[1],
+        file_name=f"priprava_{plan['date']}.pdf",
+        mime="application/pdf"
+    )
+    if st.button("Uložit přípravu"):
+        try:
+            plan_store.get_plan_store().save(
+                plan_text,
+                class_grade=plan["class_grade"],
+                schools=plan["schools"],
+                sections=[section["label"] for section in plan["sections"]],
+                date=plan["date"]
+            )
+            st.success("Příprava uložena.")
+        except Exception as e:
+            st.error(f"Chyba při ukládání přípravy: {e}")
+
 
 def page_saved_plans():
     st.title("Uložené přípravy")
-    os.makedirs("output", exist_ok=True)
-    files = sorted(os.listdir("output"))
-    for fname in files:
-        with open(os.path.join("output", fname), "r", encoding="utf-8") as f:
-            content = f.read()
-        st.subheader(fname)
-        st.text_area(fname, content, height=200)
+    store = plan_store.get_plan_store()
+    col1, col2, col3 = st.columns(3)
+    query = col1.text_input("Hledat:", key="plans_query")
+    grade = col2.selectbox("Třída:", ["Vše"] + store.class_grades(), key="plans_grade")
+    school = col3.selectbox("Škola:", ["Vše"] + store.schools(), key="plans_school")
+
+    filters = (query, None if grade == "Vše" else grade, None if school == "Vše" else school)
+
+    # Seznam jen z manifestu; obsah souboru se načte až po otevření
+    _, total = store.query(*filters, limit=0)
+    if not total:
+        st.info("Žádné uložené přípravy.")
+        return
+
+    # Hromadný export všech příprav odpovídajících filtru
+    col1, col2 = st.columns([2, 1])
+    export_format = col1.radio(
+        "Formát exportu", list(plan_export.FORMATS), horizontal=True,
+        format_func=plan_export.FORMATS.get, key="plans_export_format"
+    )
+    if col2.button(f"Připravit ZIP ({total})"):
+        bar = st.progress(0.0, text="Připravuji export")
+        def report(done, count):
+            bar.progress(done / count, text=f"Zpracováno {done} z {count} příprav")
+        # Archiv se zapisuje průběžně do dočasného souboru, ne do paměti
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pripravy.zip")
+            try:
+                with open(path, "wb") as out:
+                    plan_export.export_zip(store, store.query(*filters)[0], export_format, out, progress=report)
+            except Exception as e:
+                st.error(f"Chyba při exportu příprav: {e}")
+            else:
+                # download_button přijme soubor otevřený pro čtení; obsah si
+                # Streamlit jednou načte a drží ho, dokud je tlačítko zobrazené
+                with open(path, "rb") as f:
+                    st.download_button("Stáhnout ZIP", f, file_name=f"pripravy_{export_format}.zip", mime="application/zip")
+    pages = (total + PLANS_PAGE_SIZE - 1) // PLANS_PAGE_SIZE
+    if st.session_state.get("plans_page", 1) > pages:
+        st.session_state.plans_page = pages
+    page = st.number_input(f"Stránka (z {pages}):", 1, pages, key="plans_page") if pages > 1 else 1
+    entries, _ = store.query(*filters, offset=(page - 1) * PLANS_PAGE_SIZE, limit=PLANS_PAGE_SIZE)
+    st.caption(f"Nalezeno {total} příprav")
+    for entry in entries:
+        label = f"{entry['date']} – {entry['class_grade'] or entry['title']}"
+        if entry["schools"]:
+            label += f" ({', '.join(entry['schools'])})"
+        with st.expander(label):
+            st.caption(f"{entry['name']} · {', '.join(entry['sections'])} · {entry['size'] / 1024:.1f} kB")
+            if st.toggle("Zobrazit obsah", key=f"plan_open_{entry['name']}"):
+                try:
+                    content = store.load(entry["name"])
+                except OSError as e:
+                    st.error(f"Chyba při načítání přípravy: {e}")
+                    continue
+                st.text_area(entry["name"], content, height=200)
 
 
 def page_admin_exercises():
     st.title("Administrace: Správa cviků")
-    exercises = db.get_exercises()
-    for ex in exercises:
+    search = st.text_input("Hledat v názvu a popisu", key="ex_search")
+    # Zásobník kurzorů stránek; při změně hledání začínáme znovu od první stránky
+    if st.session_state.get("ex_page_query") != search:
+        st.session_state.ex_page_query = search
+        st.session_state.ex_page_cursors = [None]
+    cursors = st.session_state.setdefault("ex_page_cursors", [None])
+    if search:
+        # Výsledky fulltextu seřazené podle relevance, bez stránkování
+        items, page = db.search_exercises(search, SEARCH_LIMIT, with_details=True), None
+    else:
+        # Sekce se načtou společně s cviky v jednom dotazu
+        page = db.get_exercises_page(ADMIN_PAGE_SIZE, cursors[-1], with_details=True)
+        items = page["items"]
+    for ex in items:
         with st.expander(ex["name"]):
             st.write(ex["description"])
-            st.write("Sekce:", ", ".join(db.get_exercise_sections(ex["id"])))
+            st.write("Sekce:", ", ".join(ex["sections"]))
             if st.button("Smazat cvik", key=f"del_{ex['id']}"):
                 db.delete_exercise(ex["id"])
+    if page is not None:
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        if col_prev.button("← Předchozí", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        col_info.write(f"Stránka {len(cursors)}")
+        if col_next.button("Další →", disabled=page["next_cursor"] is None):
+            cursors.append(page["next_cursor"])
+            st.rerun()
     st.write("---")
     st.subheader("Přidat / upravit cvik")
+    # Převzatý návrh AI se musí zapsat dřív, než vzniknou pole formuláře
+    suggestion = st.session_state.pop("ai_suggestion_apply", None)
+    if suggestion:
+        st.session_state.ex_name = str(suggestion.get("name", ""))
+        st.session_state.ex_desc = str(suggestion.get("description", ""))
     ex_id = st.text_input("ID (prázdné=nový)", key="ex_id")
     name = st.text_input("Název", key="ex_name")
     desc = st.text_area("Popis", key="ex_desc")
@@ -203,6 +358,56 @@ def page_admin_exercises():
             db.update_exercise(ex_id, name, desc, loc, mats_list, ct_payload, secs)
         else:
             db.add_exercise(name, desc, loc, mats_list, ct_payload, secs)
+    st.write("---")
+    st.subheader("Návrh cviku pomocí AI")
+    st.caption("Použije konstrukt, podkategorii, místo a materiály z formuláře výše.")
+    fresh = st.checkbox("Vždy nový návrh (bez cache)", key="ai_fresh")
+    if st.button("Navrhnout cvik"):
+        mats_list = [m.strip() for m in mats.split(",") if m.strip()]
+        chunks, extractor = ai.stream_exercise_suggestion(ct, sub, loc, mats_list, use_cache=not fresh)
+        # Text se zobrazuje průběžně, jak ho model generuje
+        st.write_stream(chunks)
+        if extractor.done:
+            st.session_state.ai_suggestion = extractor.result
+        else:
+            st.warning("Nepodařilo se extrahovat JSON z odpovědi AI.")
+    if st.session_state.get("ai_suggestion") and st.button("Převzít návrh do formuláře"):
+        st.session_state.ai_suggestion_apply = st.session_state.pop("ai_suggestion")
+        st.rerun()
+    st.write("---")
+    st.subheader("Hromadný import / export")
+    st.caption("Sloupce: " + ", ".join(exercise_io.COLUMNS) + ". Seznamy oddělujte středníkem.")
+    upload = st.file_uploader("Soubor s cviky", type=["csv", "xlsx"], key="ex_import_file")
+    if upload is not None and st.button("Importovat"):
+        file_format = upload.name.rsplit(".", 1)[-1].lower()
+        bar = st.progress(0.0, text="Import probíhá...")
+
+        def report(done, total):
+            if total:
+                bar.progress(min(done / total, 1.0), text=f"Zpracováno {done} z {total} řádků")
+            else:
+                bar.progress(0.0, text=f"Zpracováno {done} řádků")
+        result = exercise_io.import_exercises(upload, file_format, progress=report)
+        bar.progress(1.0, text="Hotovo")
+        st.success(f"Importováno {result['imported']} z {result['rows']} řádků.")
+        for line_no, error in result["errors"][:50]:
+            st.warning(f"Řádek {line_no}: {error}")
+    export_format = st.radio("Formát exportu", ["csv", "xlsx"], horizontal=True, key="ex_export_format")
+    if st.button("Připravit export"):
+        # Export se zapisuje průběžně do dočasného souboru, ne do paměti
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"cviky.{export_format}")
+            with open(path, "wb") as out:
+                if export_format == "xlsx":
+                    exercise_io.export_xlsx(out)
+                    mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                else:
+                    exercise_io.export_csv(out)
+                    mime = "text/csv"
+            # download_button přijme běžný soubor otevřený pro čtení (ne však
+            # SpooledTemporaryFile); obsah si Streamlit jednou načte sám
+            with open(path, "rb") as f:
+                st.download_button("Stáhnout export", f, file_name=f"cviky.{export_format}", mime=mime)
 
 def page_admin_resources():
     st.title("Administrace: Podklady")
@@ -221,19 +426,74 @@ def page_admin_resources():
                 db.delete_resource(r['id'])
 
 
+def page_admin_diagnostics():
+    st.title("Administrace: Diagnostika")
+    tracer = tracing.get_tracer()
+    snapshot = tracer.snapshot()
+    pages = sorted({c["page"] for c in snapshot["calls"]} | {c["page"] for c in snapshot["cache"]})
+    page = st.selectbox("Stránka:", ["Vše"] + pages, key="diag_page")
+    calls = [c for c in snapshot["calls"] if page == "Vše" or c["page"] == page]
+    if not calls:
+        st.info("Zatím nebylo změřeno žádné volání.")
+    else:
+        # Nejdražší funkce nahoře
+        st.dataframe([
+            {
+                "Stránka": c["page"], "Funkce": c["function"], "Volání": c["count"], "Chyby": c["errors"],
+                "Celkem (s)": c["seconds"], "Průměr (ms)": c["avg_ms"], "p50 (ms)": c["p50_ms"],
+                "p95 (ms)": c["p95_ms"], "Max (ms)": c["max_ms"],
+                "Velikost výsledku": round(c["payload"] / c["count"], 1),
+            }
+            for c in sorted(calls, key=lambda c: c["seconds"], reverse=True)
+        ], hide_index=True)
+
+    st.subheader("Cache")
+    cache = [c for c in snapshot["cache"] if page == "Vše" or c["page"] == page]
+    if cache:
+        st.dataframe([
+            {"Stránka": c["page"], "Cache": c["cache"], "Zásahy": c["hits"], "Minutí": c["misses"],
+             "Úspěšnost (%)": round(100 * c["hits"] / (c["hits"] + c["misses"]), 1)}
+            for c in cache
+        ], hide_index=True)
+
+    st.subheader("Poslední reruny")
+    for r in reversed(snapshot["reruns"]):
+        if page != "Vše" and r["page"] != page:
+            continue
+        with st.expander(f"#{r['id']} {r['page']} – {r['ms']:.0f} ms (databáze a AI {r['calls_ms']:.0f} ms)"):
+            st.dataframe([
+                {"Funkce": name, "Volání": c["count"], "Celkem (ms)": round(c["seconds"] * 1000, 1),
+                 "Max (ms)": c["max_ms"], "Velikost výsledku": c["payload"]}
+                for name, c in sorted(r["calls"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+            ], hide_index=True)
+
+    col1, col2, col3 = st.columns(3)
+    col1.download_button(
+        "Export Prometheus", tracer.prometheus_text(), file_name="metrics.txt", mime="text/plain"
+    )
+    col2.download_button(
+        "Export JSON", json.dumps(snapshot, ensure_ascii=False, indent=2),
+        file_name="metrics.json", mime="application/json"
+    )
+    if col3.button("Vynulovat"):
+        tracer.reset()
+        st.rerun()
+
+
 def main():
     st.sidebar.title("Tělovýchovná jednotka")
     mode = st.sidebar.selectbox("Režim:", ["Vytvoření hodiny","Administrace"], index=["Vytvoření hodiny","Administrace"].index(st.session_state.get("mode","Vytvoření hodiny")))
     st.session_state.mode = mode
     pages = {
         "Vytvoření hodiny": [page_intro, page_school_selection, page_environment_equipment, page_roles, page_exercise_constructs, page_select_exercises, page_time_allocation, page_generate_plan, page_saved_plans],
-        "Administrace": [page_admin_exercises, page_admin_resources]
+        "Administrace": [page_admin_exercises, page_admin_resources, page_admin_diagnostics]
     }
     step = st.sidebar.radio("Stránky:", [f.__name__.replace('page_','').replace('_',' ').title() for f in pages[mode]])
     for f in pages[mode]:
         name = f.__name__.replace('page_','').replace('_',' ').title()
         if name == step:
-            f()
+            with tracing.rerun(f.__name__):
+                f()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+"""
+Společné fixtury: lokální náhrada Supabase (utils.postgrest_stub) a lokální
+úložiště v dočasné složce. Testy běží bez sítě a bez .streamlit/secrets.toml.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import catalog_version, storage, supabase_client  # noqa: E402
+from utils import database as db  # noqa: E402
+from utils.postgrest_stub import PostgrestStub, serve  # noqa: E402
+from utils.sqlite_storage import SqliteStorage  # noqa: E402
+
+
+class _StubManager(supabase_client.SupabaseClientManager):
+    """Správce klienta nasměrovaný na lokální server místo secrets.toml."""
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+
+    def _settings(self):
+        return {
+            "url": self.url, "key": "local.stub.key",
+            "max_connections": 4, "max_keepalive": 2, "keepalive_expiry": 5.0, "timeout": 5.0,
+        }
+
+
+class _OfflineManager(supabase_client.SupabaseClientManager):
+    def get_client(self):
+        return None
+
+
+def _reset_caches():
+    db._resources_cache.invalidate()
+    db._search_cache.invalidate()
+    from utils import plan_engine
+    plan_engine.clear_cache()
+
+
+@pytest.fixture
+def postgrest():
+    stub = PostgrestStub()
+    server = serve(stub, port=0)
+    yield stub, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(params=["supabase", "sqlite", "json"])
+def backend(request, postgrest, tmp_path, monkeypatch):
+    """Databázová vrstva nad Supabase stubem nebo lokálním úložištěm."""
+    if request.param == "supabase":
+        manager = _StubManager(postgrest[1])
+    else:
+        manager = _OfflineManager()
+        if request.param == "sqlite":
+            local = SqliteStorage(str(tmp_path / "db.sqlite3"))
+        else:
+            local = storage.JsonStorage(str(tmp_path / "db.json"))
+        monkeypatch.setattr(storage, "_storage", local)
+    monkeypatch.setattr(supabase_client, "_manager", manager)
+    monkeypatch.setattr(
+        catalog_version, "_catalog_version",
+        catalog_version.CatalogVersion(str(tmp_path / "catalog_version.json"), check_interval=0)
+    )
+    _reset_caches()
+    yield request.param
+    _reset_caches()
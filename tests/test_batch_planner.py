@@ -0,0 +1,35 @@
+"""Snímek katalogu pro hromadné plánování."""
+from utils import batch_planner
+from utils import database as db
+
+
+def test_snapshot_reads_all_pages(backend, monkeypatch):
+    # Malá stránka nahradí limit max-rows PostgREST
+    monkeypatch.setattr(db, "SEARCH_LOAD_PAGE", 2)
+    for i in range(5):
+        assert db.add_exercise(
+            f"Cvik {i}", "Popis", "Tělocvična", [],
+            [{"construct_type": "Lokomoce", "subcategory": "Běh"}], ["main"]
+        )
+
+    snapshot = batch_planner.load_snapshot()
+
+    assert sorted(ex["name"] for ex in snapshot.values()) == [f"Cvik {i}" for i in range(5)]
+    assert all(ex["sections"] == ["main"] for ex in snapshot.values())
+    assert all(ex["categories"] == [{"construct_type": "Lokomoce", "subcategory": "Běh"}] for ex in snapshot.values())
+
+
+def test_exercise_is_used_once_per_plan():
+    sections = ["prep", "main", "final"]
+    snapshot = {
+        f"ex-{i}": {"id": f"ex-{i}", "name": f"Cvik {i}", "location": "Tělocvična", "materials": [],
+                    "sections": sections, "categories": []}
+        for i in range(8)
+    }
+    batch_planner._init_worker(snapshot, "txt")
+    spec = {"exercises_per_section": {"prep": 2, "main": 3, "final": 2}}
+    for lesson in range(4):
+        job = {"environment": "Tělocvična", "equipment": [], "lesson": lesson}
+        chosen = batch_planner.choose_exercises(job, spec)
+        ids = [ex_id for key in sections for ex_id in chosen[key]]
+        assert len(ids) == len(set(ids)) == 7
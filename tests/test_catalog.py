@@ -0,0 +1,49 @@
+"""Indexovaný katalog nad exercises.json a žurnálované úložiště."""
+import json
+import os
+
+from utils.catalog import ExerciseCatalog
+from utils.storage import JournaledJsonStorage
+
+
+def _catalog(path):
+    def load():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return ExerciseCatalog(str(path), load)
+
+
+def test_legacy_category_is_migrated_once(tmp_path):
+    path = tmp_path / "exercises.json"
+    data = {
+        "exercises": [
+            {"id": "a", "name": "Skoky", "construct_type": "Lokomoce", "subcategory": "Skoky"},
+            {"id": "b", "name": "Hod", "construct_type": "Manipulace s předměty", "subcategory": "Házení"},
+        ],
+        # Cvik "b" má kategorii i jako řádek (soubor už jednou zapsaný)
+        "categories": [{"exercise_id": "b", "construct_type": "Manipulace s předměty", "subcategory": "Házení"}],
+        "sections": [],
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    for _ in range(3):
+        data = _catalog(path).to_data()
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+    assert data["categories"] == [
+        {"exercise_id": "a", "construct_type": "Lokomoce", "subcategory": "Skoky"},
+        {"exercise_id": "b", "construct_type": "Manipulace s předměty", "subcategory": "Házení"},
+    ]
+    assert all("construct_type" not in ex for ex in data["exercises"])
+    assert [ex["id"] for ex in _catalog(path).filter("Lokomoce", "Skoky")] == ["a"]
+
+
+def test_journaled_delete_of_unknown_id_is_rejected(tmp_path):
+    local = JournaledJsonStorage(str(tmp_path / "exercises.json"))
+    ex_id = local.add_exercise({"name": "Skoky", "description": "", "location": "Hřiště", "materials": []}, [], ["main"])
+    size = os.path.getsize(local.journal_path)
+
+    assert local.delete_exercise("neexistuje") is False
+    assert os.path.getsize(local.journal_path) == size
+    assert local.delete_exercise(ex_id) is True
+    assert local.catalog.get(ex_id) is None
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from utils import catalog_version, plan_engine, storage
+from utils import database as db
+from utils.catalog_version import CatalogVersion
+
+
+def _other_replica(backend, postgrest, write):
+    """Zápis a zvýšení verze tak, jak by je provedl jiný proces."""
+    stub = postgrest[0]
+    if backend == "supabase":
+        write(stub)
+        stub._bump_catalog_version({"p_scope": write.scope})
+    else:
+        write(storage._storage)
+        CatalogVersion(catalog_version._catalog_version.path).bump(write.scope)
+
+
+def _add_resource(value):
+    def write(target):
+        if hasattr(target, "tables"):
+            target.insert("resources", {"resource_type": "Vybaveni", "value": value})
+        else:
+            target.add_resource("Vybaveni", value)
+    write.scope = "resources"
+    return write
+
+
+def _values():
+    return sorted(r["value"] for r in db.get_resources("Vybaveni"))
+
+
+def test_cache_survives_until_version_changes(backend, postgrest):
+    if backend == "json":
+        pytest.skip("JSON úložiště podklady neukládá")
+    assert db.add_resource("Vybaveni", "Míč")
+    assert _values() == ["Míč"]
+    # Zápis bez nové verze: cache (hodina TTL) ho ještě nevidí
+    _add_resource("Kužel")(postgrest[0] if backend == "supabase" else storage._storage)
+    assert _values() == ["Míč"]
+    # Jiná replika zvýší verzi: položka cache přestane platit
+    _other_replica(backend, postgrest, _add_resource("Švihadlo"))
+    assert _values() == ["Kužel", "Míč", "Švihadlo"]
+    assert db._resources_cache.stats()["stale"] >= 1
+
+
+def test_own_write_keeps_search_index(backend):
+    db.add_exercise("Slalom", "Běh mezi kužely", "Obojí", [], [], ["main"])
+    assert [e["name"] for e in db.search_exercises("slalom")] == ["Slalom"]
+    misses = db._search_cache.stats()["misses"]
+    # Vlastní zápis index aktualizuje na místě a převezme novou verzi
+    db.add_exercise("Přeskoky", "Přeskoky lavičky", "Tělocvična", [], [], ["main"])
+    assert [e["name"] for e in db.search_exercises("preskoky")] == ["Přeskoky"]
+    assert db._search_cache.stats()["misses"] == misses
+
+
+def test_foreign_write_drops_search_index_and_plans(backend, postgrest):
+    db.add_exercise("Slalom", "Běh mezi kužely", "Obojí", [], [], ["prep", "main", "final"])
+    [ex] = db.search_exercises("slalom")
+    selection = {"exercises": {key: [ex["id"]] for key, _ in plan_engine.SECTIONS}, "date": "2026-10-17"}
+    plan = plan_engine.build_plan(selection)
+    assert plan_engine.build_plan(selection) is plan
+
+    def rename(target):
+        if hasattr(target, "tables"):
+            target.update("exercises", [("id", f"eq.{ex['id']}")], {"name": "Slalom II"})
+        else:
+            target.update_exercise(ex["id"], {**ex, "name": "Slalom II"}, [], ["prep", "main", "final"])
+    rename.scope = "exercises"
+    _other_replica(backend, postgrest, rename)
+
+    assert [e["name"] for e in db.search_exercises("slalom")] == ["Slalom II"]
+    rebuilt = plan_engine.build_plan(selection)
+    assert rebuilt is not plan
+    assert rebuilt["sections"][0]["exercises"][0]["name"] == "Slalom II"
+
+
+def test_bump_through_stub_rpc_is_monotonic(postgrest, tmp_path, monkeypatch):
+    from tests.conftest import _StubManager
+    from utils import supabase_client
+    monkeypatch.setattr(supabase_client, "_manager", _StubManager(postgrest[1]))
+    version = CatalogVersion(str(tmp_path / "unused.json"), check_interval=0)
+    assert version.bump("exercises") == (0, 1)
+    assert version.bump("exercises") == (1, 2)
+    postgrest[0]._bump_catalog_version({"p_scope": "exercises"})
+    assert version.current("exercises") == 3
+    assert version.current("resources") == 0
+
+
+def test_short_ttl_without_version_table(backend, postgrest):
+    if backend != "supabase":
+        pytest.skip("verze v Supabase")
+    stub = postgrest[0]
+    del stub.tables["catalog_version"]
+    del stub.rpcs["bump_catalog_version"]
+    assert db.add_resource("Vybaveni", "Míč")
+    assert _values() == ["Míč"]
+
+    assert not catalog_version.get_catalog_version().available()
+    expires = db._resources_cache._data["all"][0]
+    assert expires - time.monotonic() <= catalog_version.UNVERSIONED_TTL
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from utils import database as db
+from utils import supabase_client
+
+
+def _seed():
+    assert db.add_exercise(
+        "Skoky přes švihadlo", "Snožmo přes švihadlo", "Tělocvična", ["švihadlo"],
+        [{"construct_type": "Lokomoce", "subcategory": "Skoky"}], ["prep", "main"]
+    )
+    assert db.add_exercise(
+        "Hod na cíl", "Hod míčkem na kužel", "Obojí", ["míček", "kužel"],
+        [{"construct_type": "Manipulace s předměty", "subcategory": "Házení"}], ["main"]
+    )
+    assert db.add_exercise(
+        "Běh v terénu", "Volný běh", "Hřiště", [],
+        [{"construct_type": "Lokomoce", "subcategory": "Běh"}], ["prep"]
+    )
+
+
+def _names(rows):
+    return sorted(r["name"] for r in rows)
+
+
+def test_filter_by_category_section_location_materials(backend):
+    _seed()
+    found = db.get_exercises("Lokomoce", "Skoky", section="prep", location="Tělocvična", materials=["švihadlo"])
+    assert _names(found) == ["Skoky přes švihadlo"]
+    assert set(found[0]) >= {"id", "name", "description", "location", "materials"}
+
+
+def test_filters_exclude_non_matching(backend):
+    _seed()
+    # Jiná podkategorie, chybějící materiál, jiné místo a jiná sekce
+    assert db.get_exercises("Lokomoce", "Běh", section="main") == []
+    assert db.get_exercises("Lokomoce", "Skoky", materials=[]) == []
+    assert db.get_exercises("Lokomoce", "Skoky", location="Hřiště") == []
+    assert db.get_exercises("Lokomoce", section="final") == []
+
+
+def test_construct_type_only_and_location_both(backend):
+    _seed()
+    assert _names(db.get_exercises("Lokomoce")) == ["Běh v terénu", "Skoky přes švihadlo"]
+    # "Obojí" vyhovuje každému místu
+    assert _names(db.get_exercises(section="main", location="Hřiště", materials=["míček", "kužel"])) == ["Hod na cíl"]
+
+
+def test_with_details_returns_sections_and_categories(backend):
+    _seed()
+    [ex] = db.get_exercises("Lokomoce", "Skoky", with_details=True)
+    assert sorted(ex["sections"]) == ["main", "prep"]
+    assert ex["categories"] == [{"construct_type": "Lokomoce", "subcategory": "Skoky"}]
+
+
+def test_responses_postpone_health_check(backend, monkeypatch):
+    manager = supabase_client.get_manager()
+    if manager.get_client() is None:
+        pytest.skip("jen se Supabase klientem")
+    checks = []
+    monkeypatch.setattr(manager, "health_check", lambda: checks.append(1) or True)
+    manager._last_ok = time.time() - supabase_client.HEALTH_CHECK_INTERVAL - 1
+    db.get_exercises()
+    assert len(checks) == 1
+    # Úspěšná odpověď posune poslední ověření, další dotazy se nekontrolují
+    assert time.time() - manager._last_ok < supabase_client.HEALTH_CHECK_INTERVAL
+    _seed()
+    db.get_exercises("Lokomoce")
+    assert len(checks) == 1
+
+
+def test_search_limit_applies_after_id_filter(backend):
+    for i in range(5):
+        assert db.add_exercise(
+            f"Běh {i}", "běh " * (5 - i), "Hřiště", [],
+            [{"construct_type": "Lokomoce", "subcategory": "Běh"}], ["prep"]
+        )
+    ranked = db.search_exercises("běh", limit=10)
+    last = ranked[-1]["id"]
+    # Nejhůř hodnocený cvik by se při limitu 2 bez filtru nedostal do výsledku
+    assert last not in {ex["id"] for ex in db.search_exercises("běh", limit=2)}
+    assert [ex["id"] for ex in db.search_exercises("běh", limit=2, ids={last})] == [last]
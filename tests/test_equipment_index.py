@@ -0,0 +1,61 @@
+"""Index vybavení musí dávat stejný výsledek jako přímý test nad cviky."""
+import random
+
+from utils.equipment_index import LOCATION_BOTH, EquipmentIndex
+
+LOCATIONS = ["Tělocvična", "Hřiště", LOCATION_BOTH]
+# Víc než 64 materiálů, aby masky měly víc slov
+MATERIALS = [f"Materiál {i}" for i in range(100)]
+
+
+def _exercises(count: int, seed: int = 7):
+    rnd = random.Random(seed)
+    return [
+        {"id": f"ex-{i}", "location": rnd.choice(LOCATIONS),
+         "materials": rnd.sample(MATERIALS, rnd.randint(0, 3))}
+        for i in range(count)
+    ]
+
+
+def _expected(exercises, location, materials):
+    found = set()
+    for ex in exercises:
+        if location == LOCATION_BOTH and ex["location"] != LOCATION_BOTH:
+            continue
+        if location and ex["location"] not in (location, LOCATION_BOTH):
+            continue
+        if materials is not None and not set(ex["materials"]) <= set(materials):
+            continue
+        found.add(ex["id"])
+    return found
+
+
+def test_matches_direct_filter_after_updates_and_rebuild():
+    exercises = _exercises(500)
+    index = EquipmentIndex(MATERIALS[:10])
+    for ex in exercises:
+        index.add(ex)
+    for ex in exercises[:50]:
+        index.remove(ex["id"])
+    exercises = exercises[50:]
+    rnd = random.Random(1)
+    queries = [(rnd.choice(LOCATIONS + [None, "Bazén"]), rnd.sample(MATERIALS, rnd.randint(0, 60)))
+               for _ in range(30)] + [(None, None), ("Hřiště", None), (None, [])]
+
+    for location, materials in queries:
+        assert index.compatible_ids(location, materials) == _expected(exercises, location, materials)
+
+    # Nové pořadí podkladů "Vybaveni" mění bity, ne výsledek
+    index.rebuild(list(reversed(MATERIALS)))
+    for location, materials in queries:
+        assert index.compatible_ids(location, materials) == _expected(exercises, location, materials)
+
+
+def test_cached_result_follows_changes():
+    index = EquipmentIndex()
+    index.add({"id": "a", "location": "Hřiště", "materials": ["Míč"]})
+    assert index.compatible_ids("Hřiště", ["Míč"]) == {"a"}
+    index.add({"id": "a", "location": "Hřiště", "materials": ["Míč", "Švihadlo"]})
+    assert index.compatible_ids("Hřiště", ["Míč"]) == set()
+    index.add({"id": "b", "location": LOCATION_BOTH, "materials": []})
+    assert index.compatible_ids("Hřiště", ["Míč"]) == {"b"}
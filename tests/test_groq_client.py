@@ -0,0 +1,94 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from utils import ai_integration as ai
+from utils import completion_cache
+from utils.groq_stub import GroqStub, serve
+
+REQUEST = {"model": ai.GROQ_MODEL, "messages": [{"role": "user", "content": "Ahoj"}], "max_tokens": 16}
+
+
+@pytest.fixture
+def groq():
+    stub = GroqStub()
+    server = serve(stub, port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/openai/v1"
+    yield stub, url
+    server.shutdown()
+
+
+def _client(url, **kwargs):
+    kwargs.setdefault("backoff", 0.001)
+    return ai.GroqClient("local.stub.key", base_url=url, **kwargs)
+
+
+def test_complete_returns_text_and_usage(groq):
+    stub, url = groq
+    client = _client(url)
+    assert client.complete(REQUEST).startswith("Odpověď lokálního serveru")
+    stats = client.stats()
+    assert stats["calls"] == 1 and stats["retries"] == 0
+    assert stats["prompt_tokens"] > 0
+
+
+def test_rate_limit_is_retried_after_retry_after(groq):
+    stub, url = groq
+    stub.rate_limit_every = 1
+    stub.retry_after = 0.3
+    client = _client(url, max_retries=1)
+    # Druhý pokus projde, až když 429 přestanou
+    original = stub.next_fault
+    stub.next_fault = lambda: 429 if original() == 429 and stub.requests == 1 else None
+    started = time.perf_counter()
+    assert client.complete(REQUEST)
+    # Retry-After má přednost před (kratším) exponenciálním čekáním
+    assert time.perf_counter() - started >= 0.3
+    assert stub.requests == 2
+    assert client.stats()["retries"] == 1
+
+
+def test_server_errors_exhaust_retries(groq):
+    stub, url = groq
+    stub.fail_every = 1
+    client = _client(url, max_retries=2)
+    with pytest.raises(ai.GroqError) as info:
+        client.complete(REQUEST)
+    assert info.value.retryable
+    assert stub.requests == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_client_errors_are_not_retried(groq):
+    stub, url = groq
+    stub.next_fault = lambda: 400
+    client = _client(url, max_retries=3)
+    with pytest.raises(ai.GroqError) as info:
+        client.complete(REQUEST)
+    assert not info.value.retryable
+    assert client.stats()["retries"] == 0
+
+
+def test_retry_after_parsing():
+    assert ai._retry_after("2.5") == 2.5
+    assert ai._retry_after("-1") == 0.0
+    assert ai._retry_after(None) is None
+    assert ai._retry_after("nesmysl") is None
+    assert 8 <= ai._retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+
+def test_partial_stream_is_not_served_as_full_answer(groq, tmp_path, monkeypatch):
+    stub, url = groq
+    monkeypatch.setattr(ai, "_groq_settings", lambda: {"api_key": "local.stub.key", "base_url": url})
+    monkeypatch.setattr(completion_cache, "_cache", completion_cache.CompletionCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(ai, "_client", None)
+    stream = ai._stream_completion("Ahoj", cache_partial=True)
+    first = next(stream)
+    stream.close()
+
+    # Začátek odpovědi dostane jen další čtení s cache_partial=True
+    assert list(ai._stream_completion("Ahoj", cache_partial=True)) == [first]
+    full = ai._request_completion("Ahoj")
+    assert full != first and full.startswith(first)
+    assert "".join(ai._stream_completion("Ahoj")) == full
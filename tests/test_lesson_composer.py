@@ -0,0 +1,57 @@
+"""Sestavení hodiny z kandidátů a doladění pořadí přes AI."""
+from utils import ai_integration as ai
+from utils.lesson_composer import compose_lesson, compose_section, refine_with_ai
+
+LESSON = {"main": [
+    {"id": 1, "name": "A", "minutes": 5},
+    {"id": 2, "name": "B", "minutes": 5},
+    {"id": 3, "name": "C", "minutes": 5},
+]}
+
+
+def _ex(ex_id, minutes, construct_type, subcategory):
+    return {"id": ex_id, "name": ex_id, "time": minutes,
+            "categories": [{"construct_type": construct_type, "subcategory": subcategory}]}
+
+
+RUNS = [_ex(f"Běh {i}", 2, "Lokomoce", "Běh") for i in range(5)]
+JUMP = _ex("Skoky", 5, "Lokomoce", "Skoky")
+STRENGTH = _ex("Silová", 5, "Zdatnost", "Silová")
+
+
+def test_section_prefers_variety_over_many_short_exercises():
+    picked = compose_section(RUNS + [JUMP, STRENGTH], 10)
+    assert sorted(ex["id"] for ex in picked) == ["Silová", "Skoky"]
+    assert sum(ex["minutes"] for ex in picked) == 10
+
+
+def test_section_covers_wanted_within_budget():
+    picked = compose_section(RUNS + [JUMP, STRENGTH], 7, {"Lokomoce": ["Běh", "Skoky"]})
+    subs = {c["subcategory"] for ex in picked for c in ex["categories"]}
+    assert subs == {"Běh", "Skoky"}
+    assert sum(ex["minutes"] for ex in picked) == 7
+
+
+def test_lesson_uses_each_exercise_once():
+    pool = RUNS + [JUMP, STRENGTH]
+    lesson = compose_lesson({"prep": pool, "main": pool, "final": pool}, {"prep": 4, "main": 10, "final": 4})
+    ids = [ex["id"] for section in lesson.values() for ex in section]
+    assert len(ids) == len(set(ids))
+    assert sorted(ex["id"] for ex in lesson["main"]) == ["Silová", "Skoky"]
+    assert [sum(ex["minutes"] for ex in lesson[s]) for s in ("prep", "main", "final")] == [4, 10, 4]
+
+
+def _refine(monkeypatch, proposal):
+    monkeypatch.setattr(ai, "optimize_exercise_plan", lambda brief, use_cache=True: proposal)
+    return [ex["name"] for ex in refine_with_ai(LESSON)["main"]]
+
+
+def test_ids_are_normalised_and_unknown_skipped(monkeypatch):
+    proposal = [{"id": "3"}, {"id": 99}, {"id": 1}, "šum", {"id": 2}, {"id": "3"}]
+    assert _refine(monkeypatch, proposal) == ["C", "A", "B"]
+
+
+def test_incomplete_reply_keeps_local_order(monkeypatch):
+    assert _refine(monkeypatch, [{"id": 3}, {"id": 1}]) == ["A", "B", "C"]
+    assert _refine(monkeypatch, [{"id": 7}, {"id": 8}, {"id": 9}]) == ["A", "B", "C"]
+    assert _refine(monkeypatch, {"id": 1}) == ["A", "B", "C"]
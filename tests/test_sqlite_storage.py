@@ -0,0 +1,64 @@
+"""Lokální SQLite úložiště: chyby zápisu, migrace a spojení."""
+import json
+import threading
+
+from utils.sqlite_storage import SqliteStorage
+
+
+def test_resource_write_errors_return_false(tmp_path):
+    local = SqliteStorage(str(tmp_path / "db.sqlite3"))
+    assert local.add_resource("Vybaveni", "Míč")
+    [resource] = local.get_all_resources()["Vybaveni"]
+    conn = local._conn()
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f"CREATE TRIGGER deny_{event.lower()} BEFORE {event} ON resources "
+            "BEGIN SELECT RAISE(ABORT, 'zápis zakázán'); END"
+        )
+
+    assert local.add_resource("Vybaveni", "Švihadlo") is False
+    assert local.update_resource(resource["id"], "Míček") is False
+    assert local.delete_resource(resource["id"]) is False
+    assert local.get_all_resources()["Vybaveni"] == [resource]
+
+
+def test_concurrent_first_open_migrates_once(tmp_path):
+    source = tmp_path / "exercises.json"
+    source.write_text(json.dumps({
+        "exercises": [{"id": "a", "name": "Skoky", "location": "Hřiště", "materials": []}],
+        "categories": [], "sections": [{"exercise_id": "a", "section_tag": "main"}],
+    }), encoding="utf-8")
+    path = str(tmp_path / "db.sqlite3")
+    SqliteStorage(path)  # schéma existuje, migrace ještě ne
+    barrier = threading.Barrier(4)
+    counts, errors = [], []
+
+    def open_storage():
+        local = SqliteStorage(path)
+        barrier.wait()
+        try:
+            counts.append(local.migrate_from_json(str(source)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_storage) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert sorted(counts) == [0, 0, 0, 1]
+    assert [ex["id"] for ex in SqliteStorage(path).get_exercises()] == ["a"]
+
+
+def test_connections_are_reused_across_threads(tmp_path):
+    local = SqliteStorage(str(tmp_path / "db.sqlite3"))
+    opened = local.connections_opened
+    for _ in range(5):
+        # Každý rerun Streamlitu běží v novém vlákně
+        t = threading.Thread(target=local.get_all_resources)
+        t.start()
+        t.join()
+    assert local.connections_opened == opened + 1
+    local.close()
@@ -0,0 +1,45 @@
+"""Měření volání, která vracejí stream."""
+import time
+
+from utils import tracing
+
+
+def _stream():
+    for part in ("ab", "cde"):
+        time.sleep(0.02)
+        yield part
+
+
+def _calls(tracer, name):
+    return [c for c in tracer.snapshot()["calls"] if c["function"] == name]
+
+
+def test_stream_returned_with_extractor_is_timed_while_read():
+    tracer = tracing.get_tracer()
+    tracer.reset()
+    suggest = tracing.traced("ai.stream_suggestion", lambda: (_stream(), "extraktor"))
+
+    chunks, extractor = suggest()
+    assert extractor == "extraktor"
+    assert _calls(tracer, "ai.stream_suggestion") == []
+    assert list(chunks) == ["ab", "cde"]
+
+    [call] = _calls(tracer, "ai.stream_suggestion")
+    assert call["count"] == 1 and call["payload"] == 5
+    assert call["max_ms"] >= 40
+
+
+def test_stream_closed_early_closes_source():
+    closed = []
+
+    def source():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    chunks = tracing.traced("ai.stream", lambda: source())()
+    assert next(chunks) == "a"
+    chunks.close()
+    assert closed == [True]
@@ -1,72 +1,557 @@
 import streamlit as st
 import json
-from typing import Dict, Any, List, Optional
-try:
-    from transformers import LlamaTokenizer, LlamaForCausalLM
-    import torch
-except ImportError:
-    LlamaTokenizer = None
-    LlamaForCausalLM = None
-    torch = None
-
-@st.cache_resource
-def load_llama_model(model_id: str = "meta-llama/Llama-3-8b-8192"):
-    """Načte a vrátí tokenizer a model Llama 3 8B s kontextovým oknem 8192."""
-    if LlamaTokenizer is None or LlamaForCausalLM is None or torch is None:
-        st.error("Nainstalujte prosím knihovny transformers a torch pomocí `pip install transformers torch`.")
-        return None, None
-    tokenizer = LlamaTokenizer.from_pretrained(model_id, use_auth_token=True)
-    model = LlamaForCausalLM.from_pretrained(
-        model_id,
-        use_auth_token=True,
-        torch_dtype=torch.float16,
-        device_map="auto",
-        max_seq_len=8192
-    )
-    return tokenizer, model
-
-def get_groq_completion(prompt: str, model: str = "llama3-8b-8192") -> Optional[str]:
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from utils.completion_cache import cache_key, get_completion_cache
+from utils.json_stream import JsonStreamExtractor
+from utils.local_inference import DEFAULT_MODEL_ID, LocalModelError, get_local_model, local_model_settings
+from utils.rate_limit import TokenBucket
+
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+# Navázání spojení má být rychlé; čtení odpovědi může trvat déle
+GROQ_CONNECT_TIMEOUT = 5
+GROQ_READ_TIMEOUT = 60
+GROQ_MAX_RETRIES = 3
+GROQ_BACKOFF = 0.5
+GROQ_POOL_SIZE = 10
+# Z kolika posledních volání se počítají percentily latence
+STATS_WINDOW = 500
+GROQ_MODEL = "llama3-8b-8192"
+GROQ_MAX_TOKENS = 1024
+GROQ_TEMPERATURE = 0.7
+# Kde se generuje: "groq" (API) nebo "local" (model na CPU, viz utils/local_inference.py);
+# výchozí lze nastavit v secrets.toml jako [ai] backend = "local"
+AI_BACKENDS = ("groq", "local")
+# Výchozí nastavení hromadného generování (lze přepsat v sekci [groq])
+BATCH_MAX_WORKERS = 4
+BATCH_RATE_PER_SECOND = 2.0
+BATCH_RETRIES = 3
+BATCH_BACKOFF = 1.0
+
+
+class GroqError(Exception):
+    """Chyba volání Groq API. retryable=True u 429 a chyb serveru/sítě."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class GroqConfigError(GroqError):
+    """Chybí nastavení [groq] v secrets.toml."""
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    # Retry-After může být i HTTP datum
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class GroqClient:
     """
-    Získá odpověď od Groq API (Llama 3 8B 8192) pomocí HTTP requestu, odpověď bude vždy v češtině.
+    Klient Groq (OpenAI-kompatibilního) API se sdíleným keep-alive poolem
+    spojení, oddělenými timeouty pro připojení a čtení a opakováním po 429
+    a chybách serveru. Zaznamenává latenci a spotřebu tokenů každého volání.
     """
-    import requests
-    import streamlit as st
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = GROQ_BASE_URL,
+        connect_timeout: float = GROQ_CONNECT_TIMEOUT,
+        read_timeout: float = GROQ_READ_TIMEOUT,
+        max_retries: int = GROQ_MAX_RETRIES,
+        backoff: float = GROQ_BACKOFF,
+        pool_size: int = GROQ_POOL_SIZE
+    ):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=STATS_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _record(self, latency: Optional[float] = None, error: bool = False, retry: bool = False) -> None:
+        with self._lock:
+            if latency is not None:
+                self.calls += 1
+                self._latencies.append(latency)
+            self.errors += error
+            self.retries += retry
+
+    def record_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Připočte spotřebu tokenů z pole `usage` odpovědi."""
+        if not usage:
+            return
+        with self._lock:
+            self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            self.completion_tokens += int(usage.get("completion_tokens") or 0)
+
+    def _send(self, data: Dict[str, Any], stream: bool) -> requests.Response:
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=data, timeout=self.timeout, stream=stream)
+        except requests.RequestException as e:
+            self._record(error=True)
+            raise GroqError(str(e), retryable=True)
+        # U streamu je to doba do hlaviček odpovědi (do prvního bajtu)
+        self._record(time.perf_counter() - start)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.close()
+            self._record(error=True)
+            raise GroqError(
+                f"HTTP {response.status_code}", retryable=True,
+                retry_after=_retry_after(response.headers.get("Retry-After"))
+            )
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            response.close()
+            self._record(error=True)
+            raise GroqError(str(e))
+        return response
+
+    def post_completion(
+        self,
+        data: Dict[str, Any],
+        stream: bool = False,
+        retries: Optional[int] = None
+    ) -> requests.Response:
+        """
+        Odešle požadavek na chat/completions. Po 429, chybě serveru nebo sítě
+        ho opakuje s exponenciálním čekáním (Retry-After od serveru má
+        přednost); poslední chybu vyhodí jako GroqError.
+        """
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                return self._send(data, stream)
+            except GroqError as e:
+                if not e.retryable or attempt == retries:
+                    raise
+                self._record(retry=True)
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+                time.sleep(max(delay, e.retry_after or 0))
+        raise GroqError("Vyčerpány pokusy")
+
+    def complete(self, data: Dict[str, Any], retries: Optional[int] = None) -> str:
+        """Nestreamované volání; vrátí text odpovědi."""
+        response = self.post_completion(data, retries=retries)
+        try:
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise GroqError(str(e))
+        self.record_usage(result.get("usage"))
+        return content
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+        if latencies:
+            stats["latency_avg"] = sum(latencies) / len(latencies)
+            stats["latency_p50"] = latencies[len(latencies) // 2]
+            stats["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[GroqClient] = None
+_client_key: Optional[Tuple[Any, ...]] = None
+_client_lock = threading.Lock()
+
+
+def _groq_settings() -> Dict[str, Any]:
     try:
-        api_key = st.secrets["groq"]["api_key"]
+        settings = dict(st.secrets["groq"])
+        settings["api_key"]
     except Exception:
-        st.error("Chybí sekce [groq] nebo položka api_key v .streamlit/secrets.toml.")
-        return None
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+        raise GroqConfigError("Chybí sekce [groq] nebo položka api_key v .streamlit/secrets.toml.")
+    return settings
+
+
+def _czech_prompt(prompt: str) -> str:
     # Přidej instrukci k promptu, aby odpověď byla v češtině
     if "česky" not in prompt.lower() and "českém jazyce" not in prompt.lower():
         prompt += "\nOdpověz česky."
-    data = {
+    return prompt
+
+
+def get_groq_client() -> GroqClient:
+    """
+    Vrátí procesově sdíleného klienta podle sekce [groq] (api_key, base_url,
+    connect_timeout, read_timeout, max_retries, pool_size). Po změně
+    nastavení se vytvoří nový.
+    """
+    global _client, _client_key
+    settings = _groq_settings()
+    key = tuple(settings.get(k) for k in (
+        "api_key", "base_url", "connect_timeout", "read_timeout", "max_retries", "pool_size"
+    ))
+    with _client_lock:
+        if _client is None or _client_key != key:
+            if _client is not None:
+                _client.close()
+            _client = GroqClient(
+                settings["api_key"],
+                base_url=settings.get("base_url", GROQ_BASE_URL),
+                connect_timeout=float(settings.get("connect_timeout", GROQ_CONNECT_TIMEOUT)),
+                read_timeout=float(settings.get("read_timeout", GROQ_READ_TIMEOUT)),
+                max_retries=int(settings.get("max_retries", GROQ_MAX_RETRIES)),
+                pool_size=int(settings.get("pool_size", GROQ_POOL_SIZE))
+            )
+            _client_key = key
+        return _client
+
+
+def get_ai_stats() -> Dict[str, Any]:
+    """Statistiky volání AI (latence, tokeny, chyby) a cache odpovědí."""
+    stats = dict(_client.stats()) if _client is not None else {}
+    stats["cache"] = get_completion_cache().stats()
+    return stats
+
+
+def _completion_request(prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    return {
         "model": model,
         "messages": [
             {"role": "user", "content": prompt}
         ],
-        "max_tokens": 1024,
-        "temperature": 0.7
+        "max_tokens": max_tokens,
+        "temperature": temperature
     }
+
+
+def _request_completion(
+    prompt: str,
+    model: str = GROQ_MODEL,
+    max_tokens: int = GROQ_MAX_TOKENS,
+    temperature: float = GROQ_TEMPERATURE,
+    use_cache: bool = True,
+    retries: Optional[int] = None
+) -> str:
+    """
+    Jako get_groq_completion, ale místo hlášení v UI vyhazuje GroqError.
+    retries přepíše počet opakování klienta (0 = bez opakování).
+    """
+    prompt = _czech_prompt(prompt)
+    key = cache_key(model, prompt, max_tokens, temperature)
+    if use_cache:
+        cached = get_completion_cache().get(key)
+        if cached is not None:
+            return cached
+    content = get_groq_client().complete(_completion_request(prompt, model, max_tokens, temperature), retries)
+    # Ukládá se i při use_cache=False, aby poslední odpověď byla k dispozici
+    get_completion_cache().set(key, model, content)
+    return content
+
+
+def _stream_completion(
+    prompt: str,
+    model: str = GROQ_MODEL,
+    max_tokens: int = GROQ_MAX_TOKENS,
+    temperature: float = GROQ_TEMPERATURE,
+    use_cache: bool = True,
+    cache_partial: bool = False
+) -> Iterator[str]:
+    """
+    Streamovaná odpověď (server-sent events) po částech textu; chyby vyhazuje
+    jako GroqError. Celá odpověď se uloží do cache. S cache_partial=True se
+    uloží i začátek odpovědi, pokud volající čtení ukončí dřív (už má, co
+    potřeboval, např. kompletní JSON). Začátek má vlastní klíč, takže ho
+    dostane jen volající, který také čte s cache_partial=True.
+    """
+    prompt = _czech_prompt(prompt)
+    key = cache_key(model, prompt, max_tokens, temperature)
+    partial_key = cache_key(model, prompt, max_tokens, temperature, partial=True)
+    if use_cache:
+        cached = get_completion_cache().get(key)
+        if cached is None and cache_partial:
+            cached = get_completion_cache().get(partial_key)
+        if cached is not None:
+            yield cached
+            return
+    data = _completion_request(prompt, model, max_tokens, temperature)
+    data["stream"] = True
+    data["stream_options"] = {"include_usage": True}
+    client = get_groq_client()
+    response = client.post_completion(data, stream=True)
+    parts: List[str] = []
+    finished = False
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+        # chunk_size=None: zpracovat data hned, jak dorazí, bez čekání na plný blok
+        for line in response.iter_lines(chunk_size=None):
+            if not line.startswith(b"data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == b"[DONE]":
+                break
+            try:
+                event = json.loads(payload)
+            except ValueError as e:
+                raise GroqError(f"Neplatná událost streamu: {e}")
+            # Spotřeba tokenů přichází v poslední události (Groq ji dává do x_groq)
+            client.record_usage(event.get("usage") or (event.get("x_groq") or {}).get("usage"))
+            if not event.get("choices"):
+                continue
+            text = event["choices"][0].get("delta", {}).get("content")
+            if text:
+                parts.append(text)
+                yield text
+        finished = True
+    except GeneratorExit:
+        if cache_partial and parts:
+            get_completion_cache().set(partial_key, model, "".join(parts))
+        raise
     except Exception as e:
+        if isinstance(e, GroqError):
+            raise
+        raise GroqError(str(e), retryable=True)
+    finally:
+        response.close()
+    if finished:
+        get_completion_cache().set(key, model, "".join(parts))
+
+
+def stream_groq_completion(
+    prompt: str,
+    model: str = GROQ_MODEL,
+    max_tokens: int = GROQ_MAX_TOKENS,
+    temperature: float = GROQ_TEMPERATURE,
+    use_cache: bool = True
+) -> Iterator[str]:
+    """
+    Jako get_groq_completion, ale vrací text průběžně po částech, jak přichází
+    ze serveru - vhodné pro st.write_stream. Chyby se zobrazí přes st.error.
+    """
+    try:
+        yield from _stream_completion(prompt, model, max_tokens, temperature, use_cache)
+    except GroqConfigError as e:
+        st.error(str(e))
+    except GroqError as e:
+        st.error(f"Chyba při volání Groq API: {e}")
+
+
+def _drain(chunks: Iterator[str]) -> bool:
+    """Dočte stream; vrací True, pokud přišel aspoň nějaký text."""
+    received = False
+    for _ in chunks:
+        received = True
+    return received
+
+
+def _stream_json(
+    prompt: str,
+    opening: str,
+    use_cache: bool,
+    backend: Optional[str] = None
+) -> Tuple[Iterator[str], JsonStreamExtractor]:
+    """Stream odpovědi, který skončí, jakmile je JSON v odpovědi kompletní."""
+    extractor = JsonStreamExtractor(opening)
+
+    def chunks() -> Iterator[str]:
+        stream = _stream_completion(prompt, use_cache=use_cache, cache_partial=True)
+        try:
+            for text in stream:
+                yield text
+                if extractor.feed(text):
+                    break
+        except GroqConfigError as e:
+            st.error(str(e))
+        except GroqError as e:
+            st.error(f"Chyba při volání Groq API: {e}")
+        finally:
+            stream.close()
+
+    def local_chunks() -> Iterator[str]:
+        # Lokální model vrací celou odpověď najednou
+        text = get_completion(prompt, backend="local", use_cache=use_cache)
+        if text:
+            extractor.feed(text)
+            yield text
+
+    if _resolve_backend(backend) == "local":
+        return local_chunks(), extractor
+    return chunks(), extractor
+
+
+def get_groq_completion(
+    prompt: str,
+    model: str = GROQ_MODEL,
+    max_tokens: int = GROQ_MAX_TOKENS,
+    temperature: float = GROQ_TEMPERATURE,
+    use_cache: bool = True
+) -> Optional[str]:
+    """
+    Získá odpověď od Groq API (Llama 3 8B 8192) pomocí HTTP requestu, odpověď bude vždy v češtině.
+    Stejný dotaz se vrací z trvalé cache (viz utils/completion_cache.py);
+    s use_cache=False se vždy pošle nový dotaz, např. když chceme jiný návrh.
+    """
+    try:
+        return _request_completion(prompt, model, max_tokens, temperature, use_cache)
+    except GroqConfigError as e:
+        st.error(str(e))
+        return None
+    except GroqError as e:
         st.error(f"Chyba při volání Groq API: {e}")
         return None
 
 
+def _resolve_backend(backend: Optional[str]) -> str:
+    if backend is None:
+        try:
+            backend = st.secrets["ai"]["backend"]
+        except Exception:
+            backend = "groq"
+    if backend not in AI_BACKENDS:
+        raise ValueError(f"Neznámý AI backend: {backend}")
+    return backend
+
+
+_local_warmed = False
+
+
+def _local_model():
+    global _local_warmed
+    model = get_local_model()
+    if not _local_warmed:
+        # Společný začátek návrhů cviků se přes model pošle jen jednou
+        model.warm_prefix(EXERCISE_PROMPT_PREFIX)
+        _local_warmed = True
+    return model
+
+
+def _local_completions(
+    prompts: List[str],
+    max_tokens: int = GROQ_MAX_TOKENS,
+    temperature: float = GROQ_TEMPERATURE,
+    use_cache: bool = True
+) -> List[str]:
+    """Odpovědi lokálního modelu; chybějící v cache se vygenerují v dávkách."""
+    prompts = [_czech_prompt(p) for p in prompts]
+    # Klíč podle nastavení, aby zásah do cache nevyžadoval načtení modelu
+    model_id = "local:" + local_model_settings().get("model_id", DEFAULT_MODEL_ID)
+    cache = get_completion_cache()
+    keys = [cache_key(model_id, p, max_tokens, temperature) for p in prompts]
+    results: List[Optional[str]] = [cache.get(k) if use_cache else None for k in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        generated = _local_model().generate([prompts[i] for i in missing], max_tokens, temperature)
+        for i, text in zip(missing, generated):
+            results[i] = text
+            cache.set(keys[i], model_id, text)
+    return results
+
+
+def get_completion(
+    prompt: str,
+    backend: Optional[str] = None,
+    max_tokens: int = GROQ_MAX_TOKENS,
+    temperature: float = GROQ_TEMPERATURE,
+    use_cache: bool = True
+) -> Optional[str]:
+    """
+    Společné rozhraní pro Groq API i lokální model.
+
+    Args:
+        backend: "groq", "local" nebo None (podle [ai] backend v secrets.toml, jinak "groq")
+    """
+    if _resolve_backend(backend) == "groq":
+        return get_groq_completion(prompt, max_tokens=max_tokens, temperature=temperature, use_cache=use_cache)
+    try:
+        return _local_completions([prompt], max_tokens, temperature, use_cache)[0]
+    except LocalModelError as e:
+        st.error(str(e))
+    except Exception as e:
+        st.error(f"Chyba lokálního modelu: {e}")
+    return None
+
+
+# Společný začátek všech promptů pro návrh cviku; parametry jsou až na konci,
+# aby lokální model mohl KV cache tohoto začátku sdílet mezi prompty
+EXERCISE_PROMPT_PREFIX = """
+    Navrhni cvik pro školní tělovýchovnou hodinu.
+    
+    Odpověz ve formátu JSON s následujícími klíči:
+    - name: Název cviku (krátký a výstižný)
+    - description: Detailní popis cviku včetně provedení
+    - time: Doporučený čas v minutách (pouze číslo)
+    
+    Příklad odpovědi:
+    {
+        "name": "Člunkový běh",
+        "description": "Rozmístěte kužely do řady s rozestupy 5 metrů. Žáci startují od prvého kuželu, běží k druhému, dotknou se ho, vrátí se k prvému, dotknou se ho, běží ke třetímu atd.",
+        "time": 5
+    }
+    
+    Parametry cviku:
+"""
+
+
+def _exercise_prompt(construct_type: str, subcategory: str, location: str, materials: Optional[List[str]]) -> str:
+    materials_text = ", ".join(materials) if materials else "žádné"
+    return EXERCISE_PROMPT_PREFIX + f"""    - Cvičební konstrukt: {construct_type}
+    - Podkategorie: {subcategory}
+    - Místo: {location}
+    - Dostupné materiály: {materials_text}
+    """
+
+
+def _parse_exercise(response: str) -> Dict[str, Any]:
+    """Vytáhne JSON cviku z odpovědi AI (může být obklopen dalším textem)."""
+    json_start = response.find("{")
+    json_end = response.rfind("}") + 1
+    if json_start < 0 or json_end <= json_start:
+        raise ValueError("Nepodařilo se extrahovat JSON z odpovědi AI.")
+    return json.loads(response[json_start:json_end])
+
+
 def generate_exercise_suggestion(
     construct_type: str, 
     subcategory: str, 
     location: str, 
-    materials: List[str] = None
+    materials: List[str] = None,
+    use_cache: bool = True,
+    backend: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Vygeneruje návrh cviku pomocí AI.
@@ -76,60 +561,175 @@ def generate_exercise_suggestion(
         subcategory: Podkategorie konstruktu
         location: Místo (Tělocvična, Hřiště, Obojí)
         materials: Seznam dostupného materiálu
+        use_cache: False = vždy nový návrh místo uloženého
+        backend: "groq", "local" nebo None (výchozí z nastavení)
         
     Returns:
         Slovník s návrhem cviku nebo prázdný slovník v případě chyby
     """
-    # Sestavení promptu
-    materials_text = ", ".join(materials) if materials else "žádné"
-    
-    prompt = f"""
-    Navrhni cvik pro školní tělovýchovnou hodinu s následujícími parametry:
-    - Cvičební konstrukt: {construct_type}
-    - Podkategorie: {subcategory}
-    - Místo: {location}
-    - Dostupné materiály: {materials_text}
-    
-    Odpověz ve formátu JSON s následujícími klíči:
-    - name: Název cviku (krátký a výstižný)
-    - description: Detailní popis cviku včetně provedení
-    - time: Doporučený čas v minutách (pouze číslo)
-    
-    Příklad odpovědi:
-    {{
-        "name": "Člunkový běh",
-        "description": "Rozmístěte kužely do řady s rozestupy 5 metrů. Žáci startují od prvého kuželu, běží k druhému, dotknou se ho, vrátí se k prvému, dotknou se ho, běží ke třetímu atd.",
-        "time": 5
-    }}
-    """
-    
-    # Získání odpovědi z AI
-    response = get_groq_completion(prompt)
-    if not response:
+    chunks, extractor = stream_exercise_suggestion(construct_type, subcategory, location, materials, use_cache, backend)
+    # Prázdný stream = chyba volání, ta už byla zobrazena
+    if not _drain(chunks):
         return {}
-    
-    # Zpracování odpovědi
+    if extractor.done:
+        return extractor.result
+    if extractor.error:
+        st.error(f"Chyba při zpracování odpovědi AI: {extractor.error}")
+    else:
+        st.warning("Nepodařilo se extrahovat JSON z odpovědi AI.")
+    return {}
+
+
+def stream_exercise_suggestion(
+    construct_type: str,
+    subcategory: str,
+    location: str,
+    materials: List[str] = None,
+    use_cache: bool = True,
+    backend: Optional[str] = None
+) -> Tuple[Iterator[str], JsonStreamExtractor]:
+    """
+    Streamovaná varianta generate_exercise_suggestion.
+
+    Returns:
+        (generátor textu pro st.write_stream, extraktor) - po dočtení
+        generátoru je návrh v extractor.result (extractor.done == True)
+    """
+    prompt = _exercise_prompt(construct_type, subcategory, location, materials)
+    return _stream_json(prompt, "{", use_cache, backend)
+
+
+def _suggest_with_retry(
+    spec: Dict[str, Any],
+    bucket: TokenBucket,
+    retries: int,
+    backoff: float,
+    use_cache: bool
+) -> Dict[str, Any]:
+    prompt = _exercise_prompt(spec["construct_type"], spec["subcategory"], spec["location"], spec.get("materials"))
+    if use_cache:
+        # Odpověď z cache nespotřebuje žeton limitu
+        cached = get_completion_cache().get(cache_key(GROQ_MODEL, _czech_prompt(prompt), GROQ_MAX_TOKENS, GROQ_TEMPERATURE))
+        if cached is not None:
+            return _parse_exercise(cached)
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            # Opakuje se zde, aby si každý pokus vzal žeton limitu
+            return _parse_exercise(_request_completion(prompt, use_cache=False, retries=0))
+        except GroqError as e:
+            if not e.retryable or attempt == retries:
+                raise
+            # Exponenciální čekání s rozptylem; Retry-After od serveru má přednost
+            delay = backoff * (2 ** attempt) * (1 + random.random() / 2)
+            time.sleep(max(delay, e.retry_after or 0))
+    raise GroqError("Vyčerpány pokusy")
+
+
+def generate_exercise_suggestions_batch(
+    specs: Iterable[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    rate_per_second: Optional[float] = None,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    use_cache: bool = True,
+    backend: Optional[str] = None
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], Optional[str]]]:
+    """
+    Vygeneruje návrhy cviků pro více zadání souběžně.
+
+    Args:
+        specs: Zadání se stejnými klíči jako parametry generate_exercise_suggestion
+            (construct_type, subcategory, location, materials)
+        max_workers: Počet souběžných požadavků
+        rate_per_second: Nejvýše tolik požadavků za sekundu (token bucket)
+        retries: Počet opakování po 429, chybě serveru nebo sítě
+        backoff: Základ exponenciálního čekání mezi pokusy (s)
+        use_cache: False = vždy nové návrhy
+        backend: "groq", "local" nebo None; lokální model generuje po dávkách
+            v jednom vlákně (max_workers, rate a retries se neuplatní)
+
+    Yields:
+        (zadání, návrh cviku, None) nebo (zadání, {}, popis chyby)
+        v pořadí, v jakém jednotlivé požadavky doběhnou
+    """
+    if _resolve_backend(backend) == "local":
+        yield from _local_suggestions_batch(list(specs), use_cache)
+        return
     try:
-        # Extrakce JSON z odpovědi (může být obklopena dalším textem)
-        json_start = response.find("{")
-        json_end = response.rfind("}") + 1
-        if json_start >= 0 and json_end > json_start:
-            json_str = response[json_start:json_end]
-            exercise = json.loads(json_str)
-            return exercise
-        else:
-            st.warning("Nepodařilo se extrahovat JSON z odpovědi AI.")
-            return {}
-    except Exception as e:
-        st.error(f"Chyba při zpracování odpovědi AI: {e}")
-        return {}
+        settings = dict(st.secrets["groq"])
+    except Exception:
+        settings = {}
+    max_workers = max_workers or int(settings.get("batch_max_workers", BATCH_MAX_WORKERS))
+    rate = rate_per_second or float(settings.get("batch_rate_per_second", BATCH_RATE_PER_SECOND))
+    retries = int(settings.get("batch_retries", BATCH_RETRIES)) if retries is None else retries
+    backoff = float(settings.get("batch_backoff", BATCH_BACKOFF)) if backoff is None else backoff
+    bucket = TokenBucket(rate, capacity=max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="groq-batch") as pool:
+        futures = {
+            pool.submit(_suggest_with_retry, spec, bucket, retries, backoff, use_cache): spec
+            for spec in specs
+        }
+        try:
+            for future in as_completed(futures):
+                spec = futures[future]
+                try:
+                    yield spec, future.result(), None
+                except Exception as e:
+                    yield spec, {}, str(e)
+        finally:
+            # Při předčasném ukončení se nezačaté požadavky už neodešlou
+            for future in futures:
+                future.cancel()
+
+
+def _local_suggestions_batch(
+    specs: List[Dict[str, Any]],
+    use_cache: bool
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], Optional[str]]]:
+    step = int(local_model_settings().get("max_batch", 4))
+    for start in range(0, len(specs), step):
+        chunk = specs[start:start + step]
+        prompts = [
+            _exercise_prompt(s["construct_type"], s["subcategory"], s["location"], s.get("materials"))
+            for s in chunk
+        ]
+        try:
+            responses = _local_completions(prompts, use_cache=use_cache)
+        except Exception as e:
+            for spec in chunk:
+                yield spec, {}, str(e)
+            continue
+        for spec, response in zip(chunk, responses):
+            try:
+                yield spec, _parse_exercise(response), None
+            except ValueError as e:
+                yield spec, {}, str(e)
+
+
+def all_suggestion_specs(locations: List[str], material_sets: List[List[str]]) -> List[Dict[str, Any]]:
+    """Zadání pro všechny kombinace konstruktu, podkategorie, místa a sady materiálu."""
+    from utils.database import get_construct_types, get_subcategories
+    return [
+        {"construct_type": ct, "subcategory": sub, "location": loc, "materials": list(mats)}
+        for ct in get_construct_types()
+        for sub in get_subcategories(ct)
+        for loc in locations
+        for mats in material_sets
+    ]
 
-def optimize_exercise_plan(exercises: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def optimize_exercise_plan(
+    exercises: List[Dict[str, Any]],
+    use_cache: bool = True,
+    backend: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Optimalizuje plán cvičení pomocí AI.
     
     Args:
         exercises: Seznam cviků
+        use_cache: False = vždy nová optimalizace místo uložené
+        backend: "groq", "local" nebo None (výchozí z nastavení)
         
     Returns:
         Optimalizovaný seznam cviků
@@ -146,23 +746,14 @@ def optimize_exercise_plan(exercises: List[Dict[str, Any]]) -> List[Dict[str, An
     Odpověz ve formátu JSON jako seznam cviků se stejnou strukturou jako vstup.
     """
     
-    # Získání odpovědi z AI
-    response = get_groq_completion(prompt)
-    if not response:
-        return exercises
-    
-    # Zpracování odpovědi
-    try:
-        # Extrakce JSON z odpovědi
-        json_start = response.find("[")
-        json_end = response.rfind("]") + 1
-        if json_start >= 0 and json_end > json_start:
-            json_str = response[json_start:json_end]
-            optimized_exercises = json.loads(json_str)
-            return optimized_exercises
-        else:
-            st.warning("Nepodařilo se extrahovat JSON z odpovědi AI.")
-            return exercises
-    except Exception as e:
-        st.error(f"Chyba při zpracování odpovědi AI: {e}")
+    # Odpověď se čte jen do uzavření JSON seznamu
+    chunks, extractor = _stream_json(prompt, "[", use_cache, backend)
+    if not _drain(chunks):
         return exercises
+    if extractor.done:
+        return extractor.result
+    if extractor.error:
+        st.error(f"Chyba při zpracování odpovědi AI: {extractor.error}")
+    else:
+        st.warning("Nepodařilo se extrahovat JSON z odpovědi AI.")
+    return exercises
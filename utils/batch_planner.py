@@ -0,0 +1,266 @@
+"""
+Hromadné generování příprav z příkazové řádky.
+
+Specifikace (JSON) určuje školy, třídy, prostředí a sady vybavení; pro
+každou kombinaci (a každou hodinu z `lessons`) vznikne jedna příprava.
+Katalog cviků se načte jednou přes `utils/database.py` a stejný snímek
+dostanou všechny pracovní procesy. Spuštění:
+
+    python -m utils.batch_planner spec.json --format pdf --workers 4
+
+Příklad specifikace (povinné jsou jen schools a class_grades):
+
+    {
+        "schools": ["ZŠ Komenského", {"name": "ZŠ Husova", "category": "Sportovní"}],
+        "class_grades": ["3. třída", "4. třída"],
+        "environments": ["Tělocvična", "Hřiště"],
+        "equipment_sets": [["Míč", "Kužely"], []],
+        "constructs": {"Lokomoce": ["Běh", "Skoky"], "Zdatnost": []},
+        "exercises_per_section": {"prep": 2, "main": 3, "final": 1},
+        "times": {"prep": 10, "main": 25, "final": 10},
+        "leaders": {"main": "Učitel", "final": "Oba"},
+        "lessons": 12,
+        "date": "2026-09-01"
+    }
+
+Prázdný seznam podkategorií u konstruktu znamená všechny jeho podkategorie.
+Textové přípravy se uloží přes `PlanStore` (objeví se v Uložených
+přípravách), PDF se zapíší vedle nich do stejné složky.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as date_cls
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import pdf_export, plan_engine
+from utils.equipment_index import LOCATION_BOTH
+from utils.plan_store import OUTPUT_DIR, PlanStore
+
+DEFAULT_PER_SECTION = {"prep": 2, "main": 3, "final": 1}
+DEFAULT_ENVIRONMENTS = ["Tělocvična"]
+# Konstrukty z databáze -> klíče výběru v plan_engine
+CONSTRUCT_KEYS = {"Zdatnost": "fitness", "Manipulace s předměty": "manipulation", "Lokomoce": "locomotion"}
+
+# Snímek katalogu v pracovním procesu (nastaví _init_worker) a kandidáti
+# podle (část, prostředí, vybavení) - stejná kombinace se filtruje jen jednou
+_snapshot: Dict[str, Dict[str, Any]] = {}
+_candidates: Dict[Tuple[str, str, Tuple[str, ...]], List[Dict[str, Any]]] = {}
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    for key in ("schools", "class_grades"):
+        if not spec.get(key):
+            raise ValueError(f"Specifikace musí obsahovat neprázdné '{key}'.")
+    return spec
+
+
+def expand_jobs(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Všechny kombinace škola × třída × prostředí × vybavení × hodina."""
+    schools = [s if isinstance(s, dict) else {"name": s} for s in spec["schools"]]
+    combos = itertools.product(
+        schools,
+        spec["class_grades"],
+        spec.get("environments") or DEFAULT_ENVIRONMENTS,
+        spec.get("equipment_sets") or [[]],
+        range(int(spec.get("lessons", 1))),
+    )
+    return [
+        {"index": i, "school": school, "class_grade": grade, "environment": env,
+         "equipment": list(equipment), "lesson": lesson}
+        for i, (school, grade, env, equipment, lesson) in enumerate(combos)
+    ]
+
+
+def load_snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    Celý katalog se sekcemi a kategoriemi: {id: cvik}. Načítá se po
+    stránkách (db.SEARCH_LOAD_PAGE), aby ho neuřízl limit max-rows PostgREST.
+    """
+    from utils import database as db
+
+    snapshot: Dict[str, Dict[str, Any]] = {}
+    cursor = None
+    while True:
+        page = db.get_exercises_page(db.SEARCH_LOAD_PAGE, cursor, with_details=True)
+        for ex in page["items"]:
+            snapshot[ex["id"]] = ex
+        cursor = page["next_cursor"]
+        if not cursor:
+            return snapshot
+
+
+def _init_worker(snapshot: Dict[str, Dict[str, Any]], fmt: str) -> None:
+    global _snapshot
+    _snapshot = snapshot
+    _candidates.clear()
+    if fmt == "pdf":
+        pdf_export.load_fonts()
+
+
+def _snapshot_loader(exercise_ids: List[str]) -> List[Dict[str, Any]]:
+    return [_snapshot[ex_id] for ex_id in exercise_ids if ex_id in _snapshot]
+
+
+def _matches(ex: Dict[str, Any], section: str, job: Dict[str, Any], constructs: Dict[str, List[str]]) -> bool:
+    if section not in ex["sections"]:
+        return False
+    if ex.get("location") not in (job["environment"], LOCATION_BOTH):
+        return False
+    if not set(ex.get("materials") or []) <= set(job["equipment"]):
+        return False
+    if constructs:
+        return any(
+            c["construct_type"] in constructs
+            and (not constructs[c["construct_type"]] or c["subcategory"] in constructs[c["construct_type"]])
+            for c in ex["categories"]
+        )
+    return True
+
+
+def candidates(job: Dict[str, Any], section: str, constructs: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Cviky ze snímku vhodné pro část hodiny, seřazené podle (název, id)."""
+    key = (section, job["environment"], tuple(sorted(job["equipment"])))
+    if key not in _candidates:
+        found = [ex for ex in _snapshot.values() if _matches(ex, section, job, constructs)]
+        _candidates[key] = sorted(found, key=lambda ex: (ex["name"], ex["id"]))
+    return _candidates[key]
+
+
+def choose_exercises(job: Dict[str, Any], spec: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Vybere cviky pro každou část; další hodiny stejné kombinace berou
+    další cviky v pořadí, aby se v průběhu pololetí střídaly. Cvik vhodný
+    pro více částí se v jedné přípravě objeví jen jednou.
+    """
+    constructs = spec.get("constructs") or {}
+    per_section = {**DEFAULT_PER_SECTION, **(spec.get("exercises_per_section") or {})}
+    chosen = {}
+    used = set()
+    for key, label in plan_engine.SECTIONS:
+        pool = [ex for ex in candidates(job, key, constructs) if ex["id"] not in used]
+        if not pool:
+            raise ValueError(f"Žádné vhodné cviky pro {label.lower()}.")
+        count = min(int(per_section[key]), len(pool))
+        start = job["lesson"] * count
+        chosen[key] = [pool[(start + i) % len(pool)]["id"] for i in range(count)]
+        used.update(chosen[key])
+    return chosen
+
+
+def job_selection(job: Dict[str, Any], spec: Dict[str, Any]) -> Dict[str, Any]:
+    school = job["school"]
+    constructs = spec.get("constructs") or {}
+    return {
+        "class_grade": job["class_grade"],
+        "schools": [school["name"]],
+        "school_category": {school["name"]: school["category"]} if school.get("category") else {},
+        "constructs": {
+            CONSTRUCT_KEYS[ct]: list(subs) for ct, subs in constructs.items() if ct in CONSTRUCT_KEYS
+        },
+        "environment": job["environment"],
+        "equipment": job["equipment"],
+        "leaders": {**plan_engine.DEFAULT_LEADERS, **(spec.get("leaders") or {})},
+        "exercises": choose_exercises(job, spec),
+        "times": {**plan_engine.DEFAULT_TIMES, **(spec.get("times") or {})},
+        "date": spec.get("date") or date_cls.today().isoformat(),
+    }
+
+
+def _run_job(args: Tuple[Dict[str, Any], Dict[str, Any], str, str]) -> Dict[str, Any]:
+    """Sestaví jednu přípravu v pracovním procesu; PDF rovnou zapíše."""
+    job, spec, fmt, out_dir = args
+    try:
+        plan = plan_engine.build_plan(job_selection(job, spec), loader=_snapshot_loader, use_cache=False)
+    except ValueError as e:
+        return {"job": job, "error": str(e)}
+    result = {"job": job, "plan": {k: plan[k] for k in ("text", "class_grade", "schools", "date")},
+              "sections": [s["label"] for s in plan["sections"]]}
+    if fmt == "pdf":
+        slug = "_".join(
+            "".join(ch if ch.isalnum() else "-" for ch in part)
+            for part in (job["school"]["name"], job["class_grade"], job["environment"])
+        )
+        name = f"priprava_{plan['date']}_{slug}_{job['lesson'] + 1:02d}_{job['index']:05d}.pdf"
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(pdf_export.render_plan_pdf(plan["text"]))
+        result["file"] = name
+        del result["plan"]["text"]
+    return result
+
+
+def run_batch(
+    spec: Dict[str, Any],
+    fmt: str = "txt",
+    out_dir: str = OUTPUT_DIR,
+    max_workers: Optional[int] = None,
+    snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Vygeneruje všechny přípravy ze specifikace.
+
+    Returns:
+        {"plans": počet, "errors": [(job, chyba)], "files": [názvy souborů]}
+    """
+    if fmt not in ("txt", "pdf"):
+        raise ValueError(f"Neznámý formát: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    snapshot = load_snapshot() if snapshot is None else snapshot
+    jobs = expand_jobs(spec)
+    tasks = [(job, spec, fmt, out_dir) for job in jobs]
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        _init_worker(snapshot, fmt)
+        results = [_run_job(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot, fmt)) as pool:
+            results = list(pool.map(_run_job, tasks, chunksize=chunksize))
+
+    errors = [(r["job"], r["error"]) for r in results if "error" in r]
+    done = [r for r in results if "error" not in r]
+    if fmt == "txt":
+        entries = PlanStore(out_dir).save_many([
+            (r["plan"]["text"], {
+                "class_grade": r["plan"]["class_grade"], "schools": r["plan"]["schools"],
+                "sections": r["sections"], "date": r["plan"]["date"],
+            })
+            for r in done
+        ])
+        files = [e["name"] for e in entries]
+    else:
+        files = [r["file"] for r in done]
+    return {"plans": len(done), "errors": errors, "files": files}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hromadné generování příprav ze specifikace")
+    parser.add_argument("spec", help="JSON soubor se specifikací")
+    parser.add_argument("--format", choices=["txt", "pdf"], default="txt")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="cílová složka (výchozí output/)")
+    parser.add_argument("--workers", type=int, help="počet procesů (výchozí počet CPU)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        spec = load_spec(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"CHYBA: {e}")
+        sys.exit(2)
+    result = run_batch(spec, args.format, args.out, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"Vytvořeno {result['plans']} příprav do {args.out} za {elapsed:.1f} s")
+    for job, error in result["errors"]:
+        print(f"CHYBA: {job['school']['name']}, {job['class_grade']}, {job['environment']}, "
+              f"hodina {job['lesson'] + 1}: {error}")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
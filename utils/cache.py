@@ -0,0 +1,110 @@
+"""
+Jednoduchá procesová cache s časovou platností (TTL).
+
+Slouží pro data, která se mění zřídka (podklady, katalog), aby se při každém
+rerunu Streamlitu nemusela znovu stahovat ze sítě. Zápisy v `utils/database.py`
+cache po změně ihned zneplatní. S funkcí `version` (verze katalogu, viz
+`utils/catalog_version.py`) platí položka jen pro verzi, se kterou byla
+načtena, takže se projeví i zápisy z jiných procesů.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from utils.tracing import record_cache
+
+
+class TTLCache:
+    """Slovník hodnot s časovou platností, sdílený mezi vlákny."""
+
+    def __init__(
+        self,
+        ttl: Union[float, Callable[[], float]],
+        name: str = "cache",
+        version: Optional[Callable[[], int]] = None
+    ):
+        # TTL může být i funkce (zjistí se při každém uložení)
+        self.ttl = ttl
+        self.name = name
+        self.version = version
+        self._lock = threading.RLock()
+        # Zámky pro jednotlivé klíče, aby se stejná data nenačítala souběžně vícekrát
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._data: Dict[Hashable, Tuple[float, Any, Optional[int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _version(self) -> Optional[int]:
+        # Mimo zámek cache - zjištění verze se může ptát databáze
+        return self.version() if self.version else None
+
+    @staticmethod
+    def _valid(item: Optional[Tuple[float, Any, Optional[int]]], version: Optional[int]) -> bool:
+        return item is not None and item[0] > time.monotonic() and item[2] == version
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        version = self._version()
+        with self._lock:
+            item = self._data.get(key)
+            if self._valid(item, version):
+                self.hits += 1
+                record_cache(self.name, True)
+                return item[1]
+            if item is not None and item[2] != version:
+                self.stale += 1
+            self.misses += 1
+            record_cache(self.name, False)
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, version: Optional[int] = None) -> None:
+        """Uloží hodnotu; `version` je verze, se kterou byla načtena (výchozí aktuální)."""
+        if version is None:
+            version = self._version()
+        if ttl is None:
+            ttl = self.ttl() if callable(self.ttl) else self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value, version)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Vrátí hodnotu z cache, případně ji načte voláním `loader` a uloží."""
+        marker = object()
+        value = self.get(key, marker)
+        if value is not marker:
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Mezitím ji mohlo načíst jiné vlákno
+            version = self._version()
+            with self._lock:
+                item = self._data.get(key)
+                if self._valid(item, version):
+                    return item[1]
+            # Verze zjištěná před načtením: zápis během načítání položku zneplatní
+            value = loader()
+            self.set(key, value, version=version)
+            return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Zneplatní jeden klíč, nebo bez argumentu celou cache."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def adopt_version(self, previous: Optional[int], current: Optional[int]) -> None:
+        """
+        Po vlastním zápisu, který už položky promítly (např. index
+        aktualizovaný na místě), je převede z verze `previous` na `current`.
+        """
+        with self._lock:
+            for key, (expires, value, version) in list(self._data.items()):
+                if version == previous:
+                    self._data[key] = (expires, value, current)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": self.name, "entries": len(self._data), "hits": self.hits,
+                    "misses": self.misses, "stale": self.stale}
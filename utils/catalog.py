@@ -0,0 +1,325 @@
+"""
+Indexovaný katalog cviků v paměti pro lokální JSON fallback.
+
+Soubor se načte jednou za proces a znovu až tehdy, když se změní jeho
+mtime nebo velikost. Nad cviky se drží hash indexy podle id, podle dvojice
+(construct_type, subcategory) a podle section_tag, takže filtrované dotazy
+stojí O(výsledek) místo O(katalog). Místo a vybavení se testují najednou
+nad poli bitových masek `EquipmentIndex`.
+
+Volitelně katalog sleduje i žurnál změn (jeden JSON záznam na řádek, viz
+`JournaledJsonStorage`): při čtení se dočtou jen nově připsané záznamy
+a aplikují se na indexy inkrementálně.
+"""
+import bisect
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.equipment_index import LOCATION_BOTH, EquipmentIndex
+
+# Pole kategorie u cviku ze starších verzí exercises.json
+LEGACY_CATEGORY_FIELDS = ("construct_type", "subcategory")
+
+
+class ExerciseCatalog:
+    """Katalog cviků načtený ze souboru s indexy pro rychlé filtrování."""
+
+    def __init__(
+        self,
+        path: str,
+        loader: Callable[[], Dict[str, Any]],
+        journal_path: Optional[str] = None
+    ):
+        self.path = path
+        self.journal_path = journal_path
+        self._loader = loader
+        self._lock = threading.RLock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        # (inode, přečtená pozice) žurnálu
+        self._journal_ino: Optional[int] = None
+        self._journal_offset = 0
+        self._loaded = False
+        # Pořadí materiálů z podkladů "Vybaveni" pro index vybavení
+        self._equipment_order: List[str] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._pos: Dict[str, int] = {}
+        self._next_pos = 0
+        self._by_category: Dict[Tuple[str, str], Set[str]] = {}
+        self._by_construct: Dict[str, Set[str]] = {}
+        self._by_subcategory: Dict[str, Set[str]] = {}
+        self._by_section: Dict[str, Set[str]] = {}
+        self._sections_of: Dict[str, List[str]] = {}
+        self._equipment = EquipmentIndex(self._equipment_order)
+        # Seřazené klíče (name, id) pro stránkování; None = je třeba přestavět
+        self._name_keys: Optional[List[Tuple[str, str]]] = None
+        self._name_ids: List[Any] = []
+        self._categories_of: Dict[str, List[Dict[str, str]]] = {}
+
+    # --- Načítání a invalidace ---
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def invalidate(self) -> None:
+        """Vynutí opětovné načtení při příštím dotazu."""
+        with self._lock:
+            self._loaded = False
+
+    def _journal_stat(self) -> Optional[Tuple[int, int]]:
+        if not self.journal_path:
+            return None
+        try:
+            info = os.stat(self.journal_path)
+        except OSError:
+            return None
+        return (info.st_ino, info.st_size)
+
+    def _journal_current(self) -> bool:
+        jstat = self._journal_stat()
+        if jstat is None:
+            return self._journal_ino is None
+        return jstat == (self._journal_ino, self._journal_offset)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded and self._file_stamp() == self._stamp and self._journal_current():
+            return
+        with self._lock:
+            stamp = self._file_stamp()
+            if self._loaded and stamp == self._stamp:
+                jstat = self._journal_stat()
+                if jstat is not None and jstat[0] == self._journal_ino and jstat[1] >= self._journal_offset:
+                    # Snapshot se nezměnil, stačí dočíst konec žurnálu
+                    self._replay_journal()
+                    return
+                if jstat is None and self._journal_ino is None:
+                    return
+            self._build(self._loader())
+            self._stamp = stamp
+            self._journal_ino = None
+            self._journal_offset = 0
+            self._replay_journal()
+            self._loaded = True
+
+    def _replay_journal(self) -> None:
+        """Aplikuje záznamy žurnálu od poslední přečtené pozice."""
+        if not self.journal_path:
+            return
+        try:
+            with open(self.journal_path, "rb") as f:
+                ino = os.fstat(f.fileno()).st_ino
+                if ino != self._journal_ino:
+                    self._journal_ino = ino
+                    self._journal_offset = 0
+                f.seek(self._journal_offset)
+                chunk = f.read()
+        except OSError:
+            self._journal_ino = None
+            self._journal_offset = 0
+            return
+        # Poslední řádek může být rozepsaný - zpracuje se až při dalším čtení
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self.apply(json.loads(line))
+        self._journal_offset += end
+
+    def _build(self, data: Dict[str, Any]) -> None:
+        self._reset()
+        for ex in data.get("exercises", []):
+            self._add_exercise(ex)
+        for c in data.get("categories", []):
+            self._add_category(c["exercise_id"], c.get("construct_type"), c.get("subcategory"))
+        for s in data.get("sections", []):
+            self._add_section(s["exercise_id"], s["section_tag"])
+
+    # --- Údržba indexů ---
+
+    def _add_exercise(self, ex: Dict[str, Any]) -> None:
+        # Starší záznamy mohou mít konstrukt přímo u cviku: převede se na
+        # řádek kategorie a pole z cviku zmizí, aby ho to_data nezapsalo dvakrát
+        legacy = None
+        if any(field in ex for field in LEGACY_CATEGORY_FIELDS):
+            legacy = (ex.get("construct_type"), ex.get("subcategory"))
+            ex = {k: v for k, v in ex.items() if k not in LEGACY_CATEGORY_FIELDS}
+        ex_id = ex["id"]
+        self._by_id[ex_id] = ex
+        self._equipment.add(ex)
+        self._name_keys = None
+        if ex_id not in self._pos:
+            self._pos[ex_id] = self._next_pos
+            self._next_pos += 1
+        if legacy and any(legacy):
+            self._add_category(ex_id, *legacy)
+
+    def _add_category(self, ex_id: str, construct_type: Optional[str], subcategory: Optional[str]) -> None:
+        category = {"construct_type": construct_type, "subcategory": subcategory}
+        categories = self._categories_of.setdefault(ex_id, [])
+        # Kategorie převedená ze starého pole může mít už i vlastní řádek
+        if category in categories:
+            return
+        categories.append(category)
+        self._index_category(ex_id, construct_type, subcategory)
+
+    def _index_category(self, ex_id: str, construct_type: Optional[str], subcategory: Optional[str]) -> None:
+        self._by_category.setdefault((construct_type, subcategory), set()).add(ex_id)
+        self._by_construct.setdefault(construct_type, set()).add(ex_id)
+        self._by_subcategory.setdefault(subcategory, set()).add(ex_id)
+
+    def _add_section(self, ex_id: str, tag: str) -> None:
+        self._by_section.setdefault(tag, set()).add(ex_id)
+        self._sections_of.setdefault(ex_id, []).append(tag)
+
+    def _remove_exercise(self, ex_id: str) -> None:
+        if self._by_id.pop(ex_id, None) is not None:
+            self._name_keys = None
+        self._equipment.remove(ex_id)
+        pairs = [(c["construct_type"], c["subcategory"]) for c in self._categories_of.pop(ex_id, [])]
+        for construct_type, subcategory in pairs:
+            self._by_category.get((construct_type, subcategory), set()).discard(ex_id)
+            self._by_construct.get(construct_type, set()).discard(ex_id)
+            self._by_subcategory.get(subcategory, set()).discard(ex_id)
+        for tag in self._sections_of.pop(ex_id, []):
+            self._by_section.get(tag, set()).discard(ex_id)
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        """
+        Aplikuje jeden záznam změny na indexy. Záznamy jsou idempotentní:
+        {"op": "upsert", "exercise": {...}, "categories": [...], "sections": [...]}
+        nebo {"op": "delete", "id": "..."}.
+        """
+        with self._lock:
+            if record["op"] == "delete":
+                self._remove_exercise(record["id"])
+                self._pos.pop(record["id"], None)
+                return
+            ex = record["exercise"]
+            self._remove_exercise(ex["id"])
+            self._add_exercise(ex)
+            for c in record.get("categories", []):
+                self._add_category(ex["id"], c.get("construct_type"), c.get("subcategory"))
+            for tag in record.get("sections", []):
+                self._add_section(ex["id"], tag)
+
+    # --- Dotazy ---
+
+    def _candidate_sets(
+        self,
+        construct_type: Optional[str],
+        subcategory: Optional[str],
+        section: Optional[str]
+    ) -> List[Set[str]]:
+        sets = []
+        if construct_type and subcategory:
+            sets.append(self._by_category.get((construct_type, subcategory), set()))
+        elif construct_type:
+            sets.append(self._by_construct.get(construct_type, set()))
+        elif subcategory:
+            sets.append(self._by_subcategory.get(subcategory, set()))
+        if section:
+            sets.append(self._by_section.get(section, set()))
+        return sets
+
+    def _ordered(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        ids = [i for i in ids if i in self._by_id]
+        ids.sort(key=self._pos.__getitem__)
+        return [dict(self._by_id[i]) for i in ids]
+
+    def filter(
+        self,
+        construct_type: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        section: Optional[str] = None,
+        location: Optional[str] = None,
+        materials: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Vrátí cviky odpovídající filtrům v pořadí, v jakém jsou uložené."""
+        self._ensure_loaded()
+        with self._lock:
+            sets = self._candidate_sets(construct_type, subcategory, section)
+            if location or materials is not None:
+                sets.append(self._equipment.compatible_ids(location, materials))
+            if not sets:
+                ids: Iterable[str] = self._by_id
+            else:
+                sets.sort(key=len)
+                smallest, rest = sets[0], sets[1:]
+                ids = (i for i in smallest if all(i in s for s in rest))
+            return self._ordered(ids)
+
+    def set_equipment(self, materials: List[str]) -> None:
+        """Přestaví index vybavení podle aktuálních podkladů "Vybaveni"."""
+        with self._lock:
+            self._equipment_order = list(materials)
+            self._equipment.rebuild(self._equipment_order)
+
+    def page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        name_query: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Vrátí nejvýše `limit` cviků seřazených podle (name, id), které
+        následují za klíčem `after`; volitelně jen s `name_query` v názvu.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._name_keys is None:
+                ordered = sorted(((ex.get("name") or "", str(i)), i) for i, ex in self._by_id.items())
+                self._name_keys = [k for k, _ in ordered]
+                self._name_ids = [i for _, i in ordered]
+            keys = self._name_keys
+            start = bisect.bisect_right(keys, tuple(after)) if after else 0
+            needle = name_query.casefold() if name_query else None
+            result = []
+            for pos in range(start, len(keys)):
+                if needle and needle not in keys[pos][0].casefold():
+                    continue
+                result.append(dict(self._by_id[self._name_ids[pos]]))
+                if len(result) >= limit:
+                    break
+            return result
+
+    def get(self, exercise_id: str) -> Optional[Dict[str, Any]]:
+        """Vrátí cvik podle id nebo None."""
+        self._ensure_loaded()
+        ex = self._by_id.get(exercise_id)
+        return dict(ex) if ex is not None else None
+
+    def sections_of(self, exercise_id: str) -> List[str]:
+        """Vrátí sekce (prep/main/final) daného cviku."""
+        self._ensure_loaded()
+        return list(self._sections_of.get(exercise_id, []))
+
+    def categories_of(self, exercise_id: str) -> List[Dict[str, str]]:
+        """Vrátí kategorie (construct_type, subcategory) daného cviku."""
+        self._ensure_loaded()
+        return [dict(c) for c in self._categories_of.get(exercise_id, [])]
+
+    def to_data(self) -> Dict[str, Any]:
+        """Vrátí celý katalog ve formátu exercises.json (pro zápis snapshotu)."""
+        self._ensure_loaded()
+        with self._lock:
+            ids = sorted(self._by_id, key=self._pos.__getitem__)
+            return {
+                "exercises": [self._by_id[i] for i in ids],
+                "categories": [
+                    {"exercise_id": i, **c} for i in ids for c in self._categories_of.get(i, [])
+                ],
+                "sections": [
+                    {"exercise_id": i, "section_tag": t} for i in ids for t in self._sections_of.get(i, [])
+                ],
+            }
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._by_id)
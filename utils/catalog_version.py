@@ -0,0 +1,241 @@
+"""
+Verze katalogu sdílená mezi procesy (replikami aplikace).
+
+Každý zápis v `utils/database.py` zvýší verzi dotčené oblasti ("exercises"
+nebo "resources"). Procesové cache si u každé položky pamatují verzi, se
+kterou data načetly, a položku s jinou verzí nepoužijí - i když zápis
+provedla jiná replika. Cache proto mohou platit dlouho.
+
+- Supabase: tabulka `catalog_version` (jeden řádek na oblast) a funkce
+  `bump_catalog_version` (SQL níže). Verze se čtou jedním malým dotazem
+  nejvýše jednou za `check_interval` s.
+- Lokální úložiště: soubor `data/catalog_version.json`; změnu pozná
+  os.stat a obsah se čte jen po změně.
+
+Když verze nefungují (v Supabase chybí tabulka nebo funkce), cache si
+nemohou dovolit dlouhé TTL: `versioned_ttl` pak vrací UNVERSIONED_TTL.
+
+S `watch = true` hlídá verze vlákno na pozadí a změnu hned ohlásí
+odběratelům (`subscribe`); čtení verze před cache pak nestojí nic.
+Nastavení v secrets.toml (vše volitelné):
+
+    [catalog_version]
+    check_interval = 2.0
+    watch = false
+    path = "data/catalog_version.json"
+
+SQL pro Supabase:
+
+    create table catalog_version (
+        scope text primary key,
+        version bigint not null default 0,
+        updated_at timestamptz not null default now()
+    );
+    insert into catalog_version (scope) values ('exercises'), ('resources');
+    create function bump_catalog_version(p_scope text) returns bigint
+    language sql as $$
+        insert into catalog_version (scope, version) values (p_scope, 1)
+        on conflict (scope) do update
+            set version = catalog_version.version + 1, updated_at = now()
+        returning version;
+    $$;
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from utils.storage import BASE_DIR, DATA_DIR, _atomic_write_json, _file_lock
+from utils.supabase_client import get_manager
+
+SCOPES = ("exercises", "resources")
+VERSION_FILE = os.path.join(DATA_DIR, "catalog_version.json")
+DEFAULT_CHECK_INTERVAL = 2.0
+# TTL cache, když verze nefungují (v Supabase chybí tabulka nebo funkce)
+UNVERSIONED_TTL = 300
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        return dict(st.secrets["catalog_version"])
+    except Exception:
+        return {}
+
+
+class CatalogVersion:
+    """Verze oblastí katalogu s levnou kontrolou změn a volitelným hlídáním."""
+
+    def __init__(self, path: str = VERSION_FILE, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {scope: 0 for scope in SCOPES}
+        self._checked = 0.0
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._subscribers: List[Callable[[str, int], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Poslední čtení verzí a poslední zvýšení verze proběhly bez chyby
+        self._read_ok = True
+        self._bump_ok = True
+
+    # --- Zdroj verzí ---
+
+    def _read_remote(self, client) -> Optional[Dict[str, int]]:
+        try:
+            rows = client.table("catalog_version").select("scope,version").execute().data
+        except Exception:
+            # Bez tabulky verzí platí jen TTL jednotlivých cache (viz versioned_ttl)
+            self._read_ok = False
+            return None
+        self._read_ok = True
+        return {row["scope"]: int(row["version"]) for row in rows}
+
+    def _read_local(self) -> Optional[Dict[str, int]]:
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        stamp = (info.st_ino, info.st_mtime_ns, info.st_size)
+        if stamp == self._stamp:
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                versions = {scope: int(v) for scope, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return None
+        self._stamp = stamp
+        return versions
+
+    def _read(self) -> Optional[Dict[str, int]]:
+        client = get_manager().get_client()
+        if client:
+            return self._read_remote(client)
+        self._read_ok = self._bump_ok = True
+        return self._read_local()
+
+    def _apply(self, versions: Dict[str, int]) -> None:
+        """Převezme přečtené verze a ohlásí oblasti, které se změnily."""
+        changed = []
+        with self._lock:
+            for scope, version in versions.items():
+                if version != self._versions.get(scope):
+                    self._versions[scope] = version
+                    changed.append((scope, version))
+            subscribers = list(self._subscribers)
+        for scope, version in changed:
+            for callback in subscribers:
+                callback(scope, version)
+
+    def refresh(self) -> None:
+        """Hned načte verze ze zdroje (bez ohledu na check_interval)."""
+        self._checked = time.monotonic()
+        versions = self._read()
+        if versions:
+            self._apply(versions)
+
+    # --- Veřejné API ---
+
+    def current(self, scope: str) -> int:
+        """Aktuální verze oblasti; zdroj se ptá nejvýše jednou za check_interval."""
+        if self._watcher is None and time.monotonic() - self._checked >= self.check_interval:
+            self.refresh()
+        return self._versions.get(scope, 0)
+
+    def bump(self, scope: str) -> Tuple[int, int]:
+        """
+        Zvýší verzi oblasti po zápisu. Vrací (předchozí známá verze, nová verze);
+        pokud nová = předchozí + 1, mezi nimi nezapisoval nikdo jiný.
+        """
+        previous = self._versions.get(scope, 0)
+        client = get_manager().get_client()
+        if client:
+            try:
+                version = int(client.rpc("bump_catalog_version", {"p_scope": scope}).execute().data)
+            except Exception:
+                self._bump_ok = False
+                return previous, previous
+            self._bump_ok = True
+        else:
+            with _file_lock(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        versions = json.load(f)
+                except (OSError, ValueError):
+                    versions = {}
+                version = int(versions.get(scope, 0)) + 1
+                versions[scope] = version
+                _atomic_write_json(self.path, versions)
+        self._apply({scope: version})
+        return previous, version
+
+    def available(self) -> bool:
+        """
+        Zda verze fungují: zdroj jde přečíst a zápis verzi zvýšil. Bez toho
+        cache nepoznají zápisy jiných procesů a platí jen jejich TTL.
+        """
+        return self._read_ok and self._bump_ok
+
+    def subscribe(self, callback: Callable[[str, int], None]) -> None:
+        """callback(oblast, verze) se zavolá při každé zjištěné změně verze."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def start_watcher(self) -> None:
+        """Spustí vlákno, které hlídá verze každých check_interval s."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, daemon=True, name="catalog-version")
+        self.refresh()
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._watcher = None
+        self._stop.clear()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"versions": dict(self._versions), "watching": self._watcher is not None,
+                "check_interval": self.check_interval, "available": self.available()}
+
+
+_catalog_version: Optional[CatalogVersion] = None
+_catalog_version_lock = threading.Lock()
+
+
+def get_catalog_version() -> CatalogVersion:
+    """Vrátí procesově sdílenou verzi katalogu podle nastavení [catalog_version]."""
+    global _catalog_version
+    if _catalog_version is None:
+        with _catalog_version_lock:
+            if _catalog_version is None:
+                cfg = _settings()
+                path = cfg.get("path", VERSION_FILE)
+                if not os.path.isabs(path):
+                    path = os.path.join(BASE_DIR, path)
+                version = CatalogVersion(path, float(cfg.get("check_interval", DEFAULT_CHECK_INTERVAL)))
+                if cfg.get("watch"):
+                    version.start_watcher()
+                _catalog_version = version
+    return _catalog_version
+
+
+def versioned_ttl(ttl: float) -> float:
+    """
+    Dlouhé `ttl` pro cache hlídané verzí katalogu, pokud verze fungují;
+    jinak UNVERSIONED_TTL, aby zápisy jiných replik nečekaly hodinu.
+    """
+    return ttl if get_catalog_version().available() else min(ttl, UNVERSIONED_TTL)
@@ -0,0 +1,180 @@
+"""
+Trvalá cache odpovědí Groq API na disku (SQLite).
+
+Klíčem je SHA-256 z (model, prompt, max_tokens, temperature), takže stejný
+dotaz se k API posílá jen jednou. Záznamy mají časovou platnost a při
+překročení počtu nebo celkové velikosti se mažou nejdéle nepoužité (LRU).
+Nastavení v secrets.toml (vše volitelné):
+
+    [groq]
+    cache_ttl = 604800          # platnost v sekundách
+    cache_max_entries = 5000
+    cache_max_bytes = 52428800
+    cache_path = "data/completion_cache.sqlite3"
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import streamlit as st
+
+from utils.storage import BASE_DIR, DATA_DIR
+from utils.tracing import record_cache
+
+CACHE_FILE = os.path.join(DATA_DIR, "completion_cache.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key      TEXT PRIMARY KEY,
+    model    TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completions_accessed ON completions (accessed);
+"""
+
+
+def cache_key(model: str, prompt: str, max_tokens: int, temperature: float, partial: bool = False) -> str:
+    """Klíč odpovědi; partial=True pro začátek odpovědi (stream ukončený dřív)."""
+    fields = [model, prompt, max_tokens, temperature]
+    if partial:
+        fields.append("partial")
+    raw = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Cache odpovědí podle obsahu dotazu s TTL a LRU vytěsňováním."""
+
+    def __init__(
+        self,
+        path: str = CACHE_FILE,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool) -> None:
+        record_cache("completions", hit)
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Vrátí uloženou odpověď, nebo None (chybí nebo vypršela)."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT response, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] + self.ttl > now:
+                conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+                self._count(True)
+                return row[0]
+            if row is not None:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+        except sqlite3.Error:
+            # Porucha cache nesmí zablokovat volání API
+            pass
+        self._count(False)
+        return None
+
+    def set(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, model, response, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, len(response.encode("utf-8")), now, now)
+                )
+                self._evict(conn, now)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM completions WHERE created <= ?", (now - self.ttl,))
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        # Nejdéle nepoužité záznamy, dokud se nevejdeme do limitů
+        drop = []
+        for key, entry_size in conn.execute("SELECT key, size FROM completions ORDER BY accessed"):
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            drop.append((key,))
+            count -= 1
+            size -= entry_size
+        conn.executemany("DELETE FROM completions WHERE key = ?", drop)
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM completions")
+
+    def stats(self) -> Dict[str, Any]:
+        count, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        return {"name": "completions", "entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Vrátí procesově sdílenou cache podle nastavení v sekci [groq]."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    cfg = dict(st.secrets["groq"])
+                except Exception:
+                    cfg = {}
+                path = cfg.get("cache_path", CACHE_FILE)
+                if not os.path.isabs(path):
+                    path = os.path.join(BASE_DIR, path)
+                _cache = CompletionCache(
+                    path,
+                    ttl=float(cfg.get("cache_ttl", DEFAULT_TTL)),
+                    max_entries=int(cfg.get("cache_max_entries", DEFAULT_MAX_ENTRIES)),
+                    max_bytes=int(cfg.get("cache_max_bytes", DEFAULT_MAX_BYTES))
+                )
+    return _cache
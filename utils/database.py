@@ -1,98 +1,205 @@
 import streamlit as st
-import os
+import base64
 import json
-import uuid
-from typing import List, Dict, Any, Optional
-from supabase import create_client, Client
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+from supabase import Client
+from utils.supabase_client import get_manager
+from utils.storage import LocalStorage, get_local_storage
+from utils.catalog import LOCATION_BOTH
+from utils.cache import TTLCache
+from utils.catalog_version import CatalogVersion, get_catalog_version, versioned_ttl
+from utils.search_index import SearchIndex
 
-# Inicializace Supabase klienta
+# Sdílený Supabase klient (jeden na proces, s keep-alive poolem)
 def _get_supabase_client() -> Optional[Client]:
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
-    except Exception as e:
-        st.error(f"Chyba při inicializaci Supabase klienta: {e}")
-        return None
+    return get_manager().get_client()
 
-# Fallback na lokální JSON soubor, pokud Supabase není dostupné
-DB_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "exercises.json")
-os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Vrátí statistiky sdíleného Supabase klienta a jeho HTTP poolu.
+    """
+    return get_manager().pool_stats()
 
-def _load_db() -> Dict[str, Any]:
-    """Načte databázi z JSON souboru (fallback)."""
-    if not os.path.exists(DB_FILE):
-        return {"exercises": [], "categories": [], "sections": []}
-    try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        # Zajistí, že klíče existují
-        data.setdefault("exercises", [])
-        data.setdefault("categories", [])
-        data.setdefault("sections", [])
-        return data
-    except Exception as e:
-        st.error(f"Chyba při načítání lokální databáze: {e}")
-        return {"exercises": [], "categories": [], "sections": []}
-
-def _save_db(data: Dict[str, Any]) -> bool:
-    """Uloží databázi do JSON souboru (fallback)."""
-    try:
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        st.error(f"Chyba při ukládání lokální databáze: {e}")
-        return False
+def _exercises_version() -> int:
+    return get_catalog_version().current("exercises")
+
+def _resources_version() -> int:
+    return get_catalog_version().current("resources")
+
+def _catalog_changed(scope: str, *up_to_date: TTLCache) -> None:
+    """
+    Po zápisu zvýší verzi katalogu, takže cache ostatních procesů data
+    zahodí. Cache v `up_to_date` už zápis promítly; pokud mezitím nezapisoval
+    nikdo jiný, převezmou novou verzi a zůstanou platné.
+    """
+    previous, current = get_catalog_version().bump(scope)
+    if current == previous + 1:
+        for cache in up_to_date:
+            cache.adopt_version(previous, current)
+
+# Podklady se mění zřídka - drží se v paměti, dokud se nezmění verze katalogu
+# (bez fungujících verzí jen UNVERSIONED_TTL s, viz versioned_ttl)
+RESOURCES_TTL = 3600
+_resources_cache = TTLCache(lambda: versioned_ttl(RESOURCES_TTL), name="resources", version=_resources_version)
+
+# Fulltextový index se staví jednou za SEARCH_TTL nebo po zápisu z jiného
+# procesu, vlastní zápisy ho udržují na místě
+SEARCH_TTL = 3600
+SEARCH_LOAD_PAGE = 1000
+_search_cache = TTLCache(lambda: versioned_ttl(SEARCH_TTL), name="search", version=_exercises_version)
+
+# Fallback na lokální úložiště (JSON nebo SQLite), pokud Supabase není dostupné
+def _local() -> LocalStorage:
+    return get_local_storage()
+
+# Index vybavení lokálního katalogu přiděluje bity podle podkladů "Vybaveni".
+# Odběr oblasti "resources" ho označí k přestavbě; přestaví se až při dalším
+# filtrování, mimo zámky cache, ze kterých se odběratelé volají.
+_equipment_stale = threading.Event()
+_equipment_source: Optional[CatalogVersion] = None
+
+def _on_catalog_change(scope: str, version: int) -> None:
+    if scope == "resources":
+        _equipment_stale.set()
+
+def _sync_equipment(local: LocalStorage) -> None:
+    global _equipment_source
+    versions = get_catalog_version()
+    if versions is not _equipment_source:
+        versions.subscribe(_on_catalog_change)
+        _equipment_source = versions
+        _equipment_stale.set()
+    # Ohlásí i změnu podkladů z jiného procesu
+    versions.current("resources")
+    if _equipment_stale.is_set():
+        _equipment_stale.clear()
+        local.equipment_changed([r["value"] for r in get_resources("Vybaveni")])
 
 # CRUD cviků + sekcí
 
+# Sloupce cviku, které aplikace skutečně používá
+EXERCISE_COLUMNS = "id,name,description,location,materials"
+# Vnořené sekce a kategorie (s aliasy, aby nekolidovaly s filtrem podle sekce)
+DETAIL_COLUMNS = "sections:exercise_sections(section_tag),categories:exercise_categories(construct_type,subcategory)"
+# Kolik id se vejde do jednoho hromadného dotazu (délka URL)
+BULK_CHUNK_SIZE = 200
+
+def _flatten_details(row: Dict[str, Any]) -> Dict[str, Any]:
+    row["sections"] = [s["section_tag"] for s in row.get("sections") or []]
+    row["categories"] = row.get("categories") or []
+    return row
 def get_exercises(
     construct_type: Optional[str] = None,
     subcategory: Optional[str] = None,
-    section: Optional[str] = None
+    section: Optional[str] = None,
+    location: Optional[str] = None,
+    materials: Optional[List[str]] = None,
+    with_details: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Získá cviky z databáze, volitelně filtrované podle:
     - construct_type
     - subcategory
     - section ('prep', 'main', 'final')
+    - location (cvik musí být pro dané místo nebo pro 'Obojí')
+    - materials (cvik smí potřebovat jen materiál z tohoto seznamu)
+    Na Supabase se vše vyhodnotí v jednom dotazu na serveru.
+    S with_details=True má každý cvik navíc klíče 'sections' (seznam tagů)
+    a 'categories' (seznam {construct_type, subcategory}) ze stejného dotazu.
     """
     supabase = _get_supabase_client()
     if supabase:
-        # Nejprve sestavíme base query
-        query = supabase.table("exercises").select("*")
+        columns = EXERCISE_COLUMNS
+        if with_details:
+            columns += "," + DETAIL_COLUMNS
+        if section:
+            # Sekce jako vnořená relace s !inner - filtr běží na serveru
+            columns += ",exercise_sections!inner(section_tag)"
+        if construct_type or subcategory:
+            # Kategorie jsou jen v exercise_categories, filtrují se stejně
+            columns += ",exercise_categories!inner(construct_type,subcategory)"
+        query = supabase.table("exercises").select(columns)
         if construct_type:
-            query = query.eq("construct_type", construct_type)
+            query = query.eq("exercise_categories.construct_type", construct_type)
         if subcategory:
-            query = query.eq("subcategory", subcategory)
-        # Filtrovat podle sekce: získat nejprve ID cviků z exercise_sections
+            query = query.eq("exercise_categories.subcategory", subcategory)
         if section:
-            resp = supabase.table("exercise_sections") \
-                           .select("exercise_id") \
-                           .eq("section_tag", section) \
-                           .execute()
-            ids = [r["exercise_id"] for r in resp.data]
-            if not ids:
-                return []
-            query = query.in_("id", ids)
+            query = query.eq("exercise_sections.section_tag", section)
+        if location:
+            query = query.in_("location", [location, LOCATION_BOTH])
+        if materials is not None:
+            query = query.contained_by("materials", list(materials))
         resp = query.execute()
+        for row in resp.data:
+            row.pop("exercise_sections", None)
+            row.pop("exercise_categories", None)
+            if with_details:
+                _flatten_details(row)
         return resp.data
 
-    # Fallback na lokální JSON
-    db = _load_db()
-    exercises = db["exercises"]
-    # Filtrace podle construct_type & subcategory
-    if construct_type:
-        exercises = [e for e in exercises if e.get("construct_type")==construct_type]
-    if subcategory:
-        exercises = [e for e in exercises if e.get("subcategory")==subcategory]
-    # Filtrace podle sekce
-    if section:
-        sec = [s["exercise_id"] for s in db["sections"] if s["section_tag"]==section]
-        exercises = [e for e in exercises if e["id"] in sec]
+    # Fallback na lokální úložiště
+    if location or materials is not None:
+        _sync_equipment(_local())
+    exercises = _local().get_exercises(construct_type, subcategory, section, location, materials)
+    if with_details:
+        details = _local().get_exercise_details([e["id"] for e in exercises])
+        for ex in exercises:
+            ex.update(details.get(ex["id"], {"sections": [], "categories": []}))
     return exercises
 
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row.get("name") or "", str(row["id"])], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not cursor:
+        return None
+    try:
+        name, ex_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (name, ex_id)
+    except Exception:
+        return None
+
+def _pgrst_quote(value: str) -> str:
+    # Hodnota v or=(...) filtru PostgREST musí být v uvozovkách (čárky, tečky, závorky)
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def get_exercises_page(
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    name_query: Optional[str] = None,
+    with_details: bool = False
+) -> Dict[str, Any]:
+    """
+    Stránkovaný výpis cviků seřazený podle názvu (keyset podle name, id).
+    Vrací {"items": [...], "next_cursor": str nebo None}; next_cursor se
+    předá do dalšího volání. name_query filtruje podle části názvu.
+    """
+    after = _decode_cursor(cursor)
+    supabase = _get_supabase_client()
+    if supabase:
+        columns = EXERCISE_COLUMNS + ("," + DETAIL_COLUMNS if with_details else "")
+        # O jeden řádek víc, abychom poznali, zda existuje další stránka
+        query = supabase.table("exercises").select(columns).order("name").order("id").limit(limit + 1)
+        if name_query:
+            query = query.ilike("name", f"%{name_query}%")
+        if after:
+            name, ex_id = map(_pgrst_quote, after)
+            query = query.or_(f"name.gt.{name},and(name.eq.{name},id.gt.{ex_id})")
+        rows = query.execute().data
+        if with_details:
+            rows = [_flatten_details(r) for r in rows]
+    else:
+        rows = _local().get_exercises_page(limit + 1, after, name_query)
+        if with_details:
+            details = _local().get_exercise_details([r["id"] for r in rows[:limit]])
+            for r in rows:
+                r.update(details.get(r["id"], {"sections": [], "categories": []}))
+    items = rows[:limit]
+    next_cursor = _encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
 def add_exercise(
     name: str,
     description: str,
@@ -118,6 +225,7 @@ def add_exercise(
         if not resp.data:
             return False
         exercise_id = resp.data[0]["id"]
+        _index_exercise(resp.data[0])
         # Kategorie
         cats = []
         for ct in construct_types:
@@ -137,30 +245,70 @@ def add_exercise(
             })
         if secs:
             supabase.table("exercise_sections").insert(secs).execute()
+        _catalog_changed("exercises", _search_cache)
         return True
 
-    # Fallback JSON
-    db = _load_db()
-    exercise_id = str(uuid.uuid4())
-    db["exercises"].append({
-        "id": exercise_id,
+    # Fallback na lokální úložiště
+    exercise = {
         "name": name,
         "description": description,
         "location": location,
         "materials": materials
-    })
-    for ct in construct_types:
-        db["categories"].append({
-            "exercise_id": exercise_id,
-            "construct_type": ct["construct_type"],
-            "subcategory": ct["subcategory"]
-        })
-    for tag in section_tags:
-        db["sections"].append({
-            "exercise_id": exercise_id,
-            "section_tag": tag
-        })
-    return _save_db(db)
+    }
+    exercise_id = _local().add_exercise(exercise, construct_types, section_tags)
+    if exercise_id is None:
+        return False
+    _index_exercise({"id": exercise_id, **exercise})
+    _catalog_changed("exercises", _search_cache)
+    return True
+
+def add_exercises_bulk(exercises: List[Dict[str, Any]]) -> int:
+    """
+    Hromadně přidá cviky. Každá položka má klíče name, description, location,
+    materials, construct_types (seznam {construct_type, subcategory})
+    a section_tags. Na Supabase stačí tři vícenásobné inserty pro celou dávku.
+    Vrací počet vložených cviků.
+    """
+    if not exercises:
+        return 0
+    supabase = _get_supabase_client()
+    if supabase:
+        created_by = st.session_state.get("user", "admin")
+        rows = [{
+            "name": e["name"],
+            "description": e["description"],
+            "location": e["location"],
+            "materials": e["materials"],
+            "created_by": created_by
+        } for e in exercises]
+        resp = supabase.table("exercises").insert(rows).execute()
+        for row in resp.data:
+            _index_exercise(row)
+        # PostgREST vrací vložené řádky ve stejném pořadí
+        cats, secs = [], []
+        for e, row in zip(exercises, resp.data):
+            cats.extend({"exercise_id": row["id"], "construct_type": ct["construct_type"],
+                         "subcategory": ct["subcategory"]} for ct in e["construct_types"])
+            secs.extend({"exercise_id": row["id"], "section_tag": tag} for tag in e["section_tags"])
+        if cats:
+            supabase.table("exercise_categories").insert(cats).execute()
+        if secs:
+            supabase.table("exercise_sections").insert(secs).execute()
+        _catalog_changed("exercises", _search_cache)
+        return len(resp.data)
+
+    # Fallback na lokální úložiště
+    items = [({
+        "name": e["name"],
+        "description": e["description"],
+        "location": e["location"],
+        "materials": e["materials"]
+    }, e["construct_types"], e["section_tags"]) for e in exercises]
+    count = _local().add_exercises_bulk(items)
+    # Lokální úložiště nevrací id nových cviků - index se postaví znovu
+    _search_cache.invalidate()
+    _catalog_changed("exercises")
+    return count
 
 def update_exercise(
     exercise_id: str,
@@ -190,6 +338,7 @@ def update_exercise(
                        .execute()
         if not resp.data:
             return False
+        _index_exercise(resp.data[0])
         # Kategorie: nejprve smazat
         supabase.table("exercise_categories").delete().eq("exercise_id", exercise_id).execute()
         # a vložit nové
@@ -201,36 +350,21 @@ def update_exercise(
         secs = [{"exercise_id": exercise_id, "section_tag": tag} for tag in section_tags]
         if secs:
             supabase.table("exercise_sections").insert(secs).execute()
+        _catalog_changed("exercises", _search_cache)
         return True
 
-    # Fallback JSON
-    db = _load_db()
-    # Najdi index cviku
-    for i, ex in enumerate(db["exercises"]):
-        if ex["id"] == exercise_id:
-            db["exercises"][i] = {
-                "id": exercise_id,
-                "name": name,
-                "description": description,
-                "location": location,
-                "materials": materials
-            }
-            break
-    # Kategorie
-    db["categories"] = [c for c in db["categories"] if c["exercise_id"] != exercise_id]
-    for ct in construct_types:
-        db["categories"].append({
-            "exercise_id": exercise_id,
-            **ct
-        })
-    # Sekce
-    db["sections"] = [s for s in db["sections"] if s["exercise_id"] != exercise_id]
-    for tag in section_tags:
-        db["sections"].append({
-            "exercise_id": exercise_id,
-            "section_tag": tag
-        })
-    return _save_db(db)
+    # Fallback na lokální úložiště
+    exercise = {
+        "name": name,
+        "description": description,
+        "location": location,
+        "materials": materials
+    }
+    if not _local().update_exercise(exercise_id, exercise, construct_types, section_tags):
+        return False
+    _index_exercise({"id": exercise_id, **exercise})
+    _catalog_changed("exercises", _search_cache)
+    return True
 
 def delete_exercise(exercise_id: str) -> bool:
     """
@@ -240,14 +374,37 @@ def delete_exercise(exercise_id: str) -> bool:
     if supabase:
         # Supabase cascade smaže i exercise_sections a exercise_categories
         resp = supabase.table("exercises").delete().eq("id", exercise_id).execute()
-        return len(resp.data) > 0
+        deleted = len(resp.data) > 0
+    else:
+        # Fallback na lokální úložiště
+        deleted = _local().delete_exercise(exercise_id)
+    if deleted:
+        index = _search_cache.get("index")
+        if index is not None:
+            index.remove(exercise_id)
+        _catalog_changed("exercises", _search_cache)
+    return deleted
 
-    # Fallback JSON
-    db = _load_db()
-    db["exercises"]  = [e for e in db["exercises"]  if e["id"] != exercise_id]
-    db["categories"] = [c for c in db["categories"] if c["exercise_id"] != exercise_id]
-    db["sections"]   = [s for s in db["sections"]   if s["exercise_id"] != exercise_id]
-    return _save_db(db)
+def get_exercises_by_ids(exercise_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Získá cviky podle seznamu id ve stejném pořadí (neexistující vynechá).
+    Na Supabase jeden dotaz na každých BULK_CHUNK_SIZE id.
+    """
+    supabase = _get_supabase_client()
+    if supabase:
+        ids = list(dict.fromkeys(exercise_ids))
+        by_id = {}
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            resp = supabase.table("exercises") \
+                           .select(EXERCISE_COLUMNS) \
+                           .in_("id", ids[start:start + BULK_CHUNK_SIZE]) \
+                           .execute()
+            for row in resp.data:
+                by_id[row["id"]] = row
+        return [by_id[ex_id] for ex_id in exercise_ids if ex_id in by_id]
+
+    # Fallback na lokální úložiště
+    return _local().get_exercises_by_ids(exercise_ids)
 
 def get_exercise_sections(exercise_id: str) -> List[str]:
     """
@@ -261,9 +418,81 @@ def get_exercise_sections(exercise_id: str) -> List[str]:
                        .execute()
         return [r["section_tag"] for r in resp.data]
 
-    # Fallback JSON
-    db = _load_db()
-    return [s["section_tag"] for s in db["sections"] if s["exercise_id"] == exercise_id]
+    # Fallback na lokální úložiště
+    return _local().get_exercise_sections(exercise_id)
+
+def get_exercise_details(exercise_ids: List[str]) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Hromadně získá sekce a kategorie pro více cviků najednou.
+    Vrací {exercise_id: {"sections": [...], "categories": [...]}};
+    na Supabase jeden dotaz na každých BULK_CHUNK_SIZE id.
+    """
+    ids = list(dict.fromkeys(exercise_ids))
+    supabase = _get_supabase_client()
+    if supabase:
+        result = {}
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            resp = supabase.table("exercises") \
+                           .select("id," + DETAIL_COLUMNS) \
+                           .in_("id", ids[start:start + BULK_CHUNK_SIZE]) \
+                           .execute()
+            for row in resp.data:
+                row = _flatten_details(row)
+                result[row["id"]] = {"sections": row["sections"], "categories": row["categories"]}
+        return result
+
+    # Fallback na lokální úložiště
+    return _local().get_exercise_details(ids)
+
+def get_exercise_sections_bulk(exercise_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    Získá sekce pro více cviků jedním hromadným dotazem.
+    """
+    details = get_exercise_details(exercise_ids)
+    return {ex_id: details.get(ex_id, {}).get("sections", []) for ex_id in exercise_ids}
+
+# Fulltextové vyhledávání
+
+def _build_search_index() -> SearchIndex:
+    index = SearchIndex()
+    cursor = None
+    while True:
+        page = get_exercises_page(SEARCH_LOAD_PAGE, cursor)
+        for ex in page["items"]:
+            index.add(ex)
+        cursor = page["next_cursor"]
+        if not cursor:
+            return index
+
+def _index_exercise(ex: Dict[str, Any]) -> None:
+    # Aktualizuje jen už postavený index; jinak se cvik načte při stavbě
+    index = _search_cache.get("index")
+    if index is not None:
+        index.add({k: ex.get(k) for k in ("id", "name", "description", "location", "materials")})
+
+def search_exercises(
+    query: str,
+    limit: int = 20,
+    with_details: bool = False,
+    ids: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fulltextově vyhledá cviky podle názvu a popisu (bez ohledu na velikost
+    písmen a diakritiku, s jednoduchým stemmingem). Vrací nejvýše `limit`
+    cviků seřazených podle relevance, každý s klíčem 'score'. Hledá se
+    v indexu v paměti procesu, bez dotazu do databáze. S `ids` jen mezi
+    těmito cviky (např. výsledkem filtrů), a to ještě před zkrácením.
+    """
+    index = _search_cache.get_or_load("index", _build_search_index)
+    results = []
+    for ex, score in index.search(query, limit, ids):
+        ex["score"] = score
+        results.append(ex)
+    if with_details and results:
+        details = get_exercise_details([ex["id"] for ex in results])
+        for ex in results:
+            ex.update(details.get(ex["id"], {"sections": [], "categories": []}))
+    return results
 
 def get_construct_types() -> List[str]:
     return ["Zdatnost", "Manipulace s předměty", "Lokomoce"]
@@ -277,18 +506,29 @@ def get_subcategories(construct_type: str) -> List[str]:
         return ["Chůze", "Běh", "Skoky", "Lezení", "Plazení"]
     return []
 
+def _load_all_resources() -> Dict[str, List[Dict[str, str]]]:
+    supabase = _get_supabase_client()
+    if supabase:
+        resp = supabase.table("resources").select("*").execute()
+        grouped: Dict[str, List[Dict[str, str]]] = {}
+        for r in resp.data:
+            grouped.setdefault(r["resource_type"], []).append(r)
+        return grouped
+    return _local().get_all_resources()
+
+def get_all_resources() -> Dict[str, List[Dict[str, str]]]:
+    """
+    Získá všechny podklady jedním dotazem, seskupené podle resource_type.
+    Výsledek se drží v procesové cache (RESOURCES_TTL s); zápisy v tomto
+    i jiném procesu ji zneplatní přes verzi katalogu.
+    """
+    return _resources_cache.get_or_load("all", _load_all_resources)
+
 def get_resources(resource_type: str) -> List[Dict[str, str]]:
     """
     Získá seznam podkladů z tabulky resources podle typu.
     """
-    supabase = _get_supabase_client()
-    if supabase:
-        resp = supabase.table("resources") \
-                       .select("*") \
-                       .eq("resource_type", resource_type) \
-                       .execute()
-        return resp.data
-    return []
+    return list(get_all_resources().get(resource_type, []))
 
 def add_resource(resource_type: str, value: str) -> bool:
     """
@@ -300,9 +540,14 @@ def add_resource(resource_type: str, value: str) -> bool:
     supabase = _get_supabase_client()
     if supabase:
         supabase.table("resources").insert({"resource_type": resource_type, "value": value}).execute()
+        _resources_cache.invalidate()
+        _catalog_changed("resources")
         return True
-    st.error("Supabase klient není dostupný.")
-    return False
+    ok = _local().add_resource(resource_type, value)
+    _resources_cache.invalidate()
+    if ok:
+        _catalog_changed("resources")
+    return ok
 
 def update_resource(resource_id: str, value: str) -> bool:
     """
@@ -314,9 +559,14 @@ def update_resource(resource_id: str, value: str) -> bool:
     supabase = _get_supabase_client()
     if supabase:
         supabase.table("resources").update({"value": value}).eq("id", resource_id).execute()
+        _resources_cache.invalidate()
+        _catalog_changed("resources")
         return True
-    st.error("Supabase klient není dostupný.")
-    return False
+    ok = _local().update_resource(resource_id, value)
+    _resources_cache.invalidate()
+    if ok:
+        _catalog_changed("resources")
+    return ok
 
 def delete_resource(resource_id: str) -> bool:
     """
@@ -325,6 +575,11 @@ def delete_resource(resource_id: str) -> bool:
     supabase = _get_supabase_client()
     if supabase:
         supabase.table("resources").delete().eq("id", resource_id).execute()
+        _resources_cache.invalidate()
+        _catalog_changed("resources")
         return True
-    st.error("Supabase klient není dostupný.")
-    return False
+    ok = _local().delete_resource(resource_id)
+    _resources_cache.invalidate()
+    if ok:
+        _catalog_changed("resources")
+    return ok
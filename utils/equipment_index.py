@@ -0,0 +1,172 @@
+"""
+Bitový index kompatibility cviků s místem a vybavením.
+
+Každý materiál má vlastní bit a cvik je uložen jako řádek v poli masek
+(numpy, 64 materiálů na sloupec) spolu s kódem místa. Vybrané vybavení se
+převede na masku jednou za dotaz a test "cvik potřebuje jen dostupný
+materiál" proběhne nad celým polem najednou: `(masky & ~vybavení) == 0`.
+Výsledná množina id platí do další změny indexu.
+
+Bity se přidělují nejdřív podle podkladů "Vybaveni" a potom podle výskytu
+v cvicích. Cviky se přidávají a odebírají průběžně; po změně podkladů se
+index přestaví (`rebuild`), takže bit nedrží materiál, který už nikde není.
+"""
+import threading
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Hodnota místa, která vyhovuje tělocvičně i hřišti
+LOCATION_BOTH = "Obojí"
+# Kód místa "Obojí": všechny bity, vyhovuje libovolnému místu
+_CODE_BOTH = -1
+_WORD_BITS = 64
+
+
+class EquipmentIndex:
+    """Masky materiálu a kódy míst pro rychlé filtrování cviků."""
+
+    def __init__(self, materials: Iterable[str] = ()):
+        self._lock = threading.RLock()
+        # Pořadí materiálů z podkladů "Vybaveni" (dostanou první bity)
+        self._order: List[str] = list(materials)
+        # id -> (materiály, místo); z nich se pole při přestavbě naplní znovu
+        self._entries: Dict[Hashable, Tuple[Tuple[str, ...], Optional[str]]] = {}
+        self._generation = 0
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Přidělí bity znovu a naplní pole ze záznamů cviků."""
+        size = len(self._entries)
+        self._bits: Dict[str, int] = {}
+        self._locations: Dict[str, int] = {}
+        self._rows: Dict[Hashable, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._ids = np.empty(size, dtype=object)
+        self._masks = np.zeros((size, 1), dtype=np.uint64)
+        self._codes = np.zeros(size, dtype=np.int64)
+        self._alive = np.zeros(size, dtype=bool)
+        # Výsledek dotazu podle (místo, vybavení); platí pro jednu generaci indexu
+        self._query_cache: Dict[Tuple[Optional[str], Optional[Tuple[str, ...]]], Tuple[int, FrozenSet[Hashable]]] = {}
+        for name in self._order:
+            self._material_bit(name)
+        for ex_id, (materials, location) in self._entries.items():
+            self._store(ex_id, materials, location)
+        self._generation += 1
+
+    def _material_bit(self, name: str) -> int:
+        bit = self._bits.get(name)
+        if bit is None:
+            bit = self._bits[name] = len(self._bits)
+            if bit >= self._masks.shape[1] * _WORD_BITS:
+                column = np.zeros((len(self._masks), 1), dtype=np.uint64)
+                self._masks = np.hstack([self._masks, column])
+        return bit
+
+    def _location_code(self, location: Optional[str]) -> int:
+        if location == LOCATION_BOTH:
+            return _CODE_BOTH
+        code = self._locations.get(location)
+        if code is None:
+            code = self._locations[location] = 1 << len(self._locations)
+        return code
+
+    def _words(self, materials: Iterable[str]) -> List[int]:
+        """Maska materiálů po 64bitových slovech; materiály bez bitu se vynechají."""
+        words = [0] * self._masks.shape[1]
+        for name in materials:
+            bit = self._bits.get(name)
+            if bit is not None:
+                words[bit // _WORD_BITS] |= 1 << (bit % _WORD_BITS)
+        return words
+
+    def _new_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._size == len(self._codes):
+            extra = max(64, len(self._codes))
+            self._ids = np.concatenate([self._ids, np.empty(extra, dtype=object)])
+            self._masks = np.vstack([self._masks, np.zeros((extra, self._masks.shape[1]), dtype=np.uint64)])
+            self._codes = np.concatenate([self._codes, np.zeros(extra, dtype=np.int64)])
+            self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        self._size += 1
+        return self._size - 1
+
+    def _store(self, ex_id: Hashable, materials: Tuple[str, ...], location: Optional[str]) -> None:
+        for name in materials:
+            self._material_bit(name)
+        row = self._rows.get(ex_id)
+        if row is None:
+            row = self._rows[ex_id] = self._new_row()
+            self._ids[row] = ex_id
+        self._masks[row] = self._words(materials)
+        self._codes[row] = self._location_code(location)
+        self._alive[row] = True
+
+    def add(self, ex: Dict[str, Any]) -> None:
+        """Přidá nebo přepíše cvik v indexu."""
+        with self._lock:
+            materials = tuple(ex.get("materials") or [])
+            self._entries[ex["id"]] = (materials, ex.get("location"))
+            self._store(ex["id"], materials, ex.get("location"))
+            self._generation += 1
+
+    def remove(self, exercise_id: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(exercise_id, None)
+            row = self._rows.pop(exercise_id, None)
+            if row is None:
+                return
+            self._ids[row] = None
+            self._masks[row] = 0
+            self._alive[row] = False
+            self._free.append(row)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._rebuild()
+
+    def rebuild(self, materials: Optional[Iterable[str]] = None) -> None:
+        """
+        Přestaví index; `materials` je nové pořadí materiálů z podkladů
+        "Vybaveni" (None = ponechat dosavadní).
+        """
+        with self._lock:
+            if materials is not None:
+                self._order = list(materials)
+            self._rebuild()
+
+    def compatible_ids(
+        self,
+        location: Optional[str] = None,
+        materials: Optional[Iterable[str]] = None
+    ) -> FrozenSet[Hashable]:
+        """
+        Vrátí id cviků proveditelných na místě `location` jen s materiálem
+        `materials`. None u filtru znamená bez omezení.
+        """
+        key = (location, None if materials is None else tuple(sorted(set(materials))))
+        with self._lock:
+            cached = self._query_cache.get(key)
+            if cached is not None and cached[0] == self._generation:
+                return cached[1]
+            size = self._size
+            ok = self._alive[:size].copy()
+            if key[1] is not None:
+                allowed = np.array(self._words(key[1]), dtype=np.uint64)
+                ok &= ((self._masks[:size] & ~allowed) == 0).all(axis=1)
+            codes = self._codes[:size]
+            if location == LOCATION_BOTH:
+                # Stejně jako v SQL: "Obojí" vyhovuje jen cvikům pro obě místa
+                ok &= codes == _CODE_BOTH
+            elif location:
+                want = self._locations.get(location)
+                ok &= (codes == _CODE_BOTH) if want is None else (codes & want) != 0
+            result = frozenset(self._ids[:size][ok].tolist())
+            if len(self._query_cache) > 256:
+                self._query_cache.clear()
+            self._query_cache[key] = (self._generation, result)
+            return result
@@ -0,0 +1,226 @@
+"""
+Hromadný import a export katalogu cviků (CSV / XLSX).
+
+Soubor se čte po řádcích, každý řádek se ověří (místo, konstrukt,
+podkategorie, sekce) a platné cviky se zapisují po dávkách přes
+`db.add_exercises_bulk`. Export prochází katalog po stránkách, takže
+v paměti není nikdy celý najednou.
+
+Sloupce: name, description, location, materials, construct_type,
+subcategory, sections. Seznamy se oddělují středníkem; cvik s více
+kategoriemi má v construct_type a subcategory stejně dlouhé seznamy.
+"""
+import csv
+import io
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import utils.database as db
+
+COLUMNS = ["name", "description", "location", "materials", "construct_type", "subcategory", "sections"]
+LOCATIONS = ["Tělocvična", "Hřiště", db.LOCATION_BOTH]
+SECTIONS = ["prep", "main", "final"]
+LIST_SEPARATOR = ";"
+# Počet cviků v jedné dávce zápisu
+DEFAULT_BATCH_SIZE = 500
+# Počet cviků načtených najednou při exportu
+EXPORT_PAGE_SIZE = 500
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+def _split_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    return [v.strip() for v in str(value).split(LIST_SEPARATOR) if v.strip()]
+
+
+# --- Čtení ---
+
+def _iter_csv(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        # Oddělovač se určí z hlavičky (Excel v české lokalizaci ukládá se středníkem)
+        header = text.readline()
+        text.seek(0)
+        delimiter = max(",;\t", key=header.count)
+        yield from csv.DictReader(text, delimiter=delimiter)
+    finally:
+        # Uvolní obal, aby se při zavření nezavřel i soubor volajícího
+        text.detach()
+
+
+def _iter_xlsx(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    from openpyxl import load_workbook
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+        for values in rows:
+            if values is None or all(v is None for v in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        wb.close()
+
+
+def iter_rows(file: BinaryIO, file_format: str) -> Iterator[Dict[str, Any]]:
+    """Postupně čte řádky souboru jako slovníky podle hlavičky."""
+    if file_format == "xlsx":
+        return _iter_xlsx(file)
+    if file_format == "csv":
+        return _iter_csv(file)
+    raise ValueError(f"Nepodporovaný formát: {file_format}")
+
+
+def count_rows(file: BinaryIO, file_format: str) -> Optional[int]:
+    """Odhad počtu datových řádků pro zobrazení průběhu (None = neznámý)."""
+    if file_format == "xlsx":
+        from openpyxl import load_workbook
+        pos = file.tell()
+        wb = load_workbook(file, read_only=True)
+        try:
+            total = wb.active.max_row
+        finally:
+            wb.close()
+            file.seek(pos)
+        return max(total - 1, 0) if total else None
+    return None
+
+
+def validate_row(row: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Ověří jeden řádek importu.
+
+    Returns:
+        (cvik pro db.add_exercises_bulk, None) nebo (None, popis chyby)
+    """
+    def get(key: str) -> str:
+        value = row.get(key)
+        return str(value).strip() if value is not None else ""
+
+    name = get("name")
+    if not name:
+        return None, "chybí název"
+    location = get("location")
+    if location not in LOCATIONS:
+        return None, f"neplatné místo '{location}'"
+    # Více kategorií: construct_type a subcategory jako seznamy stejné délky
+    construct_types = _split_list(row.get("construct_type"))
+    subcategories = _split_list(row.get("subcategory"))
+    if not construct_types or len(construct_types) != len(subcategories):
+        return None, "construct_type a subcategory musí mít stejný počet hodnot"
+    categories = []
+    for construct_type, subcategory in zip(construct_types, subcategories):
+        if construct_type not in db.get_construct_types():
+            return None, f"neplatný konstrukt '{construct_type}'"
+        if subcategory not in db.get_subcategories(construct_type):
+            return None, f"podkategorie '{subcategory}' nepatří ke konstruktu '{construct_type}'"
+        categories.append({"construct_type": construct_type, "subcategory": subcategory})
+    sections = _split_list(row.get("sections"))
+    invalid = [s for s in sections if s not in SECTIONS]
+    if invalid:
+        return None, f"neplatné sekce: {', '.join(invalid)}"
+    return {
+        "name": name,
+        "description": get("description"),
+        "location": location,
+        "materials": _split_list(row.get("materials")),
+        "construct_types": categories,
+        "section_tags": sections,
+    }, None
+
+
+def import_exercises(
+    file: BinaryIO,
+    file_format: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Naimportuje cviky ze souboru CSV nebo XLSX.
+
+    Args:
+        file: Binární soubor (např. st.file_uploader)
+        file_format: 'csv' nebo 'xlsx'
+        batch_size: Počet cviků v jednom hromadném zápisu
+        progress: Volá se jako progress(zpracováno_řádků, celkem_nebo_None)
+
+    Returns:
+        Slovník s klíči imported, rows a errors (seznam (číslo řádku, chyba))
+    """
+    total = count_rows(file, file_format)
+    imported, processed, errors = 0, 0, []
+    batch: List[Dict[str, Any]] = []
+    # Řádek 1 je hlavička
+    for line_no, row in enumerate(iter_rows(file, file_format), start=2):
+        processed += 1
+        exercise, error = validate_row(row)
+        if error:
+            errors.append((line_no, error))
+        else:
+            batch.append(exercise)
+        if len(batch) >= batch_size:
+            imported += db.add_exercises_bulk(batch)
+            batch = []
+            if progress:
+                progress(processed, total)
+    if batch:
+        imported += db.add_exercises_bulk(batch)
+    if progress:
+        progress(processed, total)
+    return {"imported": imported, "rows": processed, "errors": errors}
+
+
+# --- Export ---
+
+def iter_export_rows() -> Iterator[List[str]]:
+    """Prochází celý katalog po stránkách a vrací řádky exportu (bez hlavičky)."""
+    cursor = None
+    while True:
+        page = db.get_exercises_page(EXPORT_PAGE_SIZE, cursor, with_details=True)
+        for ex in page["items"]:
+            categories = ex.get("categories") or []
+            yield [
+                ex.get("name") or "",
+                ex.get("description") or "",
+                ex.get("location") or "",
+                LIST_SEPARATOR.join(ex.get("materials") or []),
+                LIST_SEPARATOR.join(c.get("construct_type") or "" for c in categories),
+                LIST_SEPARATOR.join(c.get("subcategory") or "" for c in categories),
+                LIST_SEPARATOR.join(ex.get("sections") or []),
+            ]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+
+def iter_export_csv() -> Iterator[str]:
+    """Vrací CSV export po částech (hlavička + jeden řádek na cvik)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for row in iter_export_rows():
+        writer.writerow(row)
+        if buf.tell() > 64 * 1024:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_csv(out: BinaryIO) -> None:
+    """Zapíše CSV export do binárního souboru (UTF-8 s BOM kvůli Excelu)."""
+    out.write("\ufeff".encode("utf-8"))
+    for chunk in iter_export_csv():
+        out.write(chunk.encode("utf-8"))
+
+
+def export_xlsx(out: BinaryIO) -> None:
+    """Zapíše XLSX export v režimu write-only (řádky se neudržují v paměti)."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Cviky")
+    ws.append(COLUMNS)
+    for row in iter_export_rows():
+        ws.append(row)
+    wb.save(out)
@@ -0,0 +1,234 @@
+"""
+Lokální náhrada Groq (OpenAI-kompatibilního) chat API pro vývoj a testování bez sítě.
+
+Server odpovídá na POST .../chat/completions (i se "stream": true jako
+server-sent events po několika znacích). Na prompt z
+`generate_exercise_suggestion` vrátí deterministický JSON cviku sestavený
+z parametrů v promptu, na ostatní prompty krátký text. Pro testování
+opakování umí uměle zpomalit odpověď a vracet 429/503. Spuštění:
+
+    python -m utils.groq_stub --port 54322 --latency 0.5 --rate-limit-every 5
+
+a v .streamlit/secrets.toml:
+
+    [groq]
+    api_key = "local.stub.key"
+    base_url = "http://127.0.0.1:54322/openai/v1"
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+_PARAM = re.compile(r"-\s*(Cvičební konstrukt|Podkategorie|Místo|Dostupné materiály):\s*(.+)")
+
+
+class GroqStub:
+    """Stav serveru: počítadla požadavků a nastavení simulovaných chyb."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit_every: int = 0,
+        fail_every: int = 0,
+        retry_after: float = 1.0,
+        chunk_delay: float = 0.0,
+        chunk_size: int = 8
+    ):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def next_fault(self) -> Optional[int]:
+        """Vrátí stavový kód simulované chyby pro tento požadavek, nebo None."""
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            return 429
+        if self.fail_every and n % self.fail_every == 0:
+            return 503
+        return None
+
+    def reply(self, prompt: str) -> str:
+        params = dict(_PARAM.findall(prompt))
+        if "Cvičební konstrukt" not in params:
+            return f"Odpověď lokálního serveru ({len(prompt)} znaků promptu)."
+        subcategory = params.get("Podkategorie", "").strip()
+        location = params.get("Místo", "").strip()
+        materials = params.get("Dostupné materiály", "").strip()
+        return json.dumps({
+            "name": f"{subcategory} – {location}",
+            "description": f"Cvik typu {params['Cvičební konstrukt'].strip()} ({subcategory}), materiál: {materials}.",
+            "time": 5,
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _prompt(request: Dict[str, Any]) -> str:
+        return "\n".join(m.get("content") or "" for m in request.get("messages", []))
+
+    @staticmethod
+    def _usage(prompt: str, content: str) -> Dict[str, int]:
+        prompt_tokens, completion_tokens = len(prompt.split()), len(content.split())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def stream(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Odpověď jako posloupnost chat.completion.chunk objektů."""
+        prompt = self._prompt(request)
+        content = self.reply(prompt)
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", ""),
+        }
+        yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}]}
+        for start in range(0, len(content), self.chunk_size):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            piece = content[start:start + self.chunk_size]
+            yield {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if (request.get("stream_options") or {}).get("include_usage"):
+            yield {**base, "choices": [], "usage": self._usage(prompt, content)}
+
+    def completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._prompt(request)
+        content = self.reply(prompt)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", ""),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": self._usage(prompt, content),
+        }
+
+
+def _make_handler(stub: GroqStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            stub.count_connection()
+
+        def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_stream(self, request: Dict[str, Any]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # Po streamu se spojení zavře; klient ho často ukončí dřív
+            self.close_connection = True
+            try:
+                for event in stub.stream(request):
+                    self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # Klient čtení ukončil dřív (má, co potřeboval)
+                pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "Neznámý endpoint"}})
+                return
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                self._send(401, {"error": {"message": "Chybí API klíč"}})
+                return
+            try:
+                request = json.loads(raw or b"{}")
+            except ValueError:
+                self._send(400, {"error": {"message": "Neplatný JSON"}})
+                return
+            if stub.latency:
+                time.sleep(stub.latency)
+            fault = stub.next_fault()
+            if fault == 429:
+                self._send(429, {"error": {"message": "Rate limit"}},
+                           {"Retry-After": str(stub.retry_after)})
+            elif fault:
+                self._send(fault, {"error": {"message": "Služba je dočasně nedostupná"}})
+            elif request.get("stream"):
+                self._send_stream(request)
+            else:
+                self._send(200, stub.completion(request))
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send(200, {"object": "list", "data": [{"id": "llama3-8b-8192", "object": "model"}]})
+            else:
+                self._send(404, {"error": {"message": "Neznámý endpoint"}})
+
+    return Handler
+
+
+def serve(stub: GroqStub, host: str = "127.0.0.1", port: int = 54322) -> ThreadingHTTPServer:
+    """Spustí server v samostatném vlákně a vrátí jej (zastavení: server.shutdown())."""
+    server = ThreadingHTTPServer((host, port), _make_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True, name="groq-stub").start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lokální náhrada Groq chat API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54322)
+    parser.add_argument("--latency", type=float, default=0.0, help="zpoždění odpovědi v sekundách")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="každý N-tý požadavek vrátí 429")
+    parser.add_argument("--fail-every", type=int, default=0, help="každý N-tý požadavek vrátí 503")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="zpoždění mezi částmi streamu (s)")
+    args = parser.parse_args()
+    stub = GroqStub(args.latency, args.rate_limit_every, args.fail_every, chunk_delay=args.chunk_delay)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(stub))
+    print(f"Groq stub běží na http://{args.host}:{args.port}/openai/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Měření doby importu modulů (na základě `python -X importtime`).
+
+Spustí import zadaného modulu v novém interpretu, sečte časy podle
+balíčků nejvyšší úrovně a ohlídá rozpočet: celkový čas a seznam balíčků,
+které se při startu načíst nesmí (torch, transformers, fpdf...). Spuštění:
+
+    python -m utils.import_budget app --budget-ms 2500 --forbid torch transformers fpdf
+
+Návratový kód 1 znamená překročený rozpočet nebo načtený zakázaný balíček.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Balíčky, které mají být načtené až při prvním skutečném použití
+DEFAULT_FORBIDDEN = ["torch", "transformers", "accelerate", "safetensors", "fpdf", "docx"]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str, python: str = sys.executable, cwd: str = BASE_DIR) -> Dict[str, Any]:
+    """
+    Naimportuje `module` v novém procesu a vrátí:
+    total_ms (kumulativní čas modulu), packages ({balíček: vlastní čas ms})
+    a modules (seznam všech načtených modulů).
+    """
+    code = f"import sys; sys.path.insert(0, {cwd!r}); import {module}"
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import {module} selhal:\n{proc.stderr[-2000:]}")
+    packages: Dict[str, float] = {}
+    modules: List[str] = []
+    total_ms = 0.0
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append(name)
+        top = name.split(".")[0]
+        packages[top] = packages.get(top, 0.0) + int(self_us) / 1000
+        if name == module and len(indent) <= 1:
+            total_ms = int(cumulative_us) / 1000
+    return {"total_ms": total_ms, "packages": packages, "modules": modules}
+
+
+def _problems(result: Dict[str, Any], module: str, budget_ms: Optional[float], forbidden: List[str]) -> List[str]:
+    problems = []
+    if budget_ms is not None and result["total_ms"] > budget_ms:
+        problems.append(f"import {module} trvá {result['total_ms']:.0f} ms (rozpočet {budget_ms:.0f} ms)")
+    for name in forbidden:
+        if name in result["packages"]:
+            problems.append(f"při startu se načítá {name} ({result['packages'][name]:.0f} ms)")
+    return problems
+
+
+def check(
+    module: str,
+    budget_ms: Optional[float] = None,
+    forbidden: Optional[List[str]] = None
+) -> List[str]:
+    """Vrátí seznam porušení rozpočtu (prázdný = v pořádku)."""
+    return _problems(measure(module), module, budget_ms, DEFAULT_FORBIDDEN if forbidden is None else forbidden)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rozpočet doby importu modulu")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--budget-ms", type=float, help="maximální celková doba importu")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN,
+                        help="balíčky, které se při importu nesmí načíst")
+    parser.add_argument("--top", type=int, default=15, help="počet nejpomalejších balíčků ve výpisu")
+    args = parser.parse_args()
+
+    result = measure(args.module)
+    print(f"import {args.module}: {result['total_ms']:.0f} ms, {len(result['modules'])} modulů")
+    ranked = sorted(result["packages"].items(), key=lambda item: item[1], reverse=True)
+    for name, ms in ranked[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    problems = _problems(result, args.module, args.budget_ms, args.forbid)
+    for problem in problems:
+        print(f"CHYBA: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
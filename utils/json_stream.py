@@ -0,0 +1,61 @@
+"""
+Průběžné vytažení JSON hodnoty z textu, který přichází po částech.
+
+AI odpovídá proudem tokenů a JSON bývá obklopen dalším textem. Extraktor
+sleduje zanoření závorek a řetězce, takže výsledek je k dispozici hned,
+jakmile dorazí uzavírací závorka – nemusí se čekat na konec odpovědi.
+"""
+import json
+from typing import Any, Optional
+
+_CLOSING = {"{": "}", "[": "]"}
+
+
+class JsonStreamExtractor:
+    """Najde první JSON objekt (nebo pole) začínající znakem `opening`."""
+
+    def __init__(self, opening: str = "{"):
+        if opening not in _CLOSING:
+            raise ValueError("opening musí být '{' nebo '['")
+        self.opening = opening
+        self.result: Any = None
+        self.done = False
+        self.error: Optional[str] = None
+        self._buffer: list = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> bool:
+        """Zpracuje další část textu; vrací True, jakmile je hodnota kompletní."""
+        if self.done:
+            return True
+        for ch in chunk:
+            if self._depth == 0:
+                if ch != self.opening:
+                    continue
+                self._buffer = []
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    text = "".join(self._buffer)
+                    try:
+                        self.result = json.loads(text)
+                        self.done = True
+                        return True
+                    except ValueError as e:
+                        # Nevalidní úsek (např. ukázka v textu) - hledá se dál
+                        self.error = str(e)
+        return False
@@ -0,0 +1,205 @@
+"""
+Lokální a deterministické sestavení hodiny z kandidátních cviků.
+
+Pro každou část hodiny se z kandidátů vybere sada cviků, jejichž součet
+minut se co nejvíc blíží časové dotaci části a nepřekročí ji (0/1 batoh
+nad minutami), a to tak, aby:
+
+- každá zvolená podkategorie konstruktu (stránka Cvičební konstrukty)
+  byla pokryta aspoň jedním cvikem, pokud se to do dotace vejde,
+- se podkategorie v části ani mezi částmi zbytečně neopakovaly,
+- se žádný cvik neobjevil ve dvou částech.
+
+Výsledek je stejný pro stejný vstup a trvá jednotky milisekund. AI
+(`ai_integration.optimize_exercise_plan`) může pořadí volitelně doladit
+v `refine_with_ai`; její návrh se přijme, jen pokud obsahuje přesně
+stejné cviky.
+
+Délku cviku databáze neukládá: použije se klíč "time" (návrhy AI), jinak
+údaj "N min" z popisu, jinak DEFAULT_EXERCISE_MINUTES.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+SECTION_ORDER = ["main", "prep", "final"]
+DEFAULT_EXERCISE_MINUTES = 5
+MAX_EXERCISE_MINUTES = 45
+# Váhy hodnoty cviku v batohu: naplnění dotace je hlavní cíl, pokrytí
+# a pestrost rozhodují mezi stejně dlouhými kombinacemi
+WEIGHT_MINUTE = 100
+WEIGHT_WANTED = 60
+WEIGHT_NEW_SUBCATEGORY = 20
+PENALTY_REUSED = 15
+
+_MINUTES = re.compile(r"(\d{1,2})\s*min", re.IGNORECASE)
+
+
+def exercise_minutes(ex: Mapping[str, Any]) -> int:
+    """Odhad délky cviku v minutách."""
+    value = ex.get("time")
+    if value is None:
+        match = _MINUTES.search(ex.get("description") or "")
+        value = match.group(1) if match else DEFAULT_EXERCISE_MINUTES
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        minutes = DEFAULT_EXERCISE_MINUTES
+    return max(1, min(MAX_EXERCISE_MINUTES, minutes))
+
+
+def _subcategories(ex: Mapping[str, Any]) -> Set[Tuple[str, str]]:
+    return {(c["construct_type"], c["subcategory"]) for c in ex.get("categories") or []}
+
+
+def _wanted_set(wanted: Mapping[str, Iterable[str]]) -> Set[Tuple[str, str]]:
+    return {(ct, sub) for ct, subs in wanted.items() for sub in subs}
+
+
+def matches_constructs(ex: Mapping[str, Any], wanted: Mapping[str, Iterable[str]]) -> bool:
+    """Cvik patří aspoň do jedné zvolené podkategorie; bez výběru vyhovuje každý."""
+    wanted_set = _wanted_set(wanted)
+    return not wanted_set or bool(_subcategories(ex) & wanted_set)
+
+
+def _knapsack(items: List[Tuple[int, int]], budget: int) -> List[int]:
+    """0/1 batoh: indexy položek (minuty, hodnota) s max. hodnotou a součtem ≤ budget."""
+    # best[m] = (hodnota, vybrané indexy) pro součet přesně m minut
+    best: List[Optional[Tuple[int, List[int]]]] = [None] * (budget + 1)
+    best[0] = (0, [])
+    for i, (minutes, value) in enumerate(items):
+        for m in range(budget, minutes - 1, -1):
+            prev = best[m - minutes]
+            if prev is None:
+                continue
+            candidate = prev[0] + value
+            if best[m] is None or candidate > best[m][0]:
+                best[m] = (candidate, prev[1] + [i])
+    top = max((b for b in best if b is not None), key=lambda b: b[0])
+    return top[1]
+
+
+def compose_section(
+    candidates: List[Dict[str, Any]],
+    budget: int,
+    wanted: Mapping[str, Iterable[str]] = None,
+    exclude: Optional[Set[str]] = None,
+    used_subcategories: Optional[Set[Tuple[str, str]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Vybere a seřadí cviky jedné části hodiny.
+
+    Args:
+        candidates: cviky (s klíčem "categories", pokud se má hlídat pokrytí)
+        budget: časová dotace části v minutách
+        wanted: {construct_type: [podkategorie]} k pokrytí
+        exclude: id cviků už použitých v jiných částech
+        used_subcategories: podkategorie použité v jiných částech
+
+    Returns:
+        Vybrané cviky (kopie s klíčem "minutes") v pořadí pro hodinu
+    """
+    exclude = exclude or set()
+    used = used_subcategories or set()
+    wanted_set = _wanted_set(wanted or {})
+    pool = sorted(
+        (ex for ex in candidates if ex["id"] not in exclude),
+        key=lambda ex: (ex.get("name") or "", ex["id"])
+    )
+    chosen: List[Dict[str, Any]] = []
+    covered: Set[Tuple[str, str]] = set()
+    remaining = budget
+
+    # 1. Pokrytí: na každou chtěnou podkategorii nejkratší cvik, který se vejde
+    for target in sorted(wanted_set):
+        if target in covered:
+            continue
+        fitting = [ex for ex in pool if target in _subcategories(ex) and exercise_minutes(ex) <= remaining]
+        if not fitting:
+            continue
+        pick = min(fitting, key=lambda ex: (exercise_minutes(ex), -len(_subcategories(ex) & wanted_set)))
+        chosen.append(pick)
+        pool.remove(pick)
+        covered |= _subcategories(pick)
+        remaining -= exercise_minutes(pick)
+
+    # 2. Doplnění zbytku dotace batohem. Bonus za novou podkategorii dostane
+    # v každé podkategorii jen jeden (nejkratší) cvik - batoh hodnotí cviky
+    # každý zvlášť, a bonus pro všechny by vedl k co nejvíc krátkým cvikům
+    # téže podkategorie místo pestrosti
+    pool.sort(key=lambda ex: (exercise_minutes(ex), ex.get("name") or "", ex["id"]))
+    rewarded: Set[Tuple[str, str]] = set()
+    items = []
+    for ex in pool:
+        subs = _subcategories(ex)
+        fresh = subs - covered - rewarded
+        rewarded |= fresh
+        value = exercise_minutes(ex) * WEIGHT_MINUTE
+        value += WEIGHT_WANTED * len(fresh & wanted_set)
+        value += WEIGHT_NEW_SUBCATEGORY * len(fresh)
+        if subs and subs <= (covered | used):
+            value -= PENALTY_REUSED
+        items.append((exercise_minutes(ex), value))
+    if remaining > 0 and items:
+        chosen.extend(pool[i] for i in _knapsack(items, remaining))
+
+    # Pořadí: podle konstruktu a podkategorie, delší cviky uprostřed skupiny nevadí
+    ordered = sorted(chosen, key=lambda ex: (sorted(_subcategories(ex)) or [("", "")], ex.get("name") or "", ex["id"]))
+    return [{**ex, "minutes": exercise_minutes(ex)} for ex in ordered]
+
+
+def compose_lesson(
+    candidates: Mapping[str, List[Dict[str, Any]]],
+    budgets: Mapping[str, int],
+    wanted: Mapping[str, Iterable[str]] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Sestaví celou hodinu: {část: cviky}. Hlavní část se skládá první,
+    aby měla přednost u cviků vhodných pro více částí.
+    """
+    wanted = {ct: list(subs) for ct, subs in (wanted or {}).items()}
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    used_ids: Set[str] = set()
+    used_subs: Set[Tuple[str, str]] = set()
+    for section in SECTION_ORDER + [s for s in candidates if s not in SECTION_ORDER]:
+        if section not in candidates:
+            continue
+        picked = compose_section(
+            candidates[section], int(budgets.get(section, 0)), wanted, used_ids, used_subs
+        )
+        result[section] = picked
+        used_ids.update(ex["id"] for ex in picked)
+        for ex in picked:
+            used_subs |= _subcategories(ex)
+    return result
+
+
+def refine_with_ai(lesson: Dict[str, List[Dict[str, Any]]], use_cache: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Nechá AI doladit pořadí cviků v každé části. Výsledek AI se použije,
+    jen pokud obsahuje všechny cviky části (podle id převedeného na str,
+    neznámá id se přeskočí); jinak zůstane lokální pořadí.
+    """
+    from utils import ai_integration as ai
+
+    refined = {}
+    for section, exercises in lesson.items():
+        if len(exercises) < 2:
+            refined[section] = exercises
+            continue
+        brief = [
+            {"id": ex["id"], "name": ex.get("name"), "description": ex.get("description"), "time": ex["minutes"]}
+            for ex in exercises
+        ]
+        proposal = ai.optimize_exercise_plan(brief, use_cache=use_cache)
+        # Model může vrátit id jako číslo, vymyšlená id nebo některé vynechat
+        by_id = {str(ex["id"]): ex for ex in exercises}
+        order: List[str] = []
+        for item in proposal if isinstance(proposal, list) else []:
+            ex_id = str(item.get("id")) if isinstance(item, dict) else None
+            if ex_id in by_id and ex_id not in order:
+                order.append(ex_id)
+        if len(order) == len(by_id):
+            refined[section] = [by_id[ex_id] for ex_id in order]
+        else:
+            refined[section] = exercises
+    return refined
@@ -0,0 +1,223 @@
+"""
+Lokální generování textu na CPU jako náhrada Groq API bez sítě.
+
+Používá malý instrukční model (výchozí Qwen2.5 0.5B), jehož lineární vrstvy
+se při načtení dynamicky kvantizují na int8. Více promptů se generuje
+v jedné dávce a společný začátek promptů (instrukce a ukázka JSON, které
+sdílí všechny návrhy cviků) se přes model pošle jen jednou - jeho KV cache
+se uloží a pro každou dávku se jen zkopíruje. Nastavení v secrets.toml
+(vše volitelné):
+
+    [local_model]
+    model_id = "Qwen/Qwen2.5-0.5B-Instruct"
+    quantize = true
+    max_batch = 4
+    max_new_tokens = 256
+    threads = 4
+
+torch a transformers (requirements-ml.txt) se importují až při prvním použití.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+DEFAULT_MODEL_ID = "Qwen/Qwen2.5-0.5B-Instruct"
+DEFAULT_MAX_BATCH = 4
+DEFAULT_MAX_NEW_TOKENS = 256
+# Kolik různých společných začátků promptu držet v paměti
+PREFIX_CACHE_SIZE = 4
+# Kratší společný začátek se nevyplatí ukládat
+MIN_PREFIX_CHARS = 200
+
+
+class LocalModelError(Exception):
+    """Lokální model nelze načíst nebo spustit."""
+
+
+class LocalModel:
+    """Kvantizovaný kauzální jazykový model s dávkovým generováním a cache prefixů."""
+
+    def __init__(
+        self,
+        model_id: str = DEFAULT_MODEL_ID,
+        quantize: bool = True,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS,
+        threads: Optional[int] = None
+    ):
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError:
+            raise LocalModelError("Chybí torch/transformers - nainstalujte `pip install -r requirements-ml.txt`.")
+        self.torch = torch
+        self.model_id = model_id
+        self.max_batch = max_batch
+        self.max_new_tokens = max_new_tokens
+        if threads:
+            torch.set_num_threads(int(threads))
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.float32)
+        model.eval()
+        if quantize:
+            # Váhy lineárních vrstev v int8, aktivace se kvantizují za běhu
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.pad_id = self.tokenizer.pad_token_id
+        if self.pad_id is None:
+            self.pad_id = self.tokenizer.eos_token_id
+        # Jeden model, jedno generování najednou (model drží velké buffery)
+        self._lock = threading.Lock()
+        self._prefixes: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+
+    # --- Prompty ---
+
+    def _render(self, prompt: str) -> str:
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(
+                [{"role": "user", "content": prompt}], tokenize=False, add_generation_prompt=True
+            )
+        return prompt
+
+    def _split_prefix(self, texts: List[str]) -> str:
+        """Společný začátek textů zakončený koncem řádku (nebo '' je-li krátký)."""
+        if len(texts) > 1:
+            common = texts[0]
+            for text in texts[1:]:
+                i = 0
+                limit = min(len(common), len(text))
+                while i < limit and common[i] == text[i]:
+                    i += 1
+                common = common[:i]
+        else:
+            # Jediný prompt: použije se nejdelší už uložený prefix
+            common = max((p for p in self._prefixes if texts[0].startswith(p)), key=len, default="")
+        # Řez na konci řádku, aby se slovo nerozdělilo mezi dva tokenizované úseky
+        common = common[:common.rfind("\n") + 1]
+        return common if len(common) >= MIN_PREFIX_CHARS else ""
+
+    # --- KV cache prefixu ---
+
+    def _prefix_cache(self, prefix: str) -> Tuple[Any, Any]:
+        """Vrátí (token ids, KV cache) pro prefix; spočítá je jen poprvé."""
+        cached = self._prefixes.get(prefix)
+        if cached is not None:
+            self._prefixes.move_to_end(prefix)
+            return cached
+        ids = self.tokenizer(prefix, add_special_tokens=False, return_tensors="pt").input_ids
+        past = self.model(input_ids=ids, use_cache=True).past_key_values
+        self._prefixes[prefix] = (ids, past)
+        while len(self._prefixes) > PREFIX_CACHE_SIZE:
+            self._prefixes.popitem(last=False)
+        return ids, past
+
+    def _expand(self, past: Any, n: int) -> Any:
+        """Kopie KV cache pro dávku n promptů (uložený originál se nesmí měnit)."""
+        if hasattr(past, "batch_repeat_interleave"):
+            past = copy.deepcopy(past)
+            past.batch_repeat_interleave(n)
+            return past
+        return tuple(tuple(t.repeat_interleave(n, dim=0) for t in layer) for layer in past)
+
+    # --- Generování ---
+
+    def _generate_batch(self, texts: List[str], max_new_tokens: int, temperature: float) -> List[str]:
+        torch = self.torch
+        n = len(texts)
+        prefix = self._split_prefix(texts)
+        if prefix:
+            prefix_ids, prefix_past = self._prefix_cache(prefix)
+            past = self._expand(prefix_past, n)
+            prefix_len = prefix_ids.shape[1]
+        else:
+            past, prefix_len = None, 0
+        tails = [self.tokenizer(t[len(prefix):], add_special_tokens=False).input_ids for t in texts]
+        width = max(len(t) for t in tails)
+        # Zarovnání zleva: výplň mezi prefixem a koncem promptu je maskovaná
+        input_ids = torch.full((n, width), self.pad_id, dtype=torch.long)
+        mask = torch.zeros((n, prefix_len + width), dtype=torch.long)
+        mask[:, :prefix_len] = 1
+        for i, tail in enumerate(tails):
+            input_ids[i, width - len(tail):] = torch.tensor(tail, dtype=torch.long)
+            mask[i, prefix_len + width - len(tail):] = 1
+        positions = (mask.cumsum(-1) - 1).clamp(min=0)[:, prefix_len:]
+
+        eos = self.tokenizer.eos_token_id
+        finished = torch.zeros(n, dtype=torch.bool)
+        generated: List[List[int]] = [[] for _ in range(n)]
+        out = self.model(input_ids=input_ids, attention_mask=mask, position_ids=positions,
+                         past_key_values=past, use_cache=True)
+        for _ in range(max_new_tokens):
+            logits = out.logits[:, -1, :]
+            if temperature > 0:
+                probs = torch.softmax(logits / temperature, dim=-1)
+                next_ids = torch.multinomial(probs, 1).squeeze(-1)
+            else:
+                next_ids = logits.argmax(dim=-1)
+            next_ids = torch.where(finished, torch.full_like(next_ids, self.pad_id), next_ids)
+            for i in range(n):
+                if not finished[i]:
+                    generated[i].append(int(next_ids[i]))
+            finished |= next_ids == eos
+            if bool(finished.all()):
+                break
+            mask = torch.cat([mask, torch.ones((n, 1), dtype=torch.long)], dim=-1)
+            positions = mask.sum(-1, keepdim=True) - 1
+            out = self.model(input_ids=next_ids[:, None], attention_mask=mask, position_ids=positions,
+                             past_key_values=out.past_key_values, use_cache=True)
+        return [self.tokenizer.decode(ids, skip_special_tokens=True).strip() for ids in generated]
+
+    def generate(
+        self,
+        prompts: List[str],
+        max_new_tokens: Optional[int] = None,
+        temperature: float = 0.0
+    ) -> List[str]:
+        """Vygeneruje odpovědi na prompty po dávkách nejvýše max_batch promptů."""
+        max_new_tokens = min(max_new_tokens or self.max_new_tokens, self.max_new_tokens)
+        texts = [self._render(p) for p in prompts]
+        results: List[str] = []
+        with self._lock, self.torch.inference_mode():
+            for start in range(0, len(texts), self.max_batch):
+                results.extend(self._generate_batch(texts[start:start + self.max_batch], max_new_tokens, temperature))
+        return results
+
+    def warm_prefix(self, prompt_prefix: str) -> None:
+        """Předem spočítá KV cache pro společný začátek budoucích promptů."""
+        rendered = self._render(prompt_prefix + "\n")
+        head = rendered[:rendered.find(prompt_prefix) + len(prompt_prefix)]
+        head = head[:head.rfind("\n") + 1]
+        if len(head) >= MIN_PREFIX_CHARS:
+            with self._lock, self.torch.inference_mode():
+                self._prefix_cache(head)
+
+
+_model: Optional[LocalModel] = None
+_model_lock = threading.Lock()
+
+
+def local_model_settings() -> Dict[str, Any]:
+    try:
+        return dict(st.secrets["local_model"])
+    except Exception:
+        return {}
+
+
+def get_local_model() -> LocalModel:
+    """Vrátí procesově sdílený lokální model (načte se při prvním volání)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                cfg = local_model_settings()
+                _model = LocalModel(
+                    model_id=cfg.get("model_id", DEFAULT_MODEL_ID),
+                    quantize=bool(cfg.get("quantize", True)),
+                    max_batch=int(cfg.get("max_batch", DEFAULT_MAX_BATCH)),
+                    max_new_tokens=int(cfg.get("max_new_tokens", DEFAULT_MAX_NEW_TOKENS)),
+                    threads=cfg.get("threads")
+                )
+    return _model
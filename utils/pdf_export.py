@@ -0,0 +1,140 @@
+"""
+Export písemné přípravy do PDF v paměti (bez dočasných souborů).
+
+Unicode písmo Times (times.ttf, timesbd.ttf v kořeni projektu) se načte
+jen jednou za proces: rozparsované metriky glyfů (šířky znaků, mapování
+na glyfy) se sdílí mezi všemi dokumenty a každý dokument dostane jen
+vlastní kopii fontu pro vložení podmnožiny glyfů. Hromadný export běží
+v procesech, každý proces si písmo načte jednou při startu.
+
+fpdf se importuje až při prvním exportu (viz utils/import_budget.py).
+"""
+import copy
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.storage import BASE_DIR
+
+FONT_FAMILY = "TimesUnicode"
+# Styl -> soubor písma; název rodiny se nesmí krýt s vestavěným "Times"
+FONT_FILES = {"": "times.ttf", "B": "timesbd.ttf"}
+# Menší dávky se vykreslí v aktuálním procesu (start procesů by trval déle)
+MIN_PARALLEL_PLANS = 8
+
+_templates: Dict[str, Tuple[Any, bytes]] = {}
+_templates_lock = threading.Lock()
+
+
+def load_fonts() -> Dict[str, Tuple[Any, bytes]]:
+    """Rozparsuje písma jednou za proces; vrací {fontkey: (TTFFont, obsah souboru)}."""
+    if not _templates:
+        with _templates_lock:
+            if not _templates:
+                from fpdf import FPDF
+
+                pdf = FPDF()
+                for style, fname in FONT_FILES.items():
+                    path = os.path.join(BASE_DIR, fname)
+                    pdf.add_font(FONT_FAMILY, style, path)
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    fontkey = f"{FONT_FAMILY.lower()}{style}"
+                    _templates[fontkey] = (pdf.fonts[fontkey], data)
+    return _templates
+
+
+def _install_fonts(pdf: Any) -> None:
+    """Přidá do dokumentu písma ze sdílené šablony místo nového parsování."""
+    from fontTools.ttLib import TTFont
+    from fpdf.fonts import SubsetMap
+
+    for fontkey, (template, data) in load_fonts().items():
+        font = copy.copy(template)
+        # Metriky (cw, cmap, glyph_ids, desc) zůstávají sdílené; vlastní musí být
+        # jen tabulky fontu, které fpdf při vkládání podmnožiny přepisuje
+        font.ttfont = TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+        font.i = len(pdf.fonts) + 1
+        font.missing_glyphs = []
+        font.biggest_size_pt = 0
+        font._hbfont = None
+        font.subset = SubsetMap(font)
+        pdf.fonts[fontkey] = font
+
+
+def new_document() -> Any:
+    """Nový PDF dokument A4 s nainstalovaným písmem."""
+    from fpdf import FPDF
+
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(True, margin=15)
+    try:
+        _install_fonts(pdf)
+    except (AttributeError, ImportError, TypeError):
+        # Jiná verze fpdf2 bez stejných vnitřností - písmo se načte běžně
+        pdf.fonts.clear()
+        for style, fname in FONT_FILES.items():
+            pdf.add_font(FONT_FAMILY, style, os.path.join(BASE_DIR, fname))
+    return pdf
+
+
+def is_heading(line: str) -> bool:
+    return line.startswith("---") and line.endswith("---")
+
+
+def _add_plan(pdf: Any, plan_text: str, title: Optional[str] = None) -> None:
+    lines = plan_text.splitlines()
+    if title is None and lines:
+        title, lines = lines[0], lines[1:]
+    pdf.add_page()
+    if title:
+        pdf.set_font(FONT_FAMILY, "B", 16)
+        pdf.multi_cell(0, 8, title, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+    for line in lines:
+        if is_heading(line):
+            pdf.ln(2)
+            pdf.set_font(FONT_FAMILY, "B", 13)
+            pdf.multi_cell(0, 7, line.strip("- "), new_x="LMARGIN", new_y="NEXT")
+        elif line.strip():
+            pdf.set_font(FONT_FAMILY, "", 12)
+            pdf.multi_cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+        else:
+            pdf.ln(3)
+
+
+def render_plan_pdf(plan_text: str, title: Optional[str] = None) -> bytes:
+    """
+    Vykreslí textovou přípravu (formát z page_generate_plan) do PDF.
+
+    První řádek (nebo `title`) je nadpis, řádky "--- Část (N min) ---"
+    jsou podnadpisy částí hodiny, ostatní řádky běžný text.
+    """
+    pdf = new_document()
+    _add_plan(pdf, plan_text, title)
+    return bytes(pdf.output())
+
+
+def render_plans_pdf(plans: List[str]) -> bytes:
+    """Více příprav v jednom PDF, každá od nové stránky (písmo se vloží jen jednou)."""
+    pdf = new_document()
+    for plan_text in plans:
+        _add_plan(pdf, plan_text)
+    return bytes(pdf.output())
+
+
+def render_plans_batch(plans: List[str], max_workers: Optional[int] = None) -> List[bytes]:
+    """
+    Vykreslí více příprav najednou; výsledky jsou ve stejném pořadí.
+
+    Větší dávky se rozdělí mezi procesy (písmo se v každém načte jednou
+    při startu), malé se vykreslí přímo.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if len(plans) < MIN_PARALLEL_PLANS or workers == 1:
+        return [render_plan_pdf(text) for text in plans]
+    chunksize = max(1, len(plans) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_fonts) as pool:
+        return list(pool.map(render_plan_pdf, plans, chunksize=chunksize))
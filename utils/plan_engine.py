@@ -0,0 +1,205 @@
+"""
+Sestavení písemné přípravy z výběru, nezávislé na Streamlitu.
+
+`build_plan(selection)` dostane celý výběr jako slovník (třída, školy
+a jejich kategorie, konstrukty, prostředí, vybavení, vedoucí částí,
+id vybraných cviků a časy částí) a vrátí hotovou přípravu. Výsledek se
+pamatuje podle otisku výběru, takže rerun bez změny výběru nic nestojí;
+s výchozím načítáním cviků platí jen do změny verze katalogu.
+Stejný engine používá stránka aplikace i neinteraktivní volání.
+
+Tvar výběru (chybějící klíče mají výchozí hodnoty):
+
+    {
+        "class_grade": "3. třída",
+        "schools": ["ZŠ ..."], "school_category": {"ZŠ ...": "..."},
+        "constructs": {"fitness": [...], "manipulation": [...], "locomotion": [...]},
+        "environment": "Tělocvična", "equipment": ["Míč"],
+        "leaders": {"prep": "Trenér", "main": "Učitel", "final": "Oba"},
+        "exercises": {"prep": [id, ...], "main": [...], "final": [...]},
+        "times": {"prep": 10, "main": 25, "final": 10},
+        "date": "2026-10-17",
+    }
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date as date_cls
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from utils.tracing import record_cache
+
+SECTIONS = [("prep", "Přípravná část"), ("main", "Hlavní část"), ("final", "Závěrečná část")]
+DEFAULT_TIMES = {"prep": 10, "main": 25, "final": 10}
+DEFAULT_LEADERS = {"prep": "Trenér", "main": "Učitel", "final": "Oba"}
+CONSTRUCT_LABELS = [("fitness", "Zdatnost"), ("manipulation", "Manipulace s předměty"), ("locomotion", "Lokomoce")]
+
+# Hotové přípravy podle otisku výběru; po PLAN_TTL s nebo po změně cviků
+# (verze katalogu) se cviky načtou znovu. Bez fungujících verzí katalogu
+# platí kratší TTL (catalog_version.versioned_ttl)
+PLAN_TTL = 3600
+PLAN_CACHE_SIZE = 256
+
+_memo: "OrderedDict[str, Tuple[float, Optional[int], Dict[str, Any]]]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def selection_from_state(state: Mapping[str, Any]) -> Dict[str, Any]:
+    """Výběr ze session_state stránek aplikace."""
+    return {
+        "class_grade": state.get("class_grade", ""),
+        "schools": list(state.get("selected_schools", [])),
+        "school_category": dict(state.get("school_category", {})),
+        "constructs": {key: list(state.get(key, [])) for key, _ in CONSTRUCT_LABELS},
+        "environment": state.get("environment", ""),
+        "equipment": list(state.get("equipment", [])),
+        "leaders": {
+            "prep": state.get("prep_leader", DEFAULT_LEADERS["prep"]),
+            "main": state.get("main_leader", DEFAULT_LEADERS["main"]),
+            "final": state.get("final_leader", DEFAULT_LEADERS["final"]),
+        },
+        "exercises": {key: list(state.get(f"selected_exercises_{key}", [])) for key, _ in SECTIONS},
+        "times": {key: int(state.get(f"{key}_time", DEFAULT_TIMES[key])) for key, _ in SECTIONS},
+        "date": date_cls.today().isoformat(),
+    }
+
+
+def fingerprint(selection: Mapping[str, Any]) -> str:
+    """Otisk výběru nezávislý na pořadí klíčů."""
+    raw = json.dumps(selection, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _default_loader(exercise_ids: List[str]) -> List[Dict[str, Any]]:
+    from utils import database as db
+
+    return db.get_exercises_by_ids(exercise_ids)
+
+
+def _catalog_version() -> int:
+    from utils.catalog_version import get_catalog_version
+
+    return get_catalog_version().current("exercises")
+
+
+def _plan_ttl() -> float:
+    from utils.catalog_version import versioned_ttl
+
+    return versioned_ttl(PLAN_TTL)
+
+
+def _render_text(plan: Dict[str, Any]) -> str:
+    lines = [plan["title"], ""]
+    if plan["schools"]:
+        schools = [
+            f"{school} ({plan['school_category'][school]})" if plan["school_category"].get(school) else school
+            for school in plan["schools"]
+        ]
+        lines.append(f"Školy: {', '.join(schools)}")
+    if plan["environment"]:
+        equipment = ", ".join(plan["equipment"]) if plan["equipment"] else "bez vybavení"
+        lines.append(f"Prostředí: {plan['environment']}, vybavení: {equipment}")
+    for key, label in CONSTRUCT_LABELS:
+        if plan["constructs"].get(key):
+            lines.append(f"{label}: {', '.join(plan['constructs'][key])}")
+    lines.append("")
+    for section in plan["sections"]:
+        lines.append(f"--- {section['label']} ({section['minutes']} min) ---")
+        lines.append(f"Vede: {section['leader']}")
+        for ex in section["exercises"]:
+            lines.append(f"- {ex['name']}: {ex['description']}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _build(selection: Mapping[str, Any], loader: Callable[[List[str]], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    chosen = selection.get("exercises") or {}
+    for key, label in SECTIONS:
+        if not chosen.get(key):
+            raise ValueError("Vyberte cviky ve všech částech.")
+    all_ids = [ex_id for key, _ in SECTIONS for ex_id in chosen[key]]
+    by_id = {ex["id"]: ex for ex in loader(all_ids)}
+    missing = [ex_id for ex_id in all_ids if ex_id not in by_id]
+    if missing:
+        raise ValueError(f"Některé vybrané cviky už neexistují ({len(missing)}).")
+
+    times = {**DEFAULT_TIMES, **(selection.get("times") or {})}
+    leaders = {**DEFAULT_LEADERS, **(selection.get("leaders") or {})}
+    plan_date = selection.get("date") or date_cls.today().isoformat()
+    plan = {
+        "title": f"{selection.get('class_grade', '')} – Příprava hodiny {plan_date}",
+        "date": plan_date,
+        "class_grade": selection.get("class_grade", ""),
+        "schools": list(selection.get("schools") or []),
+        "school_category": dict(selection.get("school_category") or {}),
+        "constructs": dict(selection.get("constructs") or {}),
+        "environment": selection.get("environment", ""),
+        "equipment": list(selection.get("equipment") or []),
+        "sections": [
+            {
+                "key": key,
+                "label": label,
+                "minutes": int(times[key]),
+                "leader": leaders[key],
+                "exercises": [
+                    {k: by_id[ex_id].get(k) for k in ("id", "name", "description", "location", "materials")}
+                    for ex_id in chosen[key]
+                ],
+            }
+            for key, label in SECTIONS
+        ],
+        "total_minutes": sum(int(times[key]) for key, _ in SECTIONS),
+    }
+    plan["text"] = _render_text(plan)
+    return plan
+
+
+def build_plan(
+    selection: Mapping[str, Any],
+    loader: Optional[Callable[[List[str]], List[Dict[str, Any]]]] = None,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Sestaví přípravu z výběru.
+
+    Args:
+        selection: výběr (viz docstring modulu)
+        loader: funkce id -> cviky; výchozí db.get_exercises_by_ids
+        use_cache: False = sestavit znovu i při stejném otisku
+
+    Returns:
+        Slovník s klíči title, date, class_grade, schools, sections
+        (key, label, minutes, leader, exercises), total_minutes, text
+        a fingerprint. Vrácený slovník je sdílený - neupravovat.
+
+    Raises:
+        ValueError: některá část nemá vybrané cviky nebo cvik neexistuje
+    """
+    key = fingerprint(selection)
+    now = time.monotonic()
+    # Vlastní loader (snímek katalogu) na verzi databáze nezávisí
+    version = _catalog_version() if loader is None else None
+    if use_cache:
+        with _memo_lock:
+            item = _memo.get(key)
+            if item is not None and item[0] > now and item[1] == version:
+                _memo.move_to_end(key)
+                record_cache("plan", True)
+                return item[2]
+        record_cache("plan", False)
+    plan = _build(selection, loader or _default_loader)
+    plan["fingerprint"] = key
+    ttl = _plan_ttl() if loader is None else PLAN_TTL
+    with _memo_lock:
+        _memo[key] = (now + ttl, version, plan)
+        _memo.move_to_end(key)
+        while len(_memo) > PLAN_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return plan
+
+
+def clear_cache() -> None:
+    with _memo_lock:
+        _memo.clear()
@@ -0,0 +1,118 @@
+"""
+Hromadný export uložených příprav do ZIP archivu (text, PDF nebo Word).
+
+Archiv se zapisuje průběžně do souboru: každá příprava se vykreslí,
+zapíše jako jedna položka a zahodí, takže paměť nezávisí na počtu
+příprav. PDF a DOCX se vykreslují v procesech; rozpracovaných je vždy
+nejvýše několik příprav na proces a výsledky se zapisují v pořadí zadání.
+Text se do archivu kopíruje přímo ze souboru.
+"""
+import io
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from utils import pdf_export
+from utils.plan_store import PlanStore
+
+FORMATS = {"txt": "Text (.txt)", "pdf": "PDF (.pdf)", "docx": "Word (.docx)"}
+# Kolik příprav na jeden proces může čekat na zápis do archivu
+IN_FLIGHT_PER_WORKER = 4
+
+
+def render_plan_docx(plan_text: str) -> bytes:
+    """Vykreslí textovou přípravu do dokumentu Word (stejné členění jako PDF)."""
+    from docx import Document
+
+    lines = plan_text.splitlines()
+    doc = Document()
+    if lines:
+        doc.add_heading(lines[0], level=1)
+    for line in lines[1:]:
+        if pdf_export.is_heading(line):
+            doc.add_heading(line.strip("- "), level=2)
+        elif line.strip():
+            doc.add_paragraph(line)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _render_file(path: str, fmt: str) -> bytes:
+    """Načte přípravu ze souboru a vykreslí ji (běží i v pracovním procesu)."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if fmt == "pdf":
+        return pdf_export.render_plan_pdf(text)
+    return render_plan_docx(text)
+
+
+def _init_worker(fmt: str) -> None:
+    if fmt == "pdf":
+        pdf_export.load_fonts()
+
+
+def _arcname(entry: Dict[str, Any], fmt: str) -> str:
+    return os.path.splitext(entry["name"])[0] + "." + fmt
+
+
+def export_zip(
+    store: PlanStore,
+    entries: List[Dict[str, Any]],
+    fmt: str,
+    fileobj: IO[bytes],
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Zapíše přípravy `entries` (záznamy z manifestu) do ZIP archivu `fileobj`.
+
+    Args:
+        fmt: "txt", "pdf" nebo "docx"
+        max_workers: počet procesů pro PDF/DOCX (výchozí počet CPU; 1 = bez procesů)
+        progress: volá se jako progress(hotovo, celkem) po každé položce
+
+    Returns:
+        Počet zapsaných příprav
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Neznámý formát exportu: {fmt}")
+    total = len(entries)
+    # DOCX je sám zip a PDF má komprimované streamy - nekomprimuje se znovu
+    compression = zipfile.ZIP_DEFLATED if fmt == "txt" else zipfile.ZIP_STORED
+    workers = max_workers or os.cpu_count() or 1
+    written = 0
+    with zipfile.ZipFile(fileobj, "w", compression) as archive:
+        if fmt == "txt":
+            for entry in entries:
+                archive.write(store.path(entry["name"]), _arcname(entry, fmt))
+                written += 1
+                if progress:
+                    progress(written, total)
+        elif workers == 1 or total < 2:
+            for entry in entries:
+                archive.writestr(_arcname(entry, fmt), _render_file(store.path(entry["name"]), fmt))
+                written += 1
+                if progress:
+                    progress(written, total)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(fmt,)) as pool:
+                pending: Deque[Tuple[Dict[str, Any], Future]] = deque()
+                queue = iter(entries)
+                limit = workers * IN_FLIGHT_PER_WORKER
+                while True:
+                    # Doplní frontu rozpracovaných, zapisuje se vždy nejstarší
+                    for entry in queue:
+                        pending.append((entry, pool.submit(_render_file, store.path(entry["name"]), fmt)))
+                        if len(pending) >= limit:
+                            break
+                    if not pending:
+                        break
+                    entry, future = pending.popleft()
+                    archive.writestr(_arcname(entry, fmt), future.result())
+                    written += 1
+                    if progress:
+                        progress(written, total)
+    return written
@@ -0,0 +1,267 @@
+"""
+Uložené přípravy ve složce output/ s manifestem metadat.
+
+Každá příprava je jeden textový soubor; `.manifest.json` ve stejné složce
+drží pro každý soubor datum, třídu, školy, části hodiny a velikost. Seznam
+příprav, filtrování i stránkování tak pracují jen s manifestem a obsah
+souboru se čte až při otevření přípravy.
+
+Manifest se udržuje při uložení a smazání přes `PlanStore`. Soubory
+přidané do složky jinak (ručně, starší verzí aplikace) se do manifestu
+doplní, jakmile se změní mtime složky - jen ty nové se přečtou.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.search_index import fold
+from utils.storage import BASE_DIR, _atomic_write_json, _file_lock
+
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+MANIFEST_NAME = ".manifest.json"
+PLAN_SUFFIX = ".txt"
+
+_HEADING = re.compile(r"^---\s*(.+?)\s*(?:\(\d+ min\))?\s*---$")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def _plan_meta(text: str) -> Dict[str, Any]:
+    """Metadata z textu přípravy (pro soubory uložené mimo PlanStore)."""
+    lines = text.splitlines()
+    title = lines[0].strip() if lines else ""
+    date = _DATE.search(title)
+    sections = [m.group(1) for m in map(_HEADING.match, lines) if m]
+    return {
+        "title": title,
+        "class_grade": title.split(" – ")[0] if " – " in title else "",
+        "date": date.group(0) if date else "",
+        "schools": [],
+        "sections": sections,
+    }
+
+
+class PlanStore:
+    """Přípravy ve složce s manifestem načteným v paměti."""
+
+    def __init__(self, directory: str = OUTPUT_DIR):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._manifest_stamp: Optional[Tuple[int, int]] = None
+        self._dir_stamp: Optional[int] = None
+        # Seřazené záznamy a text pro hledání; None = přepočítat po změně
+        self._sorted: Optional[List[Dict[str, Any]]] = None
+        self._haystacks: Dict[str, str] = {}
+
+    # --- Manifest ---
+
+    def _stat(self, path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return {e["name"]: e for e in json.load(f).get("plans", [])}
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _write_manifest(self) -> None:
+        _atomic_write_json(self.manifest_path, {"plans": list(self._entries.values())})
+        self._sorted = None
+        info = self._stat(self.manifest_path)
+        self._manifest_stamp = (info.st_mtime_ns, info.st_size) if info else None
+        info = self._stat(self.directory)
+        self._dir_stamp = info.st_mtime_ns if info else None
+
+    def _scan(self) -> bool:
+        """Srovná manifest s obsahem složky; vrací True, pokud se něco změnilo."""
+        names = {
+            entry.name for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith(PLAN_SUFFIX) and not entry.name.startswith(".")
+        }
+        changed = False
+        for name in list(self._entries):
+            if name not in names:
+                del self._entries[name]
+                changed = True
+        for name in names - self._entries.keys():
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            info = os.stat(path)
+            meta = _plan_meta(text)
+            if not meta["date"]:
+                meta["date"] = datetime.fromtimestamp(info.st_mtime).date().isoformat()
+            self._entries[name] = {"name": name, **meta, "size": info.st_size, "created": info.st_mtime}
+            changed = True
+        return changed
+
+    def _refresh(self) -> None:
+        """Načte manifest znovu, jen pokud ho změnil jiný proces nebo se změnila složka."""
+        info = self._stat(self.manifest_path)
+        stamp = (info.st_mtime_ns, info.st_size) if info else None
+        dir_info = self._stat(self.directory)
+        dir_stamp = dir_info.st_mtime_ns if dir_info else None
+        if stamp == self._manifest_stamp and dir_stamp == self._dir_stamp:
+            return
+        with _file_lock(self.manifest_path):
+            self._entries = self._read_manifest()
+            if self._scan() or info is None:
+                self._write_manifest()
+            else:
+                self._manifest_stamp = stamp
+                self._dir_stamp = dir_stamp
+                self._sorted = None
+
+    # --- Veřejné rozhraní ---
+
+    def _new_entry(
+        self,
+        plan_text: str,
+        class_grade: str = "",
+        schools: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        date: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bytes]:
+        now = time.time()
+        stamp = datetime.fromtimestamp(now).strftime("%Y%m%d-%H%M%S")
+        name = f"priprava_{stamp}_{uuid.uuid4().hex[:6]}{PLAN_SUFFIX}"
+        data = plan_text.encode("utf-8")
+        meta = _plan_meta(plan_text)
+        entry = {
+            "name": name,
+            "title": meta["title"],
+            "class_grade": class_grade or meta["class_grade"],
+            "date": date or meta["date"] or datetime.fromtimestamp(now).date().isoformat(),
+            "schools": list(schools or []),
+            "sections": list(sections if sections is not None else meta["sections"]),
+            "size": len(data),
+            "created": now,
+        }
+        return entry, data
+
+    def save(
+        self,
+        plan_text: str,
+        class_grade: str = "",
+        schools: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Uloží přípravu do nového souboru a vrátí její záznam z manifestu."""
+        return self.save_many([(plan_text, {
+            "class_grade": class_grade, "schools": schools, "sections": sections, "date": date,
+        })])[0]
+
+    def save_many(self, plans: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Uloží více příprav najednou; položka je (text, metadata jako u `save`).
+        Manifest se zapíše jen jednou.
+        """
+        new = [self._new_entry(text, **meta) for text, meta in plans]
+        with self._lock, _file_lock(self.manifest_path):
+            for entry, data in new:
+                with open(os.path.join(self.directory, entry["name"]), "wb") as f:
+                    f.write(data)
+            # Změny jiných procesů se převezmou před zápisem
+            self._entries = self._read_manifest()
+            self._entries.update((entry["name"], entry) for entry, _ in new)
+            self._scan()
+            self._write_manifest()
+        return [entry for entry, _ in new]
+
+    def delete(self, name: str) -> bool:
+        with self._lock, _file_lock(self.manifest_path):
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                return False
+            self._entries = self._read_manifest()
+            self._entries.pop(name, None)
+            self._write_manifest()
+        return True
+
+    def path(self, name: str) -> str:
+        """Cesta k souboru přípravy (jen název souboru ve složce úložiště)."""
+        if os.path.basename(name) != name or not name.endswith(PLAN_SUFFIX):
+            raise ValueError(f"Neplatný název přípravy: {name}")
+        return os.path.join(self.directory, name)
+
+    def load(self, name: str) -> str:
+        """Obsah jedné přípravy."""
+        with open(self.path(name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Všechny záznamy, nejnovější první."""
+        with self._lock:
+            self._refresh()
+            if self._sorted is None:
+                self._sorted = sorted(self._entries.values(), key=lambda e: e["created"], reverse=True)
+                self._haystacks = {
+                    e["name"]: fold(" ".join([e["title"], e["class_grade"], e["date"], *e["schools"]]))
+                    for e in self._sorted
+                }
+            return self._sorted
+
+    def class_grades(self) -> List[str]:
+        return sorted({e["class_grade"] for e in self.entries() if e["class_grade"]})
+
+    def schools(self) -> List[str]:
+        return sorted({s for e in self.entries() for s in e["schools"]})
+
+    def query(
+        self,
+        text: Optional[str] = None,
+        class_grade: Optional[str] = None,
+        school: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Filtrované záznamy (nejnovější první) a jejich celkový počet.
+
+        `text` se hledá bez ohledu na diakritiku v názvu, třídě, školách
+        a datu; `offset`/`limit` vyberou stránku.
+        """
+        needle = fold(text.strip()) if text else ""
+        with self._lock:
+            entries, haystacks = self.entries(), self._haystacks
+        result = []
+        for entry in entries:
+            if class_grade and entry["class_grade"] != class_grade:
+                continue
+            if school and school not in entry["schools"]:
+                continue
+            if needle and needle not in haystacks[entry["name"]]:
+                continue
+            result.append(entry)
+        end = None if limit is None else offset + limit
+        return result[offset:end], len(result)
+
+
+_store: Optional[PlanStore] = None
+_store_lock = threading.Lock()
+
+
+def get_plan_store() -> PlanStore:
+    """Vrátí procesově sdílené úložiště příprav ve složce output/."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PlanStore(OUTPUT_DIR)
+    return _store
@@ -0,0 +1,442 @@
+"""
+Lokální náhrada PostgREST/Supabase REST API pro vývoj a testování bez sítě.
+
+Server drží tabulky v paměti a rozumí podmnožině PostgREST, kterou používá
+`utils/database.py`: výběr sloupců včetně vnořených relací (`tabulka!inner(...)`),
+filtry eq/neq/gt/gte/lt/lte/like/ilike/in/is/cs/cd (i s `not.`), `or=(...)`,
+filtry nad vnořenými tabulkami, řazení, limit/offset a insert/update/delete
+s vrácením řádků. Tabulka `catalog_version` a funkce `bump_catalog_version`
+(viz `utils/catalog_version.py`) jsou k dispozici vždy. Spuštění:
+
+    python -m utils.postgrest_stub --port 54321 --seed data/exercises.json
+
+a v .streamlit/secrets.toml:
+
+    [supabase]
+    url = "http://127.0.0.1:54321"
+    key = "local.stub.key"
+"""
+import argparse
+import fnmatch
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# Cizí klíče: podřízená tabulka -> (sloupec, nadřízená tabulka, sloupec)
+FOREIGN_KEYS = {
+    "exercise_sections": ("exercise_id", "exercises", "id"),
+    "exercise_categories": ("exercise_id", "exercises", "id"),
+}
+TABLES = ["exercises", "exercise_sections", "exercise_categories", "resources", "catalog_version"]
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "or", "and", "on_conflict", "columns"}
+
+
+# --- Parsování PostgREST syntaxe ---
+
+def _split_top(text: str, sep: str = ",") -> List[str]:
+    """Rozdělí text podle `sep` mimo závorky a uvozovky."""
+    parts, depth, quoted, escaped, buf = [], 0, False, False, []
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif ch == "\\" and quoted:
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "({":
+            depth += 1
+        elif not quoted and ch in ")}":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append("".join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+    if buf:
+        parts.append("".join(buf))
+    return parts
+
+
+def _unquote_value(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _parse_list(value: str) -> List[str]:
+    """Převede `(a,b)` nebo `{a,b}` na seznam hodnot."""
+    inner = value[1:-1] if value[:1] in "({" else value
+    return [_unquote_value(v) for v in _split_top(inner)] if inner else []
+
+
+def _coerce(value: str, sample: Any) -> Any:
+    if isinstance(sample, bool):
+        return value.lower() == "true"
+    if isinstance(sample, int):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if isinstance(sample, float):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _like(value: Any, pattern: str, insensitive: bool) -> bool:
+    if value is None:
+        return False
+    pattern = pattern.replace("%", "*")
+    value = str(value)
+    if insensitive:
+        return fnmatch.fnmatchcase(value.lower(), pattern.lower())
+    return fnmatch.fnmatchcase(value, pattern)
+
+
+def _compare(op: str, value: Any, arg: str) -> bool:
+    if op == "is":
+        if arg == "null":
+            return value is None
+        return value is (arg == "true")
+    if op == "in":
+        return value is not None and str(value) in _parse_list(arg)
+    if op in ("cs", "cd", "ov"):
+        if value is None:
+            return False
+        items = set(_parse_list(arg))
+        have = {str(v) for v in value}
+        if op == "cs":
+            return items <= have
+        if op == "cd":
+            return have <= items
+        return bool(have & items)
+    if op in ("like", "ilike"):
+        return _like(value, _unquote_value(arg), op == "ilike")
+    if value is None:
+        return False
+    target = _coerce(_unquote_value(arg), value)
+    try:
+        return {
+            "eq": value == target,
+            "neq": value != target,
+            "gt": value > target,
+            "gte": value >= target,
+            "lt": value < target,
+            "lte": value <= target,
+        }[op]
+    except (KeyError, TypeError):
+        raise ValueError(f"Nepodporovaný operátor: {op}")
+
+
+def _make_predicate(column: str, expr: str) -> Callable[[Dict[str, Any]], bool]:
+    """Z `op.hodnota` (případně `not.op.hodnota`) vytvoří predikát nad řádkem."""
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, arg = expr.partition(".")
+
+    def pred(row: Dict[str, Any]) -> bool:
+        result = _compare(op, row.get(column), arg)
+        return not result if negate else result
+    return pred
+
+
+def _parse_logic(kind: str, body: str) -> Callable[[Dict[str, Any]], bool]:
+    """Zpracuje `or=(...)` / `and=(...)` včetně vnořených skupin."""
+    preds = []
+    for item in _split_top(body[1:-1] if body.startswith("(") else body):
+        negate = item.startswith("not.")
+        core = item[4:] if negate else item
+        if core.startswith(("and(", "or(")):
+            sub_kind, _, rest = core.partition("(")
+            pred = _parse_logic(sub_kind, "(" + rest)
+        else:
+            column, _, expr = core.partition(".")
+            pred = _make_predicate(column, expr)
+        preds.append((lambda p: (lambda r: not p(r)))(pred) if negate else pred)
+    if kind == "or":
+        return lambda r: any(p(r) for p in preds)
+    return lambda r: all(p(r) for p in preds)
+
+
+def _parse_select(text: str) -> Tuple[List[str], List[Tuple[str, str, bool, str]]]:
+    """Vrátí (sloupce, vnořené relace [(alias, tabulka, inner, vnořený select)])."""
+    columns, embeds = [], []
+    for item in _split_top(text or "*"):
+        item = item.strip()
+        if "(" in item:
+            head, _, rest = item.partition("(")
+            alias, _, table = head.rpartition(":")
+            table, _, hint = table.partition("!")
+            embeds.append((alias or table, table, hint == "inner", rest[:-1]))
+        else:
+            columns.append(item.split("::")[0].split(":")[-1])
+    return columns, embeds
+
+
+# --- Úložiště v paměti ---
+
+class PostgrestStub:
+    """Tabulky v paměti a vyhodnocení PostgREST dotazů nad nimi."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {t: [] for t in TABLES}
+        self.rpcs: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.register_rpc("bump_catalog_version", self._bump_catalog_version)
+
+    def seed_from_json(self, path: str) -> None:
+        """Naplní tabulky z exercises.json (klíče exercises/categories/sections/resources)."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self.lock:
+            self.tables["exercises"].extend(data.get("exercises", []))
+            self.tables["exercise_categories"].extend(data.get("categories", []))
+            self.tables["exercise_sections"].extend(data.get("sections", []))
+            self.tables["resources"].extend(data.get("resources", []))
+
+    def register_rpc(self, name: str, fn: Callable[[Dict[str, Any]], Any]) -> None:
+        self.rpcs[name] = fn
+
+    def _bump_catalog_version(self, args: Dict[str, Any]) -> int:
+        """Obdoba SQL funkce bump_catalog_version: atomicky zvýší verzi oblasti."""
+        scope = args.get("p_scope")
+        now = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            rows = self.tables["catalog_version"]
+            row = next((r for r in rows if r["scope"] == scope), None)
+            if row is None:
+                row = {"scope": scope, "version": 0}
+                rows.append(row)
+            row["version"] += 1
+            row["updated_at"] = now
+            return row["version"]
+
+    # Vnořené relace
+
+    def _related(self, table: str, child: str, row: Dict[str, Any]) -> Any:
+        fk = FOREIGN_KEYS.get(child)
+        if fk and fk[1] == table:
+            col, _, ref = fk
+            return [r for r in self.tables.get(child, []) if r.get(col) == row.get(ref)]
+        fk = FOREIGN_KEYS.get(table)
+        if fk and fk[1] == child:
+            col, _, ref = fk
+            return next((r for r in self.tables[child] if r.get(ref) == row.get(col)), None)
+        raise ValueError(f"Neznámá relace {table} -> {child}")
+
+    def _shape(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        select: str,
+        embed_filters: Dict[str, List[Callable]]
+    ) -> List[Dict[str, Any]]:
+        columns, embeds = _parse_select(select)
+        out = []
+        for row in rows:
+            item = dict(row) if "*" in columns else {c: row.get(c) for c in columns}
+            keep = True
+            for alias, child, inner, sub_select in embeds:
+                related = self._related(table, child, row)
+                preds = embed_filters.get(alias, [])
+                if isinstance(related, list):
+                    related = [r for r in related if all(p(r) for p in preds)]
+                    if inner and not related:
+                        keep = False
+                    item[alias] = self._shape(child, related, sub_select, {})
+                else:
+                    if related is not None and not all(p(related) for p in preds):
+                        related = None
+                    if inner and related is None:
+                        keep = False
+                    item[alias] = self._shape(child, [related], sub_select, {})[0] if related else None
+            if keep:
+                out.append(item)
+        return out
+
+    def _filter(self, table: str, params: List[Tuple[str, str]]):
+        preds, embed_filters = [], {}
+        for key, value in params:
+            if key in ("or", "and"):
+                preds.append(_parse_logic(key, value))
+            elif key.endswith((".or", ".and")):
+                ref, _, kind = key.rpartition(".")
+                embed_filters.setdefault(ref, []).append(_parse_logic(kind, value))
+            elif key in RESERVED_PARAMS or key.endswith((".limit", ".order", ".offset")):
+                continue
+            elif "." in key:
+                ref, _, column = key.rpartition(".")
+                embed_filters.setdefault(ref, []).append(_make_predicate(column, value))
+            else:
+                preds.append(_make_predicate(key, value))
+        rows = [r for r in self.tables[table] if all(p(r) for p in preds)]
+        return rows, embed_filters
+
+    @staticmethod
+    def _order(rows: List[Dict[str, Any]], order: List[str]) -> List[Dict[str, Any]]:
+        terms = [t for spec in order for t in spec.split(",") if t]
+        for term in reversed(terms):
+            parts = term.split(".")
+            column, desc = parts[0], "desc" in parts[1:]
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            rows = present + missing if "nullsfirst" not in parts else missing + present
+        return rows
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows, embed_filters = self._filter(table, params)
+            rows = self._order(rows, [v for k, v in params if k == "order"])
+            rows = self._shape(table, rows, dict(params).get("select", "*"), embed_filters)
+            offset = int(dict(params).get("offset", 0))
+            limit = dict(params).get("limit")
+            return rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+
+    def insert(self, table: str, payload: Any) -> List[Dict[str, Any]]:
+        rows = payload if isinstance(payload, list) else [payload]
+        now = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            created = []
+            for row in rows:
+                row = dict(row)
+                if table not in FOREIGN_KEYS:
+                    row.setdefault("id", str(uuid.uuid4()))
+                    row.setdefault("created_at", now)
+                self.tables.setdefault(table, []).append(row)
+                created.append(dict(row))
+            return created
+
+    def update(self, table: str, params: List[Tuple[str, str]], changes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc).isoformat()
+        changes = {k: (now if v == "now()" else v) for k, v in changes.items()}
+        with self.lock:
+            rows, _ = self._filter(table, params)
+            for row in rows:
+                row.update(changes)
+            return [dict(r) for r in rows]
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows, _ = self._filter(table, params)
+            ids = {id(r) for r in rows}
+            self.tables[table] = [r for r in self.tables[table] if id(r) not in ids]
+            # ON DELETE CASCADE
+            for child, (col, parent, ref) in FOREIGN_KEYS.items():
+                if parent == table:
+                    gone = {r.get(ref) for r in rows}
+                    self.tables[child] = [r for r in self.tables[child] if r.get(col) not in gone]
+            return [dict(r) for r in rows]
+
+
+# --- HTTP vrstva ---
+
+def _make_handler(stub: PostgrestStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _route(self) -> Tuple[Optional[str], Optional[str], List[Tuple[str, str]]]:
+            parts = urlsplit(self.path)
+            path = unquote(parts.path).rstrip("/")
+            params = parse_qsl(parts.query, keep_blank_values=True)
+            if path.startswith("/rest/v1/rpc/"):
+                return "rpc", path[len("/rest/v1/rpc/"):], params
+            if path.startswith("/rest/v1/"):
+                return "table", path[len("/rest/v1/"):], params
+            return None, None, params
+
+        def _body(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null") if length else None
+
+        def _send(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if isinstance(payload, list):
+                self.send_header("Content-Range", f"0-{max(len(payload) - 1, 0)}/{len(payload)}")
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _handle(self, method: str) -> None:
+            try:
+                # Tělo je nutné přečíst vždy, jinak by zbylo ve spojení (keep-alive)
+                body = self._body()
+                kind, name, params = self._route()
+                if kind is None:
+                    self._send(200 if method in ("GET", "HEAD") else 404, {})
+                elif kind == "rpc":
+                    args = body if method == "POST" else dict(params)
+                    if name not in stub.rpcs:
+                        self._send(404, {"message": f"Funkce {name} neexistuje"})
+                    else:
+                        self._send(200, stub.rpcs[name](args or {}))
+                elif name not in stub.tables:
+                    self._send(404, {"message": f"Tabulka {name} neexistuje"})
+                elif method in ("GET", "HEAD"):
+                    self._send(200, stub.select(name, params))
+                elif method == "POST":
+                    self._send(201, stub.insert(name, body))
+                elif method == "PATCH":
+                    self._send(200, stub.update(name, params, body or {}))
+                elif method == "DELETE":
+                    self._send(200, stub.delete(name, params))
+            except Exception as e:
+                self._send(400, {"message": str(e)})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_HEAD(self):
+            self._handle("HEAD")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
+
+
+def serve(stub: PostgrestStub, host: str = "127.0.0.1", port: int = 54321) -> ThreadingHTTPServer:
+    """Spustí server v samostatném vlákně a vrátí jej (zastavení: server.shutdown())."""
+    server = ThreadingHTTPServer((host, port), _make_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True, name="postgrest-stub").start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lokální náhrada Supabase REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--seed", help="JSON soubor ve formátu data/exercises.json")
+    args = parser.parse_args()
+    stub = PostgrestStub()
+    if args.seed:
+        stub.seed_from_json(args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(stub))
+    print(f"PostgREST stub běží na http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
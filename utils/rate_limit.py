@@ -0,0 +1,46 @@
+"""
+Omezení rychlosti odchozích požadavků (token bucket) sdílené mezi vlákny.
+"""
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Kbelík s kapacitou `capacity` žetonů, který se doplňuje rychlostí
+    `rate` žetonů za sekundu. Každý požadavek si před odesláním vezme žeton.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate musí být kladné")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Počká, dokud není k dispozici `tokens` žetonů, a odebere je."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
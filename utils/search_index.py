@@ -0,0 +1,130 @@
+"""
+Fulltextový index cviků (název + popis) s řazením BM25.
+
+Text se převede na malá písmena bez diakritiky ("Házení" -> "hazeni"),
+rozdělí na slova a slova se zkrátí jednoduchým stemmerem pro češtinu
+(odtržení běžných koncovek), takže "skoky", "skok" i "skoků" sdílí jeden
+termín. Index se udržuje inkrementálně přes `add` a `remove`.
+"""
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from typing import Any, Container, Dict, Hashable, List, Optional, Tuple
+
+# Koncovky seřazené od nejdelší; ponechá se vždy aspoň MIN_STEM znaků
+SUFFIXES = sorted({
+    "ovani", "ovat", "ami", "emi", "ich", "ach", "ech", "ove", "ovi", "ych",
+    "ym", "ymi", "ou", "em", "um", "om", "am", "at", "it", "ni",
+    "y", "u", "e", "i", "a", "o",
+}, key=len, reverse=True)
+MIN_STEM = 3
+# Slova v názvu váží víc než slova v popisu
+NAME_WEIGHT = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Malá písmena bez diakritiky."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Rozdělí text na termíny indexu (bez diakritiky, po stemmingu)."""
+    return [stem(w) for w in _WORD.findall(fold(text or ""))]
+
+
+class SearchIndex:
+    """Invertovaný index nad názvem a popisem cviků."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # termín -> {id cviku: váha výskytů}
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._terms_of: Dict[Hashable, List[str]] = {}
+        self._length: Dict[Hashable, int] = {}
+        self._total_length = 0
+        self._docs: Dict[Hashable, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, ex: Dict[str, Any]) -> None:
+        """Přidá cvik do indexu, případně nahradí jeho předchozí verzi."""
+        counts: Dict[str, int] = {}
+        for term in tokenize(ex.get("name") or ""):
+            counts[term] = counts.get(term, 0) + NAME_WEIGHT
+        for term in tokenize(ex.get("description") or ""):
+            counts[term] = counts.get(term, 0) + 1
+        with self._lock:
+            self.remove(ex["id"])
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[ex["id"]] = tf
+            length = sum(counts.values())
+            self._terms_of[ex["id"]] = list(counts)
+            self._length[ex["id"]] = length
+            self._total_length += length
+            self._docs[ex["id"]] = dict(ex)
+
+    def remove(self, exercise_id: Hashable) -> None:
+        with self._lock:
+            for term in self._terms_of.pop(exercise_id, []):
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(exercise_id, None)
+                    if not posting:
+                        del self._postings[term]
+            self._total_length -= self._length.pop(exercise_id, 0)
+            self._docs.pop(exercise_id, None)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        ids: Optional[Container[Hashable]] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Vrátí nejvýše `limit` dvojic (cvik, skóre) seřazených podle BM25.
+        Výsledek musí obsahovat všechny termíny dotazu; s `ids` jen cviky
+        z této množiny (omezí se před zkrácením na `limit`).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(t) for t in terms]
+            if not all(postings):
+                return []
+            n = len(self._docs)
+            avg_length = self._total_length / n if n else 0.0
+            postings.sort(key=len)
+            idfs = [math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            k1, b, lengths = BM25_K1, BM25_B, self._length
+            scale = b / avg_length if avg_length else 0.0
+            scores: Dict[Hashable, float] = {}
+            for doc_id, tf in postings[0].items():
+                if ids is not None and doc_id not in ids:
+                    continue
+                tfs = [tf]
+                for p in postings[1:]:
+                    other = p.get(doc_id)
+                    if other is None:
+                        break
+                    tfs.append(other)
+                else:
+                    norm = k1 * (1 - b + scale * lengths[doc_id])
+                    scores[doc_id] = sum(idf * t * (k1 + 1) / (t + norm) for idf, t in zip(idfs, tfs))
+            ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], str(item[0])))
+            return [(dict(self._docs[doc_id]), score) for doc_id, score in ranked]
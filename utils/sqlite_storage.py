@@ -0,0 +1,410 @@
+"""
+Vestavěná SQLite databáze jako lokální náhrada za Supabase.
+
+Tabulky kopírují schéma v Supabase (exercises, exercise_categories,
+exercise_sections, resources). Databáze běží v režimu WAL, takže čtení
+z více Streamlit relací neblokuje zápis, a každá změna cviku (cvik +
+kategorie + sekce) proběhne v jedné transakci. Při prvním otevření se
+jednorázově převezme obsah dosavadního `data/exercises.json`.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import streamlit as st
+
+from utils.catalog import LOCATION_BOTH
+from utils.storage import LocalStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exercises (
+    id          TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    location    TEXT NOT NULL DEFAULT '',
+    materials   TEXT NOT NULL DEFAULT '[]',
+    created_at  TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at  TEXT
+);
+CREATE TABLE IF NOT EXISTS exercise_categories (
+    exercise_id    TEXT NOT NULL REFERENCES exercises(id) ON DELETE CASCADE,
+    construct_type TEXT NOT NULL,
+    subcategory    TEXT NOT NULL,
+    PRIMARY KEY (exercise_id, construct_type, subcategory)
+);
+CREATE TABLE IF NOT EXISTS exercise_sections (
+    exercise_id TEXT NOT NULL REFERENCES exercises(id) ON DELETE CASCADE,
+    section_tag TEXT NOT NULL,
+    PRIMARY KEY (exercise_id, section_tag)
+);
+CREATE TABLE IF NOT EXISTS resources (
+    id            TEXT PRIMARY KEY,
+    resource_type TEXT NOT NULL,
+    value         TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_categories_construct
+    ON exercise_categories (construct_type, subcategory, exercise_id);
+CREATE INDEX IF NOT EXISTS idx_categories_subcategory
+    ON exercise_categories (subcategory, exercise_id);
+CREATE INDEX IF NOT EXISTS idx_sections_tag
+    ON exercise_sections (section_tag, exercise_id);
+CREATE INDEX IF NOT EXISTS idx_resources_type
+    ON resources (resource_type);
+CREATE INDEX IF NOT EXISTS idx_exercises_name
+    ON exercises (name, id);
+"""
+
+EXERCISE_COLUMNS = "e.id, e.name, e.description, e.location, e.materials"
+# Maximální počet parametrů v jednom IN (...) dotazu
+SQLITE_CHUNK_SIZE = 900
+# Kolik nepoužívaných spojení se drží pro další vlákna (reruny Streamlitu)
+MAX_IDLE_CONNECTIONS = 8
+
+
+def _row_to_exercise(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "description": row["description"],
+        "location": row["location"],
+        "materials": json.loads(row["materials"] or "[]"),
+    }
+
+
+class _Lease:
+    """Spojení zapůjčené jednomu vláknu; po zániku vlákna se vrátí do zásoby."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class SqliteStorage(LocalStorage):
+    """Lokální úložiště v SQLite (WAL, indexy, transakční zápisy)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, migrate_from: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        # Spojení vláken, která už skončila, připravená k dalšímu použití
+        self._idle: List[sqlite3.Connection] = []
+        self._idle_lock = threading.Lock()
+        self.connections_opened = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        if migrate_from:
+            self.migrate_from_json(migrate_from)
+
+    # --- Spojení a transakce ---
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False: spojení se po skončení vlákna předá dalšímu,
+        # současně ho ale vždy používá jen jedno vlákno
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=10000")
+        # LOWER() v SQLite zná jen ASCII, pro české názvy je potřeba casefold
+        conn.create_function("casefold", 1, lambda v: v.casefold() if v else v, deterministic=True)
+        self.connections_opened += 1
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Spojení aktuálního vlákna. Streamlit spouští každý rerun v novém
+        vlákně; po jeho skončení se spojení vrátí do zásoby a další vlákno
+        ho převezme, místo aby otevíralo nové.
+        """
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            with self._idle_lock:
+                conn = self._idle.pop() if self._idle else None
+            lease = _Lease(conn or self._connect())
+            weakref.finalize(lease, self._release, lease.conn)
+            self._local.lease = lease
+        return lease.conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._idle_lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Zavře spojení v zásobě (spojení běžících vláken se vrátí po jejich skončení)."""
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Zápisová transakce; zámek se bere hned, aby nevznikl deadlock při upgradu."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    # --- Migrace ---
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        Jednorázově převezme cviky, kategorie a sekce z JSON souboru.
+        Vrací počet převzatých cviků (0, pokud migrace už proběhla).
+        """
+        if not os.path.exists(json_path):
+            return 0
+        # Rychlá kontrola bez zámku; rozhoduje až značka zapsaná v transakci
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            st.error(f"Chyba při migraci lokální databáze: {e}")
+            return 0
+        exercises = data.get("exercises", [])
+        with self._write() as conn:
+            # Značka se zapíše v téže transakci: souběžně otevírající proces
+            # nic nevloží a migraci přeskočí
+            marked = conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (os.path.abspath(json_path),)
+            )
+            if marked.rowcount == 0:
+                return 0
+            for ex in exercises:
+                conn.execute(
+                    "INSERT OR IGNORE INTO exercises (id, name, description, location, materials) VALUES (?, ?, ?, ?, ?)",
+                    (ex["id"], ex.get("name", ""), ex.get("description", ""), ex.get("location", ""),
+                     json.dumps(ex.get("materials", []), ensure_ascii=False))
+                )
+                # Starší záznamy mohou mít konstrukt přímo u cviku
+                if ex.get("construct_type") and ex.get("subcategory"):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO exercise_categories VALUES (?, ?, ?)",
+                        (ex["id"], ex["construct_type"], ex["subcategory"])
+                    )
+            conn.executemany(
+                "INSERT OR IGNORE INTO exercise_categories VALUES (?, ?, ?)",
+                [(c["exercise_id"], c["construct_type"], c["subcategory"]) for c in data.get("categories", [])]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO exercise_sections VALUES (?, ?)",
+                [(s["exercise_id"], s["section_tag"]) for s in data.get("sections", [])]
+            )
+        return len(exercises)
+
+    # --- Cviky ---
+
+    def get_exercises(self, construct_type=None, subcategory=None, section=None, location=None, materials=None):
+        where, params = [], []
+        if construct_type or subcategory:
+            cond = ["c.exercise_id = e.id"]
+            if construct_type:
+                cond.append("c.construct_type = ?")
+                params.append(construct_type)
+            if subcategory:
+                cond.append("c.subcategory = ?")
+                params.append(subcategory)
+            where.append(f"EXISTS (SELECT 1 FROM exercise_categories c WHERE {' AND '.join(cond)})")
+        if section:
+            where.append("EXISTS (SELECT 1 FROM exercise_sections s WHERE s.exercise_id = e.id AND s.section_tag = ?)")
+            params.append(section)
+        if location:
+            where.append("e.location IN (?, ?)")
+            params.extend([location, LOCATION_BOTH])
+        if materials is not None:
+            # Všechny potřebné materiály musí být mezi dostupnými
+            placeholders = ",".join("?" * len(materials))
+            where.append(f"NOT EXISTS (SELECT 1 FROM json_each(e.materials) m WHERE m.value NOT IN ({placeholders}))")
+            params.extend(materials)
+        sql = f"SELECT {EXERCISE_COLUMNS} FROM exercises e"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY e.rowid"
+        return [_row_to_exercise(r) for r in self._conn().execute(sql, params)]
+
+    def get_exercises_page(self, limit, after=None, name_query=None):
+        where, params = [], []
+        if after:
+            where.append("(e.name, e.id) > (?, ?)")
+            params.extend(after)
+        if name_query:
+            where.append("instr(casefold(e.name), ?) > 0")
+            params.append(name_query.casefold())
+        sql = f"SELECT {EXERCISE_COLUMNS} FROM exercises e"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY e.name, e.id LIMIT ?"
+        params.append(limit)
+        return [_row_to_exercise(r) for r in self._conn().execute(sql, params)]
+
+    def get_exercises_by_ids(self, exercise_ids):
+        ids = list(dict.fromkeys(exercise_ids))
+        by_id = {}
+        conn = self._conn()
+        for start in range(0, len(ids), SQLITE_CHUNK_SIZE):
+            chunk = ids[start:start + SQLITE_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            for r in conn.execute(f"SELECT {EXERCISE_COLUMNS} FROM exercises e WHERE e.id IN ({placeholders})", chunk):
+                by_id[r["id"]] = _row_to_exercise(r)
+        return [by_id[ex_id] for ex_id in exercise_ids if ex_id in by_id]
+
+    def get_exercise_sections(self, exercise_id):
+        rows = self._conn().execute(
+            "SELECT section_tag FROM exercise_sections WHERE exercise_id = ?", (exercise_id,)
+        )
+        return [r["section_tag"] for r in rows]
+
+    def get_exercise_details(self, exercise_ids):
+        result = {ex_id: {"sections": [], "categories": []} for ex_id in exercise_ids}
+        ids = list(result)
+        conn = self._conn()
+        for start in range(0, len(ids), SQLITE_CHUNK_SIZE):
+            chunk = ids[start:start + SQLITE_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            for r in conn.execute(
+                f"SELECT exercise_id, section_tag FROM exercise_sections WHERE exercise_id IN ({placeholders})", chunk
+            ):
+                result[r["exercise_id"]]["sections"].append(r["section_tag"])
+            for r in conn.execute(
+                f"SELECT exercise_id, construct_type, subcategory FROM exercise_categories "
+                f"WHERE exercise_id IN ({placeholders})", chunk
+            ):
+                result[r["exercise_id"]]["categories"].append(
+                    {"construct_type": r["construct_type"], "subcategory": r["subcategory"]}
+                )
+        return result
+
+    def _write_links(self, conn, exercise_id, categories, section_tags) -> None:
+        conn.executemany(
+            "INSERT OR IGNORE INTO exercise_categories VALUES (?, ?, ?)",
+            [(exercise_id, ct["construct_type"], ct["subcategory"]) for ct in categories]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO exercise_sections VALUES (?, ?)",
+            [(exercise_id, tag) for tag in section_tags]
+        )
+
+    def add_exercise(self, exercise, categories, section_tags):
+        exercise_id = str(uuid.uuid4())
+        try:
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT INTO exercises (id, name, description, location, materials) VALUES (?, ?, ?, ?, ?)",
+                    (exercise_id, exercise["name"], exercise["description"], exercise["location"],
+                     json.dumps(exercise["materials"], ensure_ascii=False))
+                )
+                self._write_links(conn, exercise_id, categories, section_tags)
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return None
+        return exercise_id
+
+    def add_exercises_bulk(self, items):
+        rows, cats, secs = [], [], []
+        for exercise, categories, section_tags in items:
+            exercise_id = str(uuid.uuid4())
+            rows.append((exercise_id, exercise["name"], exercise["description"], exercise["location"],
+                         json.dumps(exercise["materials"], ensure_ascii=False)))
+            cats.extend((exercise_id, ct["construct_type"], ct["subcategory"]) for ct in categories)
+            secs.extend((exercise_id, tag) for tag in section_tags)
+        try:
+            with self._write() as conn:
+                conn.executemany(
+                    "INSERT INTO exercises (id, name, description, location, materials) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                conn.executemany("INSERT OR IGNORE INTO exercise_categories VALUES (?, ?, ?)", cats)
+                conn.executemany("INSERT OR IGNORE INTO exercise_sections VALUES (?, ?)", secs)
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return 0
+        return len(rows)
+
+    def update_exercise(self, exercise_id, exercise, categories, section_tags):
+        try:
+            with self._write() as conn:
+                cur = conn.execute(
+                    "UPDATE exercises SET name = ?, description = ?, location = ?, materials = ?, "
+                    "updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (exercise["name"], exercise["description"], exercise["location"],
+                     json.dumps(exercise["materials"], ensure_ascii=False), exercise_id)
+                )
+                if cur.rowcount == 0:
+                    return False
+                conn.execute("DELETE FROM exercise_categories WHERE exercise_id = ?", (exercise_id,))
+                conn.execute("DELETE FROM exercise_sections WHERE exercise_id = ?", (exercise_id,))
+                self._write_links(conn, exercise_id, categories, section_tags)
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        return True
+
+    def delete_exercise(self, exercise_id):
+        try:
+            with self._write() as conn:
+                # Kategorie a sekce smaže ON DELETE CASCADE
+                conn.execute("DELETE FROM exercises WHERE id = ?", (exercise_id,))
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        return True
+
+    # --- Podklady ---
+
+    def get_all_resources(self):
+        grouped = {}
+        for r in self._conn().execute("SELECT id, resource_type, value FROM resources ORDER BY rowid"):
+            grouped.setdefault(r["resource_type"], []).append(dict(r))
+        return grouped
+
+    def add_resource(self, resource_type, value):
+        try:
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT INTO resources (id, resource_type, value) VALUES (?, ?, ?)",
+                    (str(uuid.uuid4()), resource_type, value)
+                )
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        return True
+
+    def update_resource(self, resource_id, value):
+        try:
+            with self._write() as conn:
+                conn.execute("UPDATE resources SET value = ? WHERE id = ?", (value, resource_id))
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        return True
+
+    def delete_resource(self, resource_id):
+        try:
+            with self._write() as conn:
+                conn.execute("DELETE FROM resources WHERE id = ?", (resource_id,))
+        except sqlite3.Error as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        return True
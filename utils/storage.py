@@ -0,0 +1,408 @@
+"""
+Lokální úložiště cviků pro případ, že Supabase není dostupné.
+
+`LocalStorage` definuje rozhraní, které `utils/database.py` volá ve fallback
+větvích. K dispozici je JSON soubor (`JsonStorage`, výchozí), JSON snapshot
+se žurnálem změn (`JournaledJsonStorage`) a vestavěná SQLite databáze
+(`utils.sqlite_storage.SqliteStorage`). Backend se volí v secrets.toml:
+
+    [local_db]
+    backend = "sqlite"          # "json" (výchozí), "json-journal" nebo "sqlite"
+    path = "data/exercises.sqlite3"
+    compact_bytes = 262144      # jen pro "json-journal"
+"""
+import json
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows - zamyká se jen v rámci procesu
+    fcntl = None
+
+import streamlit as st
+
+from utils.catalog import ExerciseCatalog
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DB_FILE = os.path.join(DATA_DIR, "exercises.json")
+SQLITE_FILE = os.path.join(DATA_DIR, "exercises.sqlite3")
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Po překročení této velikosti žurnálu (v bajtech) se zapíše nový snapshot
+DEFAULT_COMPACT_BYTES = 256 * 1024
+
+_thread_locks: Dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool = True) -> Iterator[None]:
+    """Zámek nad souborem `path` platný mezi vlákny i procesy (flock na `path.lock`)."""
+    with _thread_locks_guard:
+        tlock = _thread_locks.setdefault(path, threading.RLock())
+    with tlock:
+        if fcntl is None:
+            yield
+            return
+        with open(path + ".lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+
+def _atomic_write_json(path: str, data: Dict[str, Any]) -> None:
+    """Zapíše JSON do dočasného souboru a atomicky jím nahradí `path`."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class LocalStorage:
+    """Rozhraní lokálního úložiště cviků a podkladů."""
+
+    name = "base"
+
+    def get_exercises(
+        self,
+        construct_type: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        section: Optional[str] = None,
+        location: Optional[str] = None,
+        materials: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_exercise_sections(self, exercise_id: str) -> List[str]:
+        raise NotImplementedError
+
+    def get_exercises_by_ids(self, exercise_ids: List[str]) -> List[Dict[str, Any]]:
+        """Vrátí cviky se zadanými id ve stejném pořadí (neexistující vynechá)."""
+        raise NotImplementedError
+
+    def get_exercise_details(self, exercise_ids: List[str]) -> Dict[str, Dict[str, List[Any]]]:
+        """Vrátí {id: {"sections": [...], "categories": [...]}} pro zadané cviky."""
+        raise NotImplementedError
+
+    def get_exercises_page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        name_query: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Vrátí nejvýše `limit` cviků seřazených podle (name, id) za klíčem `after`."""
+        raise NotImplementedError
+
+    def add_exercise(
+        self,
+        exercise: Dict[str, Any],
+        categories: List[Dict[str, str]],
+        section_tags: List[str]
+    ) -> Optional[str]:
+        """Uloží nový cvik a vrátí jeho id (nebo None při chybě)."""
+        raise NotImplementedError
+
+    def add_exercises_bulk(self, items: List[Tuple[Dict[str, Any], List[Dict[str, str]], List[str]]]) -> int:
+        """
+        Uloží více cviků najednou; položka je (cvik, kategorie, sekce).
+        Vrací počet uložených cviků.
+        """
+        return sum(1 for ex, cats, secs in items if self.add_exercise(ex, cats, secs) is not None)
+
+    def update_exercise(
+        self,
+        exercise_id: str,
+        exercise: Dict[str, Any],
+        categories: List[Dict[str, str]],
+        section_tags: List[str]
+    ) -> bool:
+        raise NotImplementedError
+
+    def delete_exercise(self, exercise_id: str) -> bool:
+        raise NotImplementedError
+
+    # Podklady lokálně podporuje jen SQLite; JSON se chová jako dřív bez Supabase
+
+    def get_all_resources(self) -> Dict[str, List[Dict[str, str]]]:
+        """Vrátí všechny podklady seskupené podle resource_type."""
+        return {}
+
+    def add_resource(self, resource_type: str, value: str) -> bool:
+        st.error("Supabase klient není dostupný.")
+        return False
+
+    def update_resource(self, resource_id: str, value: str) -> bool:
+        st.error("Supabase klient není dostupný.")
+        return False
+
+    def delete_resource(self, resource_id: str) -> bool:
+        st.error("Supabase klient není dostupný.")
+        return False
+
+    def equipment_changed(self, materials: List[str]) -> None:
+        """Změnily se podklady "Vybaveni"; úložiště s indexem vybavení ho přestaví."""
+
+
+class JsonStorage(LocalStorage):
+    """Celá databáze v jednom JSON dokumentu s indexovaným katalogem v paměti."""
+
+    name = "json"
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.catalog = ExerciseCatalog(path, self._load_db)
+
+    def _load_db(self) -> Dict[str, Any]:
+        """Načte databázi z JSON souboru."""
+        if not os.path.exists(self.path):
+            return {"exercises": [], "categories": [], "sections": []}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Zajistí, že klíče existují
+            data.setdefault("exercises", [])
+            data.setdefault("categories", [])
+            data.setdefault("sections", [])
+            return data
+        except Exception as e:
+            st.error(f"Chyba při načítání lokální databáze: {e}")
+            return {"exercises": [], "categories": [], "sections": []}
+
+    def _save_db(self, data: Dict[str, Any]) -> bool:
+        """Uloží databázi do JSON souboru (atomicky přes dočasný soubor)."""
+        try:
+            _atomic_write_json(self.path, data)
+            return True
+        except Exception as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        finally:
+            self.catalog.invalidate()
+
+    def get_exercises(self, construct_type=None, subcategory=None, section=None, location=None, materials=None):
+        return self.catalog.filter(construct_type, subcategory, section, location, materials)
+
+    def equipment_changed(self, materials: List[str]) -> None:
+        self.catalog.set_equipment(materials)
+
+    def get_exercise_sections(self, exercise_id):
+        return self.catalog.sections_of(exercise_id)
+
+    def get_exercises_page(self, limit, after=None, name_query=None):
+        return self.catalog.page(limit, after, name_query)
+
+    def get_exercises_by_ids(self, exercise_ids):
+        found = (self.catalog.get(ex_id) for ex_id in exercise_ids)
+        return [ex for ex in found if ex is not None]
+
+    def get_exercise_details(self, exercise_ids):
+        return {
+            ex_id: {
+                "sections": self.catalog.sections_of(ex_id),
+                "categories": self.catalog.categories_of(ex_id),
+            }
+            for ex_id in exercise_ids
+        }
+
+    def add_exercise(self, exercise, categories, section_tags):
+        with _file_lock(self.path):
+            return self._add_exercise(exercise, categories, section_tags)
+
+    def update_exercise(self, exercise_id, exercise, categories, section_tags):
+        with _file_lock(self.path):
+            return self._update_exercise(exercise_id, exercise, categories, section_tags)
+
+    def add_exercises_bulk(self, items):
+        # Jedno načtení a jeden zápis souboru pro celou dávku
+        with _file_lock(self.path):
+            db = self._load_db()
+            for exercise, categories, section_tags in items:
+                exercise_id = str(uuid.uuid4())
+                db["exercises"].append({"id": exercise_id, **exercise})
+                db["categories"].extend({"exercise_id": exercise_id, **ct} for ct in categories)
+                db["sections"].extend({"exercise_id": exercise_id, "section_tag": t} for t in section_tags)
+            return len(items) if self._save_db(db) else 0
+
+    def delete_exercise(self, exercise_id):
+        with _file_lock(self.path):
+            return self._delete_exercise(exercise_id)
+
+    # Čtení a zápis celého souboru drží zámek, aby se souběžné relace nepřepsaly
+
+    def _add_exercise(self, exercise, categories, section_tags):
+        db = self._load_db()
+        exercise_id = str(uuid.uuid4())
+        db["exercises"].append({"id": exercise_id, **exercise})
+        for ct in categories:
+            db["categories"].append({"exercise_id": exercise_id, **ct})
+        for tag in section_tags:
+            db["sections"].append({"exercise_id": exercise_id, "section_tag": tag})
+        return exercise_id if self._save_db(db) else None
+
+    def _update_exercise(self, exercise_id, exercise, categories, section_tags):
+        db = self._load_db()
+        # Najdi index cviku
+        for i, ex in enumerate(db["exercises"]):
+            if ex["id"] == exercise_id:
+                db["exercises"][i] = {"id": exercise_id, **exercise}
+                break
+        db["categories"] = [c for c in db["categories"] if c["exercise_id"] != exercise_id]
+        for ct in categories:
+            db["categories"].append({"exercise_id": exercise_id, **ct})
+        db["sections"] = [s for s in db["sections"] if s["exercise_id"] != exercise_id]
+        for tag in section_tags:
+            db["sections"].append({"exercise_id": exercise_id, "section_tag": tag})
+        return self._save_db(db)
+
+    def _delete_exercise(self, exercise_id):
+        db = self._load_db()
+        db["exercises"]  = [e for e in db["exercises"]  if e["id"] != exercise_id]
+        db["categories"] = [c for c in db["categories"] if c["exercise_id"] != exercise_id]
+        db["sections"]   = [s for s in db["sections"]   if s["exercise_id"] != exercise_id]
+        return self._save_db(db)
+
+
+class JournaledJsonStorage(JsonStorage):
+    """
+    JSON snapshot + žurnál změn. Každá změna připíše jeden krátký záznam
+    na konec žurnálu (cena zápisu nezávisí na velikosti katalogu), čtení
+    přehraje snapshot a žurnál. Po překročení `compact_bytes` se na pozadí
+    zapíše nový snapshot a žurnál se vyprázdní.
+    """
+
+    name = "json-journal"
+
+    def __init__(self, path: str = DB_FILE, compact_bytes: int = DEFAULT_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".journal.jsonl"
+        self.compact_bytes = compact_bytes
+        self.catalog = ExerciseCatalog(path, self._load_db, journal_path=self.journal_path)
+        self._compacting = threading.Lock()
+
+    def _append(self, *records: Dict[str, Any]) -> bool:
+        line = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        try:
+            # Sdílený zámek: zápisy mohou běžet souběžně, kompakce ne
+            with _file_lock(self.path, exclusive=False):
+                fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                    os.fsync(fd)
+                    size = os.fstat(fd).st_size
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            st.error(f"Chyba při ukládání lokální databáze: {e}")
+            return False
+        if size >= self.compact_bytes:
+            self.compact(background=True)
+        return True
+
+    def add_exercise(self, exercise, categories, section_tags):
+        exercise_id = str(uuid.uuid4())
+        record = {
+            "op": "upsert",
+            "exercise": {"id": exercise_id, **exercise},
+            "categories": categories,
+            "sections": section_tags,
+        }
+        return exercise_id if self._append(record) else None
+
+    def add_exercises_bulk(self, items):
+        records = [
+            {
+                "op": "upsert",
+                "exercise": {"id": str(uuid.uuid4()), **exercise},
+                "categories": categories,
+                "sections": section_tags,
+            }
+            for exercise, categories, section_tags in items
+        ]
+        return len(records) if records and self._append(*records) else 0
+
+    def update_exercise(self, exercise_id, exercise, categories, section_tags):
+        if self.catalog.get(exercise_id) is None:
+            return False
+        record = {
+            "op": "upsert",
+            "exercise": {"id": exercise_id, **exercise},
+            "categories": categories,
+            "sections": section_tags,
+        }
+        return self._append(record)
+
+    def delete_exercise(self, exercise_id):
+        # Stejně jako JSON a SQLite: neexistující cvik není úspěch ani záznam v žurnálu
+        if self.catalog.get(exercise_id) is None:
+            return False
+        return self._append({"op": "delete", "id": exercise_id})
+
+    def compact(self, background: bool = False) -> None:
+        """Zapíše snapshot se započteným žurnálem a žurnál vyprázdní."""
+        if background:
+            if self._compacting.locked():
+                return
+            threading.Thread(target=self.compact, daemon=True, name="json-journal-compact").start()
+            return
+        if not self._compacting.acquire(blocking=False):
+            return
+        try:
+            with _file_lock(self.path, exclusive=True):
+                # Čerstvý katalog, aby se započetly i zápisy jiných procesů
+                data = ExerciseCatalog(self.path, self._load_db, journal_path=self.journal_path).to_data()
+                _atomic_write_json(self.path, data)
+                # Nový prázdný žurnál (nový inode, čtenáři poznají výměnu)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.journal_path), prefix=".tmp-")
+                os.close(fd)
+                os.replace(tmp, self.journal_path)
+        except Exception as e:
+            st.error(f"Chyba při kompakci lokální databáze: {e}")
+        finally:
+            self._compacting.release()
+
+
+def _local_db_settings() -> Dict[str, Any]:
+    try:
+        return dict(st.secrets["local_db"])
+    except Exception:
+        return {}
+
+
+_storage: Optional[LocalStorage] = None
+_storage_lock = threading.Lock()
+
+
+def get_local_storage() -> LocalStorage:
+    """Vrátí procesově sdílené lokální úložiště podle nastavení [local_db]."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                cfg = _local_db_settings()
+                if cfg.get("backend", "json") == "sqlite":
+                    from utils.sqlite_storage import SqliteStorage
+                    path = cfg.get("path", SQLITE_FILE)
+                    if not os.path.isabs(path):
+                        path = os.path.join(BASE_DIR, path)
+                    _storage = SqliteStorage(path, migrate_from=DB_FILE)
+                elif cfg.get("backend") == "json-journal":
+                    compact_bytes = int(cfg.get("compact_bytes", DEFAULT_COMPACT_BYTES))
+                    _storage = JournaledJsonStorage(DB_FILE, compact_bytes=compact_bytes)
+                else:
+                    _storage = JsonStorage(DB_FILE)
+    return _storage
@@ -0,0 +1,200 @@
+"""
+Sdílený Supabase klient pro celý proces.
+
+Klient se vytváří jen jednou a všechna volání z `utils/database.py` sdílejí
+jeden httpx pool s keep-alive spojeními. Správce klienta umí levnou kontrolu
+dostupnosti, znovupřipojení po chybě a vrací statistiky poolu.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import streamlit as st
+from supabase import Client, create_client
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from supabase import ClientOptions
+except ImportError:
+    ClientOptions = None
+
+# Výchozí nastavení poolu (lze přepsat v sekci [supabase] v secrets.toml)
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 15.0
+# Jak často (s) ověřovat dostupnost sdíleného klienta
+HEALTH_CHECK_INTERVAL = 30.0
+# Po neúspěšném vytvoření klienta se další pokus provede až po této době (s)
+RECONNECT_COOLDOWN = 10.0
+
+
+class SupabaseClientManager:
+    """Spravuje jeden Supabase klient a jeho HTTP pool pro celý proces."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._client: Optional[Client] = None
+        self._http: Optional[Any] = None
+        self._created_at: Optional[float] = None
+        self._last_ok: float = 0.0
+        self._last_failure: float = 0.0
+        self._stats = {
+            "clients_created": 0,
+            "reconnects": 0,
+            "requests": 0,
+            "responses": 0,
+            "errors": 0,
+            "health_checks": 0,
+            "health_failures": 0,
+        }
+
+    # --- Vytvoření klienta ---
+
+    def _settings(self) -> Dict[str, Any]:
+        cfg = st.secrets["supabase"]
+        return {
+            "url": cfg["url"],
+            "key": cfg["key"],
+            "max_connections": int(cfg.get("max_connections", DEFAULT_MAX_CONNECTIONS)),
+            "max_keepalive": int(cfg.get("max_keepalive_connections", DEFAULT_MAX_KEEPALIVE)),
+            "keepalive_expiry": float(cfg.get("keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY)),
+            "timeout": float(cfg.get("timeout", DEFAULT_TIMEOUT)),
+        }
+
+    def _on_request(self, request) -> None:
+        self._stats["requests"] += 1
+
+    def _on_response(self, response) -> None:
+        self._stats["responses"] += 1
+        if response.status_code >= 500:
+            self._stats["errors"] += 1
+        else:
+            # Server odpověděl - kontrola dostupnosti může počkat
+            self.mark_ok()
+
+    def _create(self) -> Client:
+        cfg = self._settings()
+        http = None
+        options = None
+        if httpx is not None and ClientOptions is not None:
+            http = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=cfg["max_connections"],
+                    max_keepalive_connections=cfg["max_keepalive"],
+                    keepalive_expiry=cfg["keepalive_expiry"],
+                ),
+                timeout=cfg["timeout"],
+                event_hooks={"request": [self._on_request], "response": [self._on_response]},
+            )
+            try:
+                options = ClientOptions(httpx_client=http, postgrest_client_timeout=cfg["timeout"])
+            except TypeError:
+                # Starší supabase-py nepodporuje vlastní httpx klient,
+                # pool pak drží interní session sdíleného klienta.
+                http.close()
+                http = None
+        client = create_client(cfg["url"], cfg["key"], options=options) if options else create_client(cfg["url"], cfg["key"])
+        self._http = http
+        self._created_at = time.time()
+        self._last_ok = time.time()
+        self._stats["clients_created"] += 1
+        return client
+
+    def _close(self) -> None:
+        if self._http is not None:
+            try:
+                self._http.close()
+            except Exception:
+                pass
+        self._client = None
+        self._http = None
+
+    # --- Veřejné API ---
+
+    def get_client(self) -> Optional[Client]:
+        """
+        Vrátí sdílený klient; při prvním volání nebo po výpadku jej vytvoří.
+        Pokud od poslední odpovědi serveru (každá odpověď poolu bez chyby 5xx
+        volá mark_ok) uplynul HEALTH_CHECK_INTERVAL, provede levnou kontrolu
+        dostupnosti a případně se znovu připojí.
+        """
+        with self._lock:
+            if self._client is not None:
+                if time.time() - self._last_ok > HEALTH_CHECK_INTERVAL and not self.health_check():
+                    self.reconnect()
+                return self._client
+            if self._last_failure and time.time() - self._last_failure < RECONNECT_COOLDOWN:
+                return None
+            try:
+                self._client = self._create()
+                self._last_failure = 0.0
+            except Exception as e:
+                self._last_failure = time.time()
+                st.error(f"Chyba při inicializaci Supabase klienta: {e}")
+                self._client = None
+            return self._client
+
+    def health_check(self) -> bool:
+        """Ověří spojení jedním minimálním dotazem (jeden řádek, jen id)."""
+        with self._lock:
+            if self._client is None:
+                return False
+            self._stats["health_checks"] += 1
+            try:
+                self._client.table("resources").select("id").limit(1).execute()
+                self._last_ok = time.time()
+                return True
+            except Exception:
+                self._stats["health_failures"] += 1
+                return False
+
+    def mark_ok(self) -> None:
+        """Zaznamená úspěšné volání, aby se zbytečně neopakovala kontrola dostupnosti."""
+        self._last_ok = time.time()
+
+    def reconnect(self) -> Optional[Client]:
+        """Zahodí současný klient i pool a vytvoří nový."""
+        with self._lock:
+            self._close()
+            self._stats["reconnects"] += 1
+            try:
+                self._client = self._create()
+                self._last_failure = 0.0
+            except Exception as e:
+                self._last_failure = time.time()
+                st.error(f"Chyba při opětovném připojení k Supabase: {e}")
+            return self._client
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Vrátí statistiky klienta a HTTP poolu (počty spojení, požadavků, chyb)."""
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["connected"] = self._client is not None
+        stats["created_at"] = self._created_at
+        stats["last_ok"] = self._last_ok or None
+        stats["connections"] = None
+        stats["idle_connections"] = None
+        pool = getattr(getattr(self._http, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        return stats
+
+
+_manager: Optional[SupabaseClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> SupabaseClientManager:
+    """Vrátí procesově sdíleného správce Supabase klienta."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = SupabaseClientManager()
+    return _manager
@@ -0,0 +1,404 @@
+"""
+Měření volání databáze a AI po jednotlivých rerunech a stránkách.
+
+`setup(db, ai)` obalí všechny veřejné funkce modulů: u každého volání se
+zaznamená doba (histogram), chyba, velikost výsledku a zásahy cache
+(`TTLCache`, cache odpovědí AI, paměť příprav), vše zvlášť pro stránku,
+ve které volání proběhlo. `rerun(stránka)` ohraničí jeden rerun; posledních
+RERUN_HISTORY rerunů se drží i jednotlivě. Velikost výsledku je počet znaků
+u textu, bajtů u bytes, položek u seznamů a slovníků a u generátorů součet
+přes vydané části. Funkce, které stream jen sestaví a vrátí (samotný nebo
+jako dvojici s extraktorem JSON), se měří až po dobu jeho čtení.
+
+Výstup je `snapshot()` (JSON) a `prometheus_text()`. Nastavení v secrets.toml
+(vše volitelné):
+
+    [tracing]
+    enabled = true
+    metrics_port = 9464     # HTTP /metrics (Prometheus) a /metrics.json
+"""
+import functools
+import inspect
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Horní meze košů histogramu latence (s)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RERUN_HISTORY = 50
+METRIC_PREFIX = "tj"
+NO_PAGE = "-"
+
+_current: ContextVar[Optional["Rerun"]] = ContextVar("tracing_rerun", default=None)
+# Hloubka vnoření měřených volání (get_resources volá get_all_resources)
+_depth: ContextVar[int] = ContextVar("tracing_depth", default=0)
+
+
+class CallStats:
+    """Souhrn volání jedné funkce: počet, chyby, histogram doby a velikost výsledku."""
+
+    __slots__ = ("count", "errors", "seconds", "max_seconds", "buckets", "payload", "payload_max")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.payload = 0
+        self.payload_max = 0
+
+    def add(self, seconds: float, payload: Optional[int], error: bool) -> None:
+        self.count += 1
+        self.errors += error
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        if payload is not None:
+            self.payload += payload
+            self.payload_max = max(self.payload_max, payload)
+
+    def quantile(self, q: float) -> float:
+        """Odhad kvantilu doby (s) z histogramu - horní mez koše."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets[:-1]):
+            seen += n
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[i], self.max_seconds)
+        return self.max_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 6),
+            "avg_ms": round(self.seconds / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "payload": self.payload,
+            "payload_max": self.payload_max,
+            "buckets": list(self.buckets),
+        }
+
+
+class Rerun:
+    """Záznam jednoho rerunu Streamlitu (jedné vykreslené stránky)."""
+
+    def __init__(self, rerun_id: int, page: str):
+        self.id = rerun_id
+        self.page = page
+        self.started = time.time()
+        self.seconds = 0.0
+        # Doba měřených volání bez vnořených (část rerunu strávená v db a AI)
+        self.call_seconds = 0.0
+        self.calls: Dict[str, CallStats] = {}
+        self.cache: Dict[str, List[int]] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "page": self.page,
+            "started": self.started,
+            "ms": round(self.seconds * 1000, 3),
+            "calls_ms": round(self.call_seconds * 1000, 3),
+            "calls": {name: s.to_dict() for name, s in self.calls.items()},
+            "cache": {name: {"hits": h, "misses": m} for name, (h, m) in self.cache.items()},
+        }
+
+
+class Tracer:
+    """Souhrnné statistiky podle (stránka, funkce) a historie rerunů."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.calls: Dict[Tuple[str, str], CallStats] = {}
+        self.cache: Dict[Tuple[str, str], List[int]] = {}
+        self.reruns: Deque[Rerun] = deque(maxlen=RERUN_HISTORY)
+        self.started = time.time()
+
+    def record_call(self, name: str, seconds: float, payload: Optional[int], error: bool, outer: bool = True) -> None:
+        current = _current.get()
+        page = current.page if current else NO_PAGE
+        with self._lock:
+            stats = self.calls.get((page, name))
+            if stats is None:
+                stats = self.calls[(page, name)] = CallStats()
+            stats.add(seconds, payload, error)
+            if current is not None:
+                if outer:
+                    current.call_seconds += seconds
+                stats = current.calls.get(name)
+                if stats is None:
+                    stats = current.calls[name] = CallStats()
+                stats.add(seconds, payload, error)
+
+    def record_cache(self, name: str, hit: bool) -> None:
+        current = _current.get()
+        page = current.page if current else NO_PAGE
+        with self._lock:
+            counts = self.cache.setdefault((page, name), [0, 0])
+            counts[0 if hit else 1] += 1
+            if current is not None:
+                counts = current.cache.setdefault(name, [0, 0])
+                counts[0 if hit else 1] += 1
+
+    @contextmanager
+    def rerun(self, page: str) -> Iterator[Rerun]:
+        record = Rerun(next(self._ids), page)
+        token = _current.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            _current.reset(token)
+            with self._lock:
+                self.reruns.append(record)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.cache.clear()
+            self.reruns.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "since": self.started,
+                "buckets": list(LATENCY_BUCKETS),
+                "calls": [
+                    {"page": page, "function": name, **stats.to_dict()}
+                    for (page, name), stats in sorted(self.calls.items())
+                ],
+                "cache": [
+                    {"page": page, "cache": name, "hits": h, "misses": m}
+                    for (page, name), (h, m) in sorted(self.cache.items())
+                ],
+                "reruns": [r.to_dict() for r in self.reruns],
+            }
+
+    def prometheus_text(self) -> str:
+        """Souhrn ve formátu Prometheus (text exposition 0.0.4)."""
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_call_duration_seconds Doba volání funkcí databáze a AI.",
+            f"# TYPE {p}_call_duration_seconds histogram",
+        ]
+        errors, payload = [], []
+        with self._lock:
+            calls = sorted(self.calls.items())
+            cache = sorted(self.cache.items())
+        for (page, name), stats in calls:
+            labels = f'function="{_escape(name)}",page="{_escape(page)}"'
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += n
+                lines.append(f'{p}_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_call_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"{p}_call_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}")
+            lines.append(f"{p}_call_duration_seconds_count{{{labels}}} {stats.count}")
+            errors.append(f"{p}_call_errors_total{{{labels}}} {stats.errors}")
+            payload.append(f"{p}_call_payload_total{{{labels}}} {stats.payload}")
+        lines += [f"# HELP {p}_call_errors_total Počet volání ukončených výjimkou.",
+                  f"# TYPE {p}_call_errors_total counter"] + errors
+        lines += [f"# HELP {p}_call_payload_total Součet velikostí výsledků (znaky, bajty nebo položky).",
+                  f"# TYPE {p}_call_payload_total counter"] + payload
+        for kind, index in (("hits", 0), ("misses", 1)):
+            lines.append(f"# TYPE {p}_cache_{kind}_total counter")
+            lines += [
+                f'{p}_cache_{kind}_total{{cache="{_escape(name)}",page="{_escape(page)}"}} {counts[index]}'
+                for (page, name), counts in cache
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _size(value: Any) -> Optional[int]:
+    if isinstance(value, (str, bytes, bytearray, list, tuple, dict, set)):
+        return len(value)
+    return None
+
+
+_tracer = Tracer()
+_enabled = True
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def record_cache(name: str, hit: bool) -> None:
+    """Zaznamená zásah (hit=True) nebo minutí cache `name` v aktuálním rerunu."""
+    if _enabled:
+        _tracer.record_cache(name, hit)
+
+
+def rerun(page: str):
+    """Kontext jednoho rerunu: volání uvnitř se připíšou stránce `page`."""
+    return _tracer.rerun(page)
+
+
+# --- Obalení funkcí ---
+
+def _trace_generator(name: str, gen: Iterator[Any]) -> Iterator[Any]:
+    # Mezi položkami běží kód volajícího - hloubka vnoření se nemění
+    outer = _depth.get() == 0
+    started = time.perf_counter()
+    payload, error = 0, False
+    try:
+        for item in gen:
+            payload += _size(item) if isinstance(item, (str, bytes)) else 1
+            yield item
+    except BaseException as e:
+        error = not isinstance(e, GeneratorExit)
+        raise
+    finally:
+        # Volající může čtení ukončit dřív - uzavře se i obalený generátor
+        close = getattr(gen, "close", None)
+        if close is not None:
+            close()
+        _tracer.record_call(name, time.perf_counter() - started, payload, error, outer)
+
+
+def traced(name: str, fn: Callable) -> Callable:
+    """Vrátí obalenou funkci, která měří každé volání pod jménem `name`."""
+    if getattr(fn, "__traced__", False):
+        return fn
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            return _trace_generator(name, fn(*args, **kwargs))
+        wrapper = gen_wrapper
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            depth = _depth.get()
+            token = _depth.set(depth + 1)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                _tracer.record_call(name, time.perf_counter() - started, None, True, depth == 0)
+                raise
+            finally:
+                _depth.reset(token)
+            # Stream vrácený hotový nebo ve dvojici (generátor, extraktor): API
+            # se volá až při čtení, takže se měří čtení, ne sestavení výsledku
+            if inspect.isgenerator(result):
+                return _trace_generator(name, result)
+            if isinstance(result, tuple) and result and inspect.isgenerator(result[0]):
+                return (_trace_generator(name, result[0]),) + result[1:]
+            _tracer.record_call(name, time.perf_counter() - started, _size(result), False, depth == 0)
+            return result
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def instrument(module: ModuleType, prefix: Optional[str] = None) -> List[str]:
+    """
+    Nahradí veřejné funkce definované v `module` měřenými verzemi. Volání
+    přes atribut modulu (db.get_resources) i uvnitř modulu se pak měří.
+    Vrací jména obalených funkcí.
+    """
+    prefix = prefix or module.__name__.rsplit(".", 1)[-1]
+    wrapped = []
+    for attr, value in list(vars(module).items()):
+        if attr.startswith("_") or not inspect.isfunction(value) or value.__module__ != module.__name__:
+            continue
+        setattr(module, attr, traced(f"{prefix}.{attr}", value))
+        wrapped.append(attr)
+    return wrapped
+
+
+def instrument_method(cls: type, attr: str, name: str) -> None:
+    """Obalí metodu třídy (např. vytvoření Supabase klienta)."""
+    setattr(cls, attr, traced(name, getattr(cls, attr)))
+
+
+# --- Export ---
+
+def _make_handler(tracer: Tracer):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/metrics":
+                body, kind = tracer.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.rstrip("/") == "/metrics.json":
+                body, kind = json.dumps(tracer.snapshot(), ensure_ascii=False).encode("utf-8"), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_setup_lock = threading.Lock()
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Spustí (jednou na proces) HTTP server s /metrics a /metrics.json."""
+    global _server
+    with _setup_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _make_handler(_tracer))
+            threading.Thread(target=_server.serve_forever, daemon=True, name="tracing-metrics").start()
+    return _server
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        import streamlit as st
+        return dict(st.secrets["tracing"])
+    except Exception:
+        return {}
+
+
+def setup(*modules: ModuleType) -> None:
+    """
+    Podle [tracing] zapne měření modulů `modules` (opakované volání při
+    dalším rerunu nic nedělá) a případně spustí server /metrics.
+    """
+    global _enabled
+    cfg = _settings()
+    _enabled = bool(cfg.get("enabled", True))
+    if not _enabled:
+        return
+    for module in modules:
+        instrument(module)
+    from utils.supabase_client import SupabaseClientManager
+    instrument_method(SupabaseClientManager, "_create", "supabase_client.create_client")
+    if cfg.get("metrics_port"):
+        try:
+            serve_metrics(int(cfg["metrics_port"]))
+        except OSError:
+            # Port drží jiný proces (další replika na stejném stroji)
+            pass